@@ -1,7 +1,5 @@
 from datetime import datetime, timedelta
 from typing import Optional
-import hashlib
-import bcrypt
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -9,29 +7,18 @@ from sqlalchemy.orm import Session
 from .database import get_db
 from .models.user import User
 from .config import settings
+from .utils.principal_cache import principal_cache
+from .utils.password_hashing import password_policy
 
 security = HTTPBearer()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    if not hashed_password:
-        return False
-
-    if hashed_password.startswith("sha256$"):
-        expected = hashed_password.split("$", 1)[1]
-        return hashlib.sha256(plain_password.encode("utf-8")).hexdigest() == expected
-
-    try:
-        return bcrypt.checkpw(
-            plain_password.encode("utf-8"),
-            hashed_password.encode("utf-8"),
-        )
-    except Exception:
-        return False
+    return password_policy.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return password_policy.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -39,16 +26,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
-    to_encode.update({"exp": expire, "type": "access"})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow(), "type": "access"})
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
 def create_refresh_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow(), "type": "refresh"})
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
-def verify_token(token: str, token_type: str = "access"):
+def decode_token(token: str, token_type: str = "access") -> dict:
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         user_id: int = payload.get("sub")
@@ -59,7 +46,7 @@ def verify_token(token: str, token_type: str = "access"):
                 detail="Invalid token",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        return user_id
+        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -67,11 +54,30 @@ def verify_token(token: str, token_type: str = "access"):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+def verify_token(token: str, token_type: str = "access"):
+    return decode_token(token, token_type)["sub"]
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
-    user_id = verify_token(credentials.credentials)
+    return authenticate_token(credentials.credentials, db)
+
+def authenticate_token(token: str, db: Session) -> User:
+    """Resolve an access token to its user; for callers outside the bearer scheme."""
+    payload = decode_token(token)
+    try:
+        user_id, iat = int(payload["sub"]), payload.get("iat")
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    # Most requests in a page view carry the same token; see app/utils/principal_cache.py
+    user = principal_cache.get(db, user_id, iat)
+    if user is not None:
+        return user
     user = db.query(User).filter(User.id == user_id).first()
     if user is None:
         raise HTTPException(
@@ -79,6 +85,7 @@ def get_current_user(
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    principal_cache.put(user, iat)
     return user
 
 def require_role(allowed_roles: list):
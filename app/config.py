@@ -1,8 +1,26 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///./hrm.db"
+    # Optional reader pool for report endpoints (app/database.py)
+    database_read_url: str = ""
+    # Async driver URL for AsyncSession handlers; derived from database_url if empty
+    database_async_url: str = ""
+
+    # Connection pool (server databases and file-backed SQLite)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+
+    # SQLite per-connection PRAGMAs
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kb: int = 65536
+    sqlite_mmap_size_mb: int = 256
+    sqlite_foreign_keys: bool = False
     secret_key: str = "your-secret-key-here-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
@@ -14,6 +32,71 @@ class Settings(BaseSettings):
     smtp_username: str = ""
     smtp_password: str = ""
     from_email: str = ""
+
+    # Authenticated-user cache (app/utils/principal_cache.py); 0 disables it
+    principal_cache_size: int = 2048
+    principal_cache_ttl_seconds: int = 60
+    # GET /api/attendance/today responses (app/utils/today_cache.py); 0 disables it
+    today_cache_size: int = 4096
+    today_cache_ttl_seconds: int = 10
+
+    # Background payroll runs
+    payroll_worker_threads: int = 2
+    payroll_chunk_size: int = 200
+    # A running run whose worker has not renewed its lease for this long is taken over
+    payroll_run_lease_seconds: int = 300
+
+    # bcrypt executors (app/utils/password_hashing.py); 0 = one per CPU
+    password_hash_concurrency: int = 0
+    password_hash_processes: int = 0
+    # Target bcrypt cost; older and cheaper hashes are upgraded at login.
+    # With bcrypt_calibrate on, startup re-picks the cost to fit the budget.
+    bcrypt_rounds: int = 12
+    bcrypt_temp_rounds: int = 10
+    bcrypt_min_rounds: int = 10
+    bcrypt_calibrate: bool = False
+    bcrypt_latency_budget_ms: int = 250
+
+    # Rows per commit in the bulk employee import (app/utils/employee_import.py)
+    employee_import_chunk_size: int = 500
+
+    # Reporting-tree cache (app/utils/org_chart.py): full reload interval
+    org_chart_ttl_seconds: int = 300
+
+    # Server push (app/utils/event_hub.py). Empty broker URL = in-process only;
+    # set redis://... when running more than one worker.
+    event_broker_url: str = ""
+    event_queue_size: int = 100
+    event_heartbeat_seconds: int = 15
+
+    # Notification fan-out (app/utils/notifier.py): "inline" writes in the
+    # request's transaction, "background" hands the insert to a worker thread.
+    notification_delivery: str = "inline"
+    notification_worker_threads: int = 1
+    role_directory_ttl_seconds: int = 300
+    # Unread badge counts (app/utils/unread_counts.py); 0 disables the cache
+    unread_count_cache_ttl_seconds: int = 10
+
+    # Notification retention sweep (app/utils/notification_retention.py).
+    # Read notifications that have expired or are older than N days are
+    # archived; the policy maps a notification_type to its own N (JSON in the
+    # env, 0 = keep forever).
+    notification_retention_days: int = 90
+    notification_retention_policy: Dict[str, int] = {}
+    notification_archive_unread_expired: bool = False  # also archive expired unread rows
+    notification_retention_interval_hours: float = 24  # 0 disables the worker
+    notification_retention_batch_size: int = 1000
+    notification_archive: str = "table"  # table | ndjson
+    notification_archive_dir: str = "archives/notifications"
+    notification_retention_vacuum: str = "off"  # off | incremental | full
+
+    # Content-addressed image storage (app/utils/blob_store.py)
+    blob_store_dir: str = "uploads/blobs"
+    # WebP thumbnails of stored images (app/utils/image_variants.py); 0 workers
+    # (or no Pillow) turns them off and list views get the originals
+    image_variant_workers: int = 2
+    image_variant_dir: str = "uploads/variants"
+    image_variant_quality: int = 80
     
     class Config:
         env_file = ".env"
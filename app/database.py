@@ -1,15 +1,180 @@
-from sqlalchemy import create_engine
+import asyncio
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from .config import settings
 
-engine = create_engine(settings.database_url, connect_args={"check_same_thread": False})
+
+def _sqlite_pragmas(read_only: bool = False):
+    """Per-connection settings for a file-backed SQLite database.
+
+    WAL lets readers run alongside the single writer, and busy_timeout makes a
+    writer wait for the lock instead of failing with "database is locked".
+    synchronous=NORMAL is durable under WAL except across power loss.
+    foreign_keys stays off by default: `Employee.manager_id` holds user ids
+    in places although its FK points at employees.id.
+    """
+    pragmas = [
+        f"journal_mode = {settings.sqlite_journal_mode}",
+        f"synchronous = {settings.sqlite_synchronous}",
+        f"busy_timeout = {settings.sqlite_busy_timeout_ms}",
+        f"cache_size = -{settings.sqlite_cache_size_kb}",
+        f"mmap_size = {settings.sqlite_mmap_size_mb * 1024 * 1024}",
+        f"foreign_keys = {'ON' if settings.sqlite_foreign_keys else 'OFF'}",
+        "temp_store = MEMORY",
+    ]
+    if read_only:
+        pragmas.append("query_only = ON")
+    return pragmas
+
+
+# Async drivers used when DATABASE_ASYNC_URL is not given explicitly
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+
+def _async_url(url: str):
+    url = make_url(url)
+    driver = _ASYNC_DRIVERS.get(url.get_backend_name())
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}") if driver else url
+
+
+def build_engine(url: str, read_only: bool = False, asynchronous: bool = False):
+    url = make_url(url)
+    create = create_async_engine if asynchronous else create_engine
+    if url.get_backend_name() != "sqlite":
+        return create(
+            url,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=True,
+        )
+    if url.database in (None, "", ":memory:"):
+        # One shared in-memory connection; nothing to pool or tune.
+        return create(url, connect_args={"check_same_thread": False})
+
+    new_engine = create(
+        url,
+        connect_args={"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000},
+        # aiosqlite would otherwise default to NullPool, reconnecting per checkout
+        poolclass=AsyncAdaptedQueuePool if asynchronous else QueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+    )
+    pragmas = _sqlite_pragmas(read_only)
+
+    sync_engine = new_engine.sync_engine if asynchronous else new_engine
+
+    @event.listens_for(sync_engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+        if asynchronous:
+            # Let SQLAlchemy emit BEGIN itself (see _begin below).
+            dbapi_connection.isolation_level = None
+
+    if asynchronous:
+        # A transaction that reads and then writes cannot wait out another
+        # writer: SQLite fails the lock upgrade with "database is locked" at
+        # once. Write transactions therefore take the lock at BEGIN, where
+        # busy_timeout applies. See get_async_write_db.
+        @event.listens_for(sync_engine, "begin")
+        def _begin(conn):
+            immediate = conn.get_execution_options().get("sqlite_immediate")
+            conn.exec_driver_sql("BEGIN IMMEDIATE" if immediate else "BEGIN")
+
+    return new_engine
+
+
+engine = build_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Optional separate pool for read-heavy routers (reports). Point
+# DATABASE_READ_URL at a replica, or at the primary SQLite file to give
+# readers their own query_only connections. Unset, readers share the writer pool.
+reader_engine = build_engine(settings.database_read_url, read_only=True) if settings.database_read_url else engine
+ReaderSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=reader_engine)
+
+# Same database through an async driver, for `async def` handlers on hot
+# paths (attendance punches). Sessions do not expire on commit because an
+# expired attribute cannot lazy-load outside the event loop's awaits.
+async_engine = build_engine(settings.database_async_url or _async_url(settings.database_url), asynchronous=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+# SQLite has one writer at a time. Async writers in this process queue on
+# this lock (FIFO) instead of spinning in busy_timeout, which is unfair
+# and times out under a burst. Other processes still meet busy_timeout.
+_async_writer_lock = asyncio.Lock() if async_engine.dialect.name == "sqlite" else None
+
+def create_missing_indexes(bind=engine):
+    """Build indexes declared on models whose tables already exist.
+
+    create_all() skips existing tables wholesale, so an index added to a model
+    later would otherwise never reach a deployed database. Returns the names
+    of the indexes created.
+    """
+    inspector = inspect(bind)
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=bind)
+                created.append(index.name)
+    return created
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    db = ReaderSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_write_db():
+    """Async session for a handler that writes. On SQLite its transaction
+    takes the write lock when it begins, queued behind this process's other
+    writers until the previous one commits or rolls back."""
+    async with AsyncSessionLocal() as db:
+        if _async_writer_lock is None:
+            yield db
+            return
+        await _async_writer_lock.acquire()
+        held = [True]
+
+        def release():
+            if held[0]:
+                held[0] = False
+                _async_writer_lock.release()
+
+        @event.listens_for(db.sync_session, "after_transaction_end")
+        def _transaction_end(session, transaction):
+            if transaction.parent is None:
+                release()
+
+        try:
+            await db.connection(execution_options={"sqlite_immediate": True})
+            yield db
+        finally:
+            release()
\ No newline at end of file
@@ -1,6 +1,8 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base, SessionLocal
+from .database import engine, async_engine, Base, SessionLocal, create_missing_indexes
 from .schema_sync import sync_columns
 from .models import user, employee, department, position, notification, language, technical_skill, payroll, attendance, setting  # Import models to ensure tables are created
 from .models import award as award_model  # noqa: F401  — registers Award / AwardNomination tables
@@ -8,6 +10,15 @@ from .models import gallery as gallery_model  # noqa: F401  — registers Galler
 from .models import finance as finance_model  # noqa: F401  — registers Expense / Invoice / FinancialAuditLog tables
 from .models.user import User
 from .auth import get_password_hash
+from .config import settings
+from .utils.password_hashing import password_policy
+from .utils.sequences import next_employee_id
+from .utils.search_index import ensure_search_index
+from .utils.unread_counts import backfill_if_empty as backfill_unread_counts
+from .utils.blob_store import migrate_data_uris
+from .utils.payroll_jobs import resume_interrupted_runs, start_payroll_run_watcher
+from .utils.notification_retention import start_worker as start_notification_retention
+from .utils.attendance_rollup import backfill_department_ids, backfill_worked_minutes, backfill_if_empty as backfill_attendance_rollup
 from .routers import (
     auth, reports, employees, positions, leaves, attendance, performance,
     payroll, requests, complaints, training, assets, health_insurance,
@@ -17,9 +28,19 @@ from .routers import (
     gallery as gallery_router,
     finance as finance_router,
     it_assets as it_assets_router,
+    events as events_router,
+    blobs as blobs_router,
 )
 
-app = FastAPI(title="HRM System API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # aiosqlite runs every pooled connection on a non-daemon thread; until the
+    # pool is closed the process cannot exit (SIGTERM, Ctrl-C, --reload).
+    await async_engine.dispose()
+
+
+app = FastAPI(title="HRM System API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,6 +54,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cursor for the next page of keyset-paginated listings (app/utils/pagination.py)
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Create tables, then add any columns that were introduced on existing models
@@ -41,6 +64,32 @@ Base.metadata.create_all(bind=engine)
 _synced = sync_columns(engine)
 if _synced:
     print(f"[schema-sync] added columns: {', '.join(_synced)}")
+_indexed = create_missing_indexes()
+if _indexed:
+    print(f"[schema-sync] added indexes: {', '.join(_indexed)}")
+_backfilled = backfill_worked_minutes()
+if _backfilled:
+    print(f"[attendance] backfilled worked_minutes on {_backfilled} row(s)")
+_backfilled = backfill_department_ids()
+if _backfilled:
+    print(f"[attendance] stamped department_id on {_backfilled} row(s)")
+_backfilled = backfill_attendance_rollup()
+if _backfilled:
+    print(f"[attendance-rollup] backfilled {_backfilled} daily summary bucket(s)")
+_backfilled = backfill_unread_counts()
+if _backfilled:
+    print(f"[notifications] backfilled unread counters for {_backfilled} user(s)")
+_migrated = migrate_data_uris()
+if _migrated:
+    print(f"[blob-store] moved {_migrated} image data URI(s) into the blob store")
+_reindexed = ensure_search_index()
+if _reindexed:
+    print(f"[search] rebuilt full-text index ({_reindexed} employee(s))")
+
+# Fit the bcrypt cost to this CPU before anything is hashed (see app/utils/password_hashing.py).
+if settings.bcrypt_calibrate:
+    password_policy.calibrate(settings.bcrypt_latency_budget_ms)
+    print(f"[password-hashing] bcrypt cost {password_policy.rounds} ({password_policy.calibrated_ms} ms per hash)")
 
 
 def seed_demo_users() -> None:
@@ -81,10 +130,9 @@ def seed_demo_users() -> None:
         if lead_user:
             lead_emp = db.query(Employee).filter(Employee.user_id == lead_user.id).first()
             if not lead_emp:
-                emp_count = db.query(Employee).count()
                 lead_emp = Employee(
                     user_id=lead_user.id,
-                    employee_id=f"EMP{emp_count + 1:04d}",
+                    employee_id=next_employee_id(db),
                     position="Team Lead",
                     employment_status="full_time",
                 )
@@ -107,6 +155,13 @@ def seed_demo_users() -> None:
 
 seed_demo_users()
 
+# Pick up payroll runs interrupted by a restart or a dead worker (see app/utils/payroll_jobs.py).
+resume_interrupted_runs()
+start_payroll_run_watcher()
+
+# Periodic archive of expired and old read notifications.
+start_notification_retention()
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(reports.router)
@@ -135,6 +190,8 @@ app.include_router(awards_router.router)
 app.include_router(gallery_router.router)
 app.include_router(finance_router.router)
 app.include_router(it_assets_router.router)
+app.include_router(events_router.router)
+app.include_router(blobs_router.router)
 
 @app.get("/")
 def read_root():
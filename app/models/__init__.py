@@ -4,18 +4,19 @@ from .skill import EmployeeSkill
 from .department import Department
 from .leave import Leave, LeaveBalance, LeavePolicy
 from .performance import Performance
-from .attendance import Attendance, BreakRecord
+from .attendance import Attendance, BreakRecord, AttendanceDailySummary
 from .asset import Asset, AssetRequest, AssetAssignmentLog, PurchaseRequisition, InvoiceDocument
 from .complaint import Complaint, ComplaintComment
 from .document import Document, DocumentVersion, DocumentType
 from .training import TrainingProgram, TrainingSession, TrainingEnrollment, TrainingRoadmap
 from .recruitment import JobPosting, Candidate, JobApplication, Interview
 from .health_insurance import HealthInsurancePolicy, InsuranceDependent, InsuranceClaim, PanelHospital, CoverageDetail
-from .payroll import Payslip, PayslipEarning, PayslipDeduction, SalaryStructure, Bonus
+from .payroll import Payslip, PayslipEarning, PayslipDeduction, SalaryStructure, Bonus, PayrollRun
 from .finance import Expense, Invoice, FinancialAuditLog
 from .request import Request
 from .position import Position
-from .notification import Notification, Announcement, AnnouncementRead, Holiday, Task
+from .notification import Notification, NotificationArchive, NotificationUnreadCount, Announcement, AnnouncementRead, Holiday, Task
 from .access_request import AccessRequest
 from .language import Language
-from .technical_skill import TechnicalSkill
\ No newline at end of file
+from .technical_skill import TechnicalSkill
+from .id_sequence import IdSequence
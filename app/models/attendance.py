@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Time, Text, Float, Boolean, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Time, Text, Float, Boolean, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -12,13 +12,22 @@ class Attendance(Base):
     check_in = Column(Time, nullable=True)
     check_out = Column(Time, nullable=True)
     status = Column(String, nullable=False)  # present, absent, late, half_day, on_leave
-    hours_worked = Column(String, nullable=True)
+    hours_worked = Column(String, nullable=True)  # "H:MM" display string, derived from worked_minutes
+    worked_minutes = Column(Integer, nullable=True)  # net of breaks; set at check-out
+    break_minutes = Column(Integer, nullable=True)  # total of closed breaks; set at check-out
+    # Employee's department when the row was created (0 = none): the row's rollup
+    # bucket for good, so a later department move cannot split its contribution.
+    department_id = Column(Integer, nullable=True)
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
-    # Unique constraint to prevent duplicate attendance records for same employee on same date
-    __table_args__ = (UniqueConstraint('employee_id', 'date', name='unique_employee_date'),)
+    # Unique constraint to prevent duplicate attendance records for same employee on same date;
+    # the date index serves company-wide day filters and the (date, id) keyset listings.
+    __table_args__ = (
+        UniqueConstraint('employee_id', 'date', name='unique_employee_date'),
+        Index('ix_attendance_date', 'date'),
+    )
     
     # Relationships
     employee = relationship("User", foreign_keys=[employee_id], back_populates="attendance_records")
@@ -36,5 +45,32 @@ class BreakRecord(Base):
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    __table_args__ = (Index('ix_break_records_attendance_end', 'attendance_id', 'end_time'),)
+    
     # Relationships
-    attendance = relationship("Attendance", back_populates="break_records")
\ No newline at end of file
+    attendance = relationship("Attendance", back_populates="break_records")
+
+class AttendanceDailySummary(Base):
+    """Per-day, per-department attendance counters.
+
+    Maintained incrementally by the attendance write paths (see
+    app/utils/attendance_rollup.py) so dashboards and reports read O(days)
+    rows instead of scanning `attendance`. department_id 0 collects employees
+    without a department (NULLs would defeat the unique key in SQLite).
+    """
+    __tablename__ = "attendance_daily_summary"
+
+    id = Column(Integer, primary_key=True, index=True)
+    date = Column(Date, nullable=False)
+    department_id = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+    present = Column(Integer, nullable=False, default=0)
+    late = Column(Integer, nullable=False, default=0)
+    absent = Column(Integer, nullable=False, default=0)
+    other = Column(Integer, nullable=False, default=0)  # half_day, on_leave, ...
+    checked_in = Column(Integer, nullable=False, default=0)  # present, checked in, not yet out
+    on_break = Column(Integer, nullable=False, default=0)
+    worked_minutes = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (UniqueConstraint('date', 'department_id', name='unique_summary_date_department'),)
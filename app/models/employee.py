@@ -9,15 +9,15 @@ class Employee(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
     employee_id = Column(String, unique=True, nullable=False)
-    department_id = Column(Integer, ForeignKey("departments.id"), nullable=True)
+    department_id = Column(Integer, ForeignKey("departments.id"), nullable=True, index=True)
     position_id = Column(Integer, ForeignKey("positions.id"), nullable=True)
-    position = Column(String, nullable=True)  # Keep for backward compatibility
+    position = Column(String, nullable=True, index=True)  # Keep for backward compatibility
     employment_type = Column(String, nullable=True)  # permanent, contract, temporary, internship, freelance, consultant
     employment_status = Column(String, default="full_time")  # full_time, part_time, contract, intern
     hire_date = Column(Date, nullable=True)
     salary = Column(Float, nullable=True)
     salary_in_words = Column(String, nullable=True)
-    manager_id = Column(Integer, ForeignKey("employees.id"), nullable=True)
+    manager_id = Column(Integer, ForeignKey("employees.id"), nullable=True, index=True)
     work_location = Column(String, default="office")  # office, remote, hybrid, field
     work_type = Column(String, default="office")  # office, remote, hybrid
     gender = Column(String, nullable=True)
@@ -1,6 +1,8 @@
 """
 Gallery models — HR creates albums; employees can view & download images.
-Images are stored as base64 data URIs or URLs (same pattern as avatar_url).
+Image bytes live in the content-addressed blob store (app/utils/blob_store.py);
+the rows hold its /api/blobs/<sha256> URLs. Rows written before it held base64
+data URIs, which blob_store.migrate_data_uris() moves out at startup.
 """
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, JSON
 from sqlalchemy.orm import relationship
@@ -14,7 +16,7 @@ class GalleryAlbum(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    cover_image = Column(Text, nullable=True)       # first image URL / base64
+    cover_image = Column(Text, nullable=True)       # first image's URL
     is_published = Column(Boolean, default=True)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -32,7 +34,7 @@ class GalleryImage(Base):
     album_id = Column(Integer, ForeignKey("gallery_albums.id"), nullable=False)
     title = Column(String, nullable=True)
     file_name = Column(String, nullable=False)
-    file_url = Column(Text, nullable=False)         # base64 data URI or relative path
+    file_url = Column(Text, nullable=False)         # blob store URL or relative path
     file_size = Column(Integer, nullable=True)      # bytes
     mime_type = Column(String, nullable=True)
     uploaded_by = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class IdSequence(Base):
+    """Last number handed out per named sequence (employee IDs, PR-2025-…,
+    EXP-2025-…). Allocated through app/utils/sequences.py."""
+    __tablename__ = "id_sequences"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
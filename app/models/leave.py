@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Text, Float, JSON, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Text, Float, JSON, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -26,6 +26,11 @@ class Leave(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        Index("ix_leaves_employee_status", "employee_id", "status"),
+        Index("ix_leaves_status_created", "status", "created_at"),
+    )
+    
     # Relationships
     employee = relationship("User", foreign_keys=[employee_id], back_populates="leave_requests")
     approver = relationship("User", foreign_keys=[approved_by])
@@ -44,6 +49,10 @@ class LeaveBalance(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        Index("ix_leave_balances_employee_year", "employee_id", "year"),
+    )
+    
     # Relationships
     employee = relationship("User")
 
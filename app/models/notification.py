@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -23,10 +23,50 @@ class Notification(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     read_at = Column(DateTime(timezone=True), nullable=True)
     
+    __table_args__ = (
+        Index("ix_notifications_recipient_read", "recipient_id", "is_read"),
+        Index("ix_notifications_recipient_created", "recipient_id", "created_at"),
+    )
+    
     # Relationships
     recipient = relationship("User", foreign_keys=[recipient_id])
     sender = relationship("User", foreign_keys=[sender_id])
 
+class NotificationArchive(Base):
+    """Notifications moved out of `notifications` by the retention sweep.
+
+    Keeps what an audit needs and drops presentation fields (priority,
+    action_url, flags). See app/utils/notification_retention.py.
+    """
+    __tablename__ = "notifications_archive"
+
+    id = Column(Integer, primary_key=True)  # the original notifications.id
+    recipient_id = Column(Integer, nullable=False, index=True)
+    sender_id = Column(Integer, nullable=True)
+    notification_type = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    message = Column(Text, nullable=False)
+    related_entity_type = Column(String, nullable=True)
+    related_entity_id = Column(Integer, nullable=True)
+    extra_data = Column(JSON, nullable=True)
+    is_read = Column(Boolean, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    read_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class NotificationUnreadCount(Base):
+    """Unread notifications per recipient.
+
+    Kept in step with `notifications` by app/utils/unread_counts.py, so the
+    unread badge is a primary-key read instead of a COUNT over the inbox.
+    """
+    __tablename__ = "notification_unread_counts"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class Announcement(Base):
     __tablename__ = "announcements"
     
@@ -59,6 +99,8 @@ class AnnouncementRead(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     read_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    __table_args__ = (Index("ix_announcement_reads_announcement_user", "announcement_id", "user_id"),)
+    
     # Relationships
     announcement = relationship("Announcement", back_populates="reads")
     user = relationship("User")
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Text, Boolean, Float, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Text, Boolean, Float, JSON, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from ..database import Base
 
 class Payslip(Base):
@@ -24,6 +24,11 @@ class Payslip(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        Index("ix_payslips_employee_period", "employee_id", "pay_period_start"),
+        Index("ix_payslips_period", "pay_period_start"),
+    )
+    
     # Relationships
     employee = relationship("User", foreign_keys=[employee_id])
     generator = relationship("User", foreign_keys=[generated_by])
@@ -35,7 +40,7 @@ class PayslipEarning(Base):
     __tablename__ = "payslip_earnings"
     
     id = Column(Integer, primary_key=True, index=True)
-    payslip_id = Column(Integer, ForeignKey("payslips.id"), nullable=False)
+    payslip_id = Column(Integer, ForeignKey("payslips.id"), nullable=False, index=True)
     earning_type = Column(String, nullable=False)  # basic, hra, transport, bonus, overtime, etc.
     amount = Column(Float, nullable=False)
     description = Column(String, nullable=True)
@@ -49,7 +54,7 @@ class PayslipDeduction(Base):
     __tablename__ = "payslip_deductions"
     
     id = Column(Integer, primary_key=True, index=True)
-    payslip_id = Column(Integer, ForeignKey("payslips.id"), nullable=False)
+    payslip_id = Column(Integer, ForeignKey("payslips.id"), nullable=False, index=True)
     deduction_type = Column(String, nullable=False)  # tax, pf, esi, loan, advance, etc.
     amount = Column(Float, nullable=False)
     description = Column(String, nullable=True)
@@ -78,6 +83,8 @@ class SalaryStructure(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (Index("ix_salary_structures_employee_active", "employee_id", "is_active"),)
+    
     # Relationships
     employee = relationship("User", foreign_keys=[employee_id])
     creator = relationship("User", foreign_keys=[created_by])
@@ -98,8 +105,46 @@ class Bonus(Base):
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    __table_args__ = (Index("ix_bonuses_employee_status", "employee_id", "status"),)
+    
     # Relationships
     employee = relationship("User", foreign_keys=[employee_id])
     approver = relationship("User", foreign_keys=[approved_by])
     creator = relationship("User", foreign_keys=[created_by])
-    payslip = relationship("Payslip")
\ No newline at end of file
+    payslip = relationship("Payslip")
+
+class PayrollRun(Base):
+    """A background payslip generation job for one pay period.
+
+    Employees are processed in ascending user id, one committed chunk at a
+    time; `last_user_id` is the cursor a resumed run continues from. At most
+    one queued or running run per pay period, enforced by a partial unique
+    index.
+    """
+    __tablename__ = "payroll_runs"
+    __table_args__ = (
+        Index(
+            "ux_payroll_runs_active_period", "pay_period", unique=True,
+            sqlite_where=text("status IN ('queued', 'running')"),
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    pay_period = Column(String, nullable=False, index=True)  # YYYY-MM
+    status = Column(String, default="queued")  # queued, running, completed, failed
+    chunk_size = Column(Integer, nullable=False, default=200)
+    total_employees = Column(Integer, default=0)
+    processed = Column(Integer, default=0)
+    generated = Column(Integer, default=0)
+    skipped_existing = Column(Integer, default=0)
+    skipped_no_structure = Column(JSON, default=list)  # user ids
+    failed = Column(JSON, default=list)  # [{"employee_id": .., "error": ..}]
+    last_user_id = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    owner = Column(String, nullable=True)  # worker process holding the lease
+    heartbeat_at = Column(DateTime, nullable=True)  # lease renewed per chunk (UTC)
+    started_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
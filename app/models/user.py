@@ -31,11 +31,16 @@ class User(Base):
     
     @property
     def full_name(self):
-        if self.first_name and self.last_name:
-            return f"{self.first_name} {self.last_name}"
-        elif self.first_name:
-            return self.first_name
-        elif self.last_name:
-            return self.last_name
+        return self.format_full_name(self.first_name, self.last_name, self.email)
+
+    @staticmethod
+    def format_full_name(first_name, last_name, email):
+        """`full_name` from raw column values, for column-only queries."""
+        if first_name and last_name:
+            return f"{first_name} {last_name}"
+        elif first_name:
+            return first_name
+        elif last_name:
+            return last_name
         else:
-            return self.email.split('@')[0]
\ No newline at end of file
+            return email.split('@')[0]
\ No newline at end of file
@@ -1,60 +1,82 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+from typing import List, Optional
 from datetime import date
 
 from ..database import get_db
 from ..auth import get_current_user
 from ..models.user import User
 from ..models.employee import Employee
+from ..models.department import Department
 from ..models.attendance import Attendance
 from ..schemas.attendance import AttendanceResponse
+from ..utils import attendance_rollup
+from ..utils.image_variants import thumbnail_url
+from ..utils.pagination import seek, set_next_cursor, ndjson_response
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
 @router.get("/attendance")
-async def get_admin_attendance(
+def get_admin_attendance(
+    response: Response,
+    limit: int = Query(1000, ge=1, le=5000, description="Number of records to fetch"),
+    cursor: Optional[str] = Query(None, description="Resume after this cursor (from the X-Next-Cursor header)"),
+    stream: bool = Query(False, description="Stream every record as NDJSON instead of one page"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all attendance records with employee details (Admin/HR only)"""
+    """Get all attendance records with employee details (Admin/HR only), newest first"""
     if current_user.role not in ["admin", "hr"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Join attendance with user and employee tables to get complete information
-    records = db.query(Attendance).join(User, Attendance.employee_id == User.id).outerjoin(Employee, User.id == Employee.user_id).order_by(Attendance.date.desc()).all()
+    # One joined row per record: attendance + user + (optional) employee and department
+    query = (
+        db.query(
+            Attendance.id, Attendance.employee_id, Attendance.date, Attendance.check_in,
+            Attendance.check_out, Attendance.status, Attendance.hours_worked,
+            Attendance.worked_minutes, Attendance.notes,
+            User.first_name, User.last_name,
+            Employee.id.label("employee_record_id"), Employee.position, Employee.avatar_url,
+            Department,
+        )
+        .join(User, Attendance.employee_id == User.id)
+        .outerjoin(Employee, User.id == Employee.user_id)
+        .outerjoin(Department, Department.id == Employee.department_id)
+    )
+    query = seek(query, Attendance.date, Attendance.id, cursor)
     
-    # Format response with employee information
-    formatted_records = []
-    for record in records:
-        user = db.query(User).filter(User.id == record.employee_id).first()
-        employee = db.query(Employee).filter(Employee.user_id == record.employee_id).first() if user else None
-        
-        formatted_record = {
+    def serialize(record):
+        has_employee = record.employee_record_id is not None
+        total_hours = record.worked_minutes / 60 if record.worked_minutes else 0
+        employee_name = f"{record.first_name} {record.last_name}"
+        return {
             "id": record.id,
             "employee_id": record.employee_id,
-            "employeeName": f"{user.first_name} {user.last_name}" if user else "Unknown",
-            "employee_name": f"{user.first_name} {user.last_name}" if user else "Unknown",
+            "employeeName": employee_name,
+            "employee_name": employee_name,
             "date": record.date.isoformat(),
             "check_in": record.check_in.isoformat() if record.check_in else None,
             "check_out": record.check_out.isoformat() if record.check_out else None,
             "status": record.status,
             "hours_worked": record.hours_worked,
-            "totalHours": float(record.hours_worked.split(':')[0]) + float(record.hours_worked.split(':')[1])/60 if record.hours_worked and ':' in record.hours_worked else 0,
-            "total_hours": float(record.hours_worked.split(':')[0]) + float(record.hours_worked.split(':')[1])/60 if record.hours_worked and ':' in record.hours_worked else 0,
-            "notes": getattr(record, 'notes', ''),
-            "remarks": getattr(record, 'remarks', ''),
-            "department": employee.department if employee else None,
-            "position": employee.position if employee else None,
-            "avatar_url": employee.avatar_url if employee else None
+            "totalHours": total_hours,
+            "total_hours": total_hours,
+            "notes": record.notes,
+            "remarks": '',
+            "department": record.Department if has_employee else None,
+            "position": record.position if has_employee else None,
+            "avatar_url": thumbnail_url(record.avatar_url, "avatar") if has_employee else None
         }
-        formatted_records.append(formatted_record)
     
-    return formatted_records
+    if stream:
+        return ndjson_response(query, serialize)
+    
+    records = query.limit(limit).all()
+    set_next_cursor(response, records, limit, lambda r: (r.date, r.id))
+    return [serialize(record) for record in records]
 
 @router.get("/attendance/stats")
-async def get_admin_attendance_stats(
+def get_admin_attendance_stats(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -64,18 +86,11 @@ async def get_admin_attendance_stats(
     
     today = date.today()
     
-    # Get today's stats
-    today_present = db.query(Attendance).filter(
-        and_(Attendance.date == today, Attendance.status == "present")
-    ).count()
-    
-    today_absent = db.query(Attendance).filter(
-        and_(Attendance.date == today, Attendance.status == "absent")
-    ).count()
-    
-    today_late = db.query(Attendance).filter(
-        and_(Attendance.date == today, Attendance.status == "late")
-    ).count()
+    # Today's counts come from the daily rollup (see app/utils/attendance_rollup.py)
+    summary = attendance_rollup.totals(db, today)
+    today_present = summary["present"]
+    today_absent = summary["absent"]
+    today_late = summary["late"]
     
     # Get total employees
     total_employees = db.query(User).filter(User.role == "employee").count()
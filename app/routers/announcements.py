@@ -8,6 +8,7 @@ from ..database import get_db
 from ..models.user import User
 from ..models.notification import Announcement
 from ..auth import get_current_user
+from ..utils.event_hub import BROADCAST, event_hub
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/api/announcements", tags=["Announcements"])
@@ -125,7 +126,9 @@ def create_announcement(
     db.add(ann)
     db.commit()
     db.refresh(ann)
-    return _announcement_row(ann)
+    row = _announcement_row(ann)
+    event_hub.publish([BROADCAST], "announcement", row)
+    return row
 
 
 @router.delete("/{announcement_id}")
@@ -1,14 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, extract
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager, selectinload
+from sqlalchemy import Integer, String, and_, case, cast, exists, func, extract, insert as sa_insert, literal, select, update
 from typing import List, Optional
 from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
 import calendar
 
-from ..database import get_db
+from ..database import get_async_db, get_async_write_db, get_db
 from ..auth import get_current_user
 from ..models.user import User
 from ..models.attendance import Attendance, BreakRecord
+from ..utils import attendance_rollup
+from ..utils.org_chart import org_chart
+from ..utils.event_hub import event_hub, role_channel, user_channel
+from ..utils.today_cache import today_cache
+from ..utils.pagination import seek, set_next_cursor, ndjson_response
 from ..schemas.attendance import (
     AttendanceResponse, AttendanceCreate, AttendanceUpdate,
     CheckInResponse, CheckOutResponse, BreakStartResponse, BreakEndResponse,
@@ -17,31 +27,22 @@ from ..schemas.attendance import (
 
 router = APIRouter(prefix="/api/attendance", tags=["attendance"])
 
-def calculate_hours_worked(check_in: time, check_out: time, break_minutes: int = 0) -> str:
-    """Calculate hours worked between check-in and check-out times"""
-    if not check_in or not check_out:
-        return "0:00"
-    
-    # Convert times to datetime for calculation
-    today = datetime.now().date()
-    check_in_dt = datetime.combine(today, check_in)
-    check_out_dt = datetime.combine(today, check_out)
-    
-    # Handle overnight shifts
-    if check_out_dt < check_in_dt:
-        check_out_dt += timedelta(days=1)
-    
-    # Calculate total minutes worked
-    total_minutes = int((check_out_dt - check_in_dt).total_seconds() / 60)
-    
-    # Subtract break time
-    working_minutes = max(0, total_minutes - break_minutes)
-    
-    # Convert to hours:minutes format
-    hours = working_minutes // 60
-    minutes = working_minutes % 60
-    
-    return f"{hours}:{minutes:02d}"
+def _seconds_between(dialect: str, start, end):
+    """SQL for the whole seconds from `start` to `end` (datetimes, or times of day)."""
+    if dialect == "sqlite":
+        return cast(func.round((func.julianday(end) - func.julianday(start)) * 86400), Integer)
+    return cast(extract("epoch", end - start), Integer)
+
+def _shift_minutes_sql(dialect: str, check_out: time):
+    """SQL for the minutes from the row's check-in to `check_out`. A check-out
+    before the check-in is an overnight shift."""
+    return (_seconds_between(dialect, Attendance.check_in, check_out) + 86400) % 86400 // 60
+
+def _hours_worked_sql(worked_minutes):
+    """SQL for minutes -> "H:MM", the display form stored in Attendance.hours_worked"""
+    minutes = worked_minutes % 60
+    return (cast(worked_minutes // 60, String) + ":"
+            + case((minutes < 10, "0"), else_="") + cast(minutes, String))
 
 def get_total_break_minutes(attendance_id: int, db: Session) -> int:
     """Calculate total break minutes for an attendance record"""
@@ -57,37 +58,115 @@ def get_total_break_minutes(attendance_id: int, db: Session) -> int:
     
     return total_minutes
 
+# ── Punches ─────────────────────────────────────────────────────────────────
+# The punch endpoints carry the start-of-shift burst, so they run on the
+# async session (app/database.py) rather than blocking the event loop.
+
+async def _today_record(db: AsyncSession, user_id: int, day: date) -> Optional[Attendance]:
+    return (await db.execute(
+        select(Attendance).where(Attendance.employee_id == user_id, Attendance.date == day)
+    )).scalars().first()
+
+
+def _open_break():
+    """Correlates to the enclosing Attendance row."""
+    return exists().where(BreakRecord.attendance_id == Attendance.id, BreakRecord.end_time.is_(None))
+
+
+def _closed_break_minutes():
+    """Correlates to the enclosing Attendance row."""
+    return (
+        select(func.coalesce(func.sum(BreakRecord.duration_minutes), 0))
+        .where(BreakRecord.attendance_id == Attendance.id, BreakRecord.end_time.isnot(None))
+        .scalar_subquery()
+    )
+
+
+def _check_out_row(dialect: str, check_out: time, *which):
+    """UPDATE ... FROM that checks out the row matching `which` if it is checked
+    in with no break open. The break total and shift length are computed once
+    per row in the derived table; RETURNING gives the new values."""
+    totals = select(
+        Attendance.id,
+        _shift_minutes_sql(dialect, check_out).label("shift_minutes"),
+        _closed_break_minutes().label("break_minutes"),
+    ).where(*which).subquery()
+    worked = case(
+        (totals.c.shift_minutes > totals.c.break_minutes, totals.c.shift_minutes - totals.c.break_minutes),
+        else_=0,
+    )
+    return (
+        update(Attendance)
+        .where(Attendance.id == totals.c.id, Attendance.check_in.isnot(None),
+               Attendance.check_out.is_(None), ~_open_break())
+        .values(check_out=check_out, worked_minutes=worked,
+                break_minutes=totals.c.break_minutes, hours_worked=_hours_worked_sql(worked))
+        .returning(Attendance.id, Attendance.status, Attendance.check_in, Attendance.check_out,
+                   Attendance.worked_minutes, Attendance.hours_worked)
+    )
+
+
+def _punched(user_id: int, action: str, day: date) -> None:
+    # After the punch commits: drop the cached /today answer and push the
+    # change to the user's widgets and the admin/hr live feeds.
+    today_cache.invalidate(user_id)
+    event_hub.publish(
+        [user_channel(user_id), role_channel("admin"), role_channel("hr")],
+        "attendance", {"user_id": user_id, "action": action, "date": day},
+    )
+
+
+def _today_row(user_id: int, day: date):
+    return and_(Attendance.employee_id == user_id, Attendance.date == day)
+
+
+async def _insert_checked_in(db: AsyncSession, user_id: int, day: date, check_in_time: time) -> Optional[int]:
+    """Insert today's row already checked in. Returns its id, or None if the
+    employee already has a row for the day; the insert never raises on that."""
+    values = dict(employee_id=user_id, date=day, check_in=check_in_time, status="present",
+                  department_id=attendance_rollup.department_stamp(user_id))
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else pg_insert
+        stmt = insert(Attendance).values(**values).on_conflict_do_nothing(index_elements=["employee_id", "date"])
+        return await db.scalar(stmt.returning(Attendance.id))
+    try:
+        async with db.begin_nested():
+            result = await db.execute(sa_insert(Attendance).values(**values))
+        return result.inserted_primary_key[0]
+    except IntegrityError:
+        return None
+
+
 @router.get("/today", response_model=TodayAttendanceResponse)
 async def get_today_attendance(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get today's attendance status for the current user"""
     today = date.today()
-    
-    # Get today's attendance record
-    attendance = db.query(Attendance).filter(
-        and_(
-            Attendance.employee_id == current_user.id,
-            Attendance.date == today
-        )
-    ).first()
-    
-    # Get active break if any
+    cached = today_cache.get(current_user.id, today)
+    if cached is not None:
+        return cached
+    version = today_cache.version(current_user.id)
+    
+    # Today's row and its breaks in one round trip: LEFT JOIN, with the
+    # breaks collected onto attendance.break_records (the response embeds them)
+    attendance = (await db.execute(
+        select(Attendance)
+        .outerjoin(Attendance.break_records)
+        .options(contains_eager(Attendance.break_records))
+        .where(_today_row(current_user.id, today))
+        .order_by(BreakRecord.id)
+    )).unique().scalars().first()
+    
+    # Active break and closed-break total, from the rows already fetched
     active_break = None
     total_break_time = 0
     
     if attendance:
-        # Get active break (break without end_time)
-        active_break = db.query(BreakRecord).filter(
-            and_(
-                BreakRecord.attendance_id == attendance.id,
-                BreakRecord.end_time.is_(None)
-            )
-        ).first()
-        
-        # Calculate total break time
-        total_break_time = get_total_break_minutes(attendance.id, db)
+        active_break = next((b for b in attendance.break_records if b.end_time is None), None)
+        total_break_time = sum(b.duration_minutes or 0 for b in attendance.break_records if b.end_time is not None)
     
     # Determine current status and available actions
     current_status = "not_checked_in"
@@ -121,7 +200,7 @@ async def get_today_attendance(
         else:
             current_status = "not_checked_in"
     
-    return TodayAttendanceResponse(
+    response = TodayAttendanceResponse(
         attendance=attendance,
         current_status=current_status,
         can_check_in=can_check_in,
@@ -132,47 +211,56 @@ async def get_today_attendance(
         total_break_time=total_break_time,
         hours_worked_today=hours_worked_today
     )
+    today_cache.put(current_user.id, today, response, version)
+    return response
+
+# Each punch is a conditional write: the WHERE clause re-checks the state the
+# punch needs, so two taps racing each other cannot both succeed, and the
+# loser gets the same 400 as a sequential double tap (never a unique-key 500).
+# Reads happen only to explain a refusal.
 
 @router.post("/check-in", response_model=CheckInResponse)
 async def check_in(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_write_db)
 ):
     """Check in for the current user"""
     today = date.today()
     current_time = datetime.now().time()
     
-    # Check if already checked in today
-    existing_attendance = db.query(Attendance).filter(
-        and_(
-            Attendance.employee_id == current_user.id,
-            Attendance.date == today
-        )
-    ).first()
-    
-    if existing_attendance and existing_attendance.check_in:
-        raise HTTPException(status_code=400, detail="Already checked in today")
-    
-    # Create or update attendance record
-    if existing_attendance:
-        existing_attendance.check_in = current_time
-        existing_attendance.status = "present"
-        attendance = existing_attendance
-    else:
-        attendance = Attendance(
-            employee_id=current_user.id,
-            date=today,
-            check_in=current_time,
-            status="present"
+    # Usual case: no row yet for today, one INSERT ... ON CONFLICT DO NOTHING
+    after = {"status": "present", "check_in": current_time, "check_out": None, "worked_minutes": None, "hours_worked": None}
+    before = None
+    attendance_id = await _insert_checked_in(db, current_user.id, today, current_time)
+    if attendance_id is None:
+        # A row exists (e.g. pre-marked absent). Take it over only if it is
+        # still not checked in and unchanged since read; the rollup needs its old status.
+        existing = (await db.execute(
+            select(Attendance.id, Attendance.status, Attendance.check_in, Attendance.check_out,
+                   Attendance.worked_minutes, Attendance.hours_worked).where(_today_row(current_user.id, today))
+        )).first()
+        if existing is None or existing.check_in is not None:
+            raise HTTPException(status_code=400, detail="Already checked in today")
+        attendance_id = await db.scalar(
+            update(Attendance)
+            .where(Attendance.id == existing.id, Attendance.check_in.is_(None), Attendance.status == existing.status)
+            .values(check_in=current_time, status="present")
+            .returning(Attendance.id),
+            execution_options={"synchronize_session": False},
         )
-        db.add(attendance)
+        if attendance_id is None:
+            raise HTTPException(status_code=400, detail="Already checked in today")
+        before = attendance_rollup.contribution(existing)
+        after.update(check_out=existing.check_out, worked_minutes=existing.worked_minutes, hours_worked=existing.hours_worked)
     
-    db.commit()
-    db.refresh(attendance)
+    await db.run_sync(attendance_rollup.record, attendance_id, today, before,
+                      attendance_rollup.contribution(SimpleNamespace(**after)))
+    await db.commit()
+    _punched(current_user.id, "check_in", today)
     
     return CheckInResponse(
         message="Checked in successfully",
-        attendance_id=attendance.id,
+        attendance_id=attendance_id,
         check_in_time=current_time,
         status="present"
     )
@@ -180,52 +268,57 @@ async def check_in(
 @router.post("/check-out", response_model=CheckOutResponse)
 async def check_out(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_write_db)
 ):
     """Check out for the current user"""
     today = date.today()
     current_time = datetime.now().time()
     
-    # Get today's attendance record
-    attendance = db.query(Attendance).filter(
-        and_(
-            Attendance.employee_id == current_user.id,
-            Attendance.date == today
-        )
-    ).first()
-    
-    if not attendance or not attendance.check_in:
-        raise HTTPException(status_code=400, detail="Must check in first")
-    
-    if attendance.check_out:
-        raise HTTPException(status_code=400, detail="Already checked out today")
-    
-    # Check if there's an active break
-    active_break = db.query(BreakRecord).filter(
-        and_(
-            BreakRecord.attendance_id == attendance.id,
-            BreakRecord.end_time.is_(None)
-        )
-    ).first()
-    
-    if active_break:
-        raise HTTPException(status_code=400, detail="Please end your break before checking out")
-    
-    # Calculate total break time and hours worked
-    total_break_minutes = get_total_break_minutes(attendance.id, db)
-    hours_worked = calculate_hours_worked(attendance.check_in, current_time, total_break_minutes)
-    
-    # Update attendance record
-    attendance.check_out = current_time
-    attendance.hours_worked = hours_worked
-    
-    db.commit()
+    # One UPDATE: checks out only a row still checked in with no break open.
+    # Usual case: no worked time on the row yet, so the rollup knows its old
+    # contribution without a read
+    dialect = db.get_bind().dialect.name
+    attendance = (await db.execute(
+        _check_out_row(dialect, current_time, _today_row(current_user.id, today),
+                       Attendance.worked_minutes.is_(None), Attendance.hours_worked.is_(None)),
+        execution_options={"synchronize_session": False},
+    )).first()
+    
+    if attendance is not None:
+        before = SimpleNamespace(status=attendance.status, check_in=attendance.check_in, check_out=None,
+                                 worked_minutes=None, hours_worked=None)
+    else:
+        # Refused: explain why, or take over a row that already carries worked time
+        existing = (await db.execute(
+            select(Attendance.id, Attendance.status, Attendance.check_in, Attendance.check_out,
+                   Attendance.worked_minutes, Attendance.hours_worked, _open_break().label("on_break"))
+            .where(_today_row(current_user.id, today))
+        )).first()
+        if not existing or not existing.check_in:
+            raise HTTPException(status_code=400, detail="Must check in first")
+        if existing.check_out:
+            raise HTTPException(status_code=400, detail="Already checked out today")
+        if existing.on_break:
+            raise HTTPException(status_code=400, detail="Please end your break before checking out")
+        before = existing
+        attendance = (await db.execute(
+            _check_out_row(dialect, current_time, Attendance.id == existing.id),
+            execution_options={"synchronize_session": False},
+        )).first()
+        if attendance is None:
+            raise HTTPException(status_code=400, detail="Already checked out today")
+    
+    await db.run_sync(attendance_rollup.record, attendance.id, today,
+                      attendance_rollup.contribution(before), attendance_rollup.contribution(attendance))
+    
+    await db.commit()
+    _punched(current_user.id, "check_out", today)
     
     return CheckOutResponse(
         message="Checked out successfully",
         attendance_id=attendance.id,
         check_out_time=current_time,
-        hours_worked=hours_worked,
+        hours_worked=attendance.hours_worked,
         status="present"
     )
 
@@ -233,51 +326,41 @@ async def check_out(
 async def start_break(
     break_type: str = Query("general", description="Type of break"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_write_db)
 ):
     """Start a break for the current user"""
     today = date.today()
     current_time = datetime.now()
     
-    # Get today's attendance record
-    attendance = db.query(Attendance).filter(
-        and_(
-            Attendance.employee_id == current_user.id,
-            Attendance.date == today
-        )
-    ).first()
-    
-    if not attendance or not attendance.check_in:
-        raise HTTPException(status_code=400, detail="Must check in first")
-    
-    if attendance.check_out:
-        raise HTTPException(status_code=400, detail="Cannot start break after checking out")
-    
-    # Check if there's already an active break
-    active_break = db.query(BreakRecord).filter(
-        and_(
-            BreakRecord.attendance_id == attendance.id,
-            BreakRecord.end_time.is_(None)
-        )
-    ).first()
-    
-    if active_break:
-        raise HTTPException(status_code=400, detail="Break already in progress")
-    
-    # Create new break record
-    break_record = BreakRecord(
-        attendance_id=attendance.id,
-        break_type=break_type,
-        start_time=current_time
+    # INSERT ... SELECT: a break row appears only if today's row is checked in,
+    # not checked out and has no break open
+    eligible = select(Attendance.id, literal(break_type), literal(current_time)).where(
+        _today_row(current_user.id, today),
+        Attendance.check_in.isnot(None),
+        Attendance.check_out.is_(None),
+        ~_open_break(),
     )
+    started = (await db.execute(
+        sa_insert(BreakRecord)
+        .from_select(["attendance_id", "break_type", "start_time"], eligible)
+        .returning(BreakRecord.id, BreakRecord.attendance_id)
+    )).first()
+    
+    if started is None:
+        attendance = await _today_record(db, current_user.id, today)
+        if not attendance or not attendance.check_in:
+            raise HTTPException(status_code=400, detail="Must check in first")
+        if attendance.check_out:
+            raise HTTPException(status_code=400, detail="Cannot start break after checking out")
+        raise HTTPException(status_code=400, detail="Break already in progress")
     
-    db.add(break_record)
-    db.commit()
-    db.refresh(break_record)
+    await db.run_sync(attendance_rollup.record_break, started.attendance_id, today, 1)
+    await db.commit()
+    _punched(current_user.id, "break_start", today)
     
     return BreakStartResponse(
         message="Break started successfully",
-        break_id=break_record.id,
+        break_id=started.id,
         start_time=current_time,
         break_type=break_type
     )
@@ -285,52 +368,48 @@ async def start_break(
 @router.post("/break/end", response_model=BreakEndResponse)
 async def end_break(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_write_db)
 ):
     """End the current break for the user"""
     today = date.today()
     current_time = datetime.now()
     
-    # Get today's attendance record
-    attendance = db.query(Attendance).filter(
-        and_(
-            Attendance.employee_id == current_user.id,
-            Attendance.date == today
-        )
-    ).first()
-    
-    if not attendance:
-        raise HTTPException(status_code=400, detail="No attendance record found for today")
-    
-    # Get active break
-    active_break = db.query(BreakRecord).filter(
-        and_(
-            BreakRecord.attendance_id == attendance.id,
-            BreakRecord.end_time.is_(None)
-        )
-    ).first()
-    
-    if not active_break:
+    # Close today's open break, if any; the WHERE clause claims it, and the
+    # duration is computed in the same statement
+    open_break_id = (
+        select(func.min(BreakRecord.id))
+        .join(Attendance, Attendance.id == BreakRecord.attendance_id)
+        .where(_today_row(current_user.id, today), BreakRecord.end_time.is_(None))
+        .scalar_subquery()
+    )
+    elapsed = _seconds_between(db.get_bind().dialect.name, BreakRecord.start_time, current_time)
+    closed = (await db.execute(
+        update(BreakRecord)
+        .where(BreakRecord.id == open_break_id, BreakRecord.end_time.is_(None))
+        .values(end_time=current_time, duration_minutes=elapsed // 60)
+        .returning(BreakRecord.id, BreakRecord.attendance_id, BreakRecord.duration_minutes),
+        execution_options={"synchronize_session": False},
+    )).first()
+    
+    if closed is None:
+        if await _today_record(db, current_user.id, today) is None:
+            raise HTTPException(status_code=400, detail="No attendance record found for today")
         raise HTTPException(status_code=400, detail="No active break found")
     
-    # Calculate break duration
-    duration_minutes = int((current_time - active_break.start_time).total_seconds() / 60)
+    await db.run_sync(attendance_rollup.record_break, closed.attendance_id, today, -1)
     
-    # Update break record
-    active_break.end_time = current_time
-    active_break.duration_minutes = duration_minutes
-    
-    db.commit()
+    await db.commit()
+    _punched(current_user.id, "break_end", today)
     
     return BreakEndResponse(
         message="Break ended successfully",
-        break_id=active_break.id,
+        break_id=closed.id,
         end_time=current_time,
-        duration_minutes=duration_minutes
+        duration_minutes=closed.duration_minutes
     )
 
 @router.get("/my-attendance", response_model=dict)
-async def get_my_attendance(
+def get_my_attendance(
     year: Optional[int] = Query(None, description="Year filter"),
     month: Optional[int] = Query(None, description="Month filter"),
     limit: Optional[int] = Query(30, description="Limit number of records"),
@@ -349,21 +428,15 @@ async def get_my_attendance(
     # Get records with limit
     records = query.order_by(Attendance.date.desc()).limit(limit).all()
     
-    # Calculate statistics
-    total_records = query.count()
-    present_days = query.filter(Attendance.status == "present").count()
-    absent_days = query.filter(Attendance.status == "absent").count()
-    late_days = query.filter(Attendance.status == "late").count()
-    
-    # Calculate total hours worked
-    total_hours = 0.0
-    for record in records:
-        if record.hours_worked:
-            try:
-                hours, minutes = record.hours_worked.split(":")
-                total_hours += float(hours) + float(minutes) / 60
-            except:
-                pass
+    # Calculate statistics in one aggregate over the same filters
+    total_records, present_days, absent_days, late_days, worked_minutes = query.with_entities(
+        func.count(Attendance.id),
+        func.coalesce(func.sum(case((Attendance.status == "present", 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Attendance.status == "absent", 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Attendance.status == "late", 1), else_=0)), 0),
+        func.coalesce(func.sum(Attendance.worked_minutes), 0),
+    ).one()
+    total_hours = worked_minutes / 60
     
     return {
         "records": records,
@@ -378,7 +451,7 @@ async def get_my_attendance(
     }
 
 @router.get("/records", response_model=List[AttendanceResponse])
-async def get_attendance_records(
+def get_attendance_records(
     limit: int = Query(30, description="Number of records to fetch"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -391,7 +464,7 @@ async def get_attendance_records(
     return records
 
 @router.get("/stats", response_model=AttendanceStatsResponse)
-async def get_attendance_stats(
+def get_attendance_stats(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -400,29 +473,20 @@ async def get_attendance_stats(
     current_month = today.month
     current_year = today.year
     
-    # Get current month's records
-    month_records = db.query(Attendance).filter(
-        and_(
-            Attendance.employee_id == current_user.id,
-            extract('year', Attendance.date) == current_year,
-            extract('month', Attendance.date) == current_month
-        )
-    ).all()
-    
-    # Calculate statistics
-    total_present = len([r for r in month_records if r.status == "present"])
-    total_absent = len([r for r in month_records if r.status == "absent"])
-    total_late = len([r for r in month_records if r.status == "late"])
-    
-    # Calculate total hours worked
-    total_hours = 0.0
-    for record in month_records:
-        if record.hours_worked:
-            try:
-                hours, minutes = record.hours_worked.split(":")
-                total_hours += float(hours) + float(minutes) / 60
-            except:
-                pass
+    # Current month's counts and hours, aggregated in the database
+    month_start = date(current_year, current_month, 1)
+    month_end = month_start + timedelta(days=calendar.monthrange(current_year, current_month)[1])
+    total_present, total_absent, total_late, worked_minutes = db.query(
+        func.coalesce(func.sum(case((Attendance.status == "present", 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Attendance.status == "absent", 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Attendance.status == "late", 1), else_=0)), 0),
+        func.coalesce(func.sum(Attendance.worked_minutes), 0),
+    ).filter(
+        Attendance.employee_id == current_user.id,
+        Attendance.date >= month_start,
+        Attendance.date < month_end,
+    ).one()
+    total_hours = worked_minutes / 60
     
     # Get today's attendance
     today_attendance = db.query(Attendance).filter(
@@ -455,20 +519,23 @@ async def get_attendance_stats(
 
 # Admin/HR endpoints
 @router.get("/", response_model=List[AttendanceResponse])
-async def get_all_attendance(
+def get_all_attendance(
+    response: Response,
     skip: int = Query(0, description="Number of records to skip"),
-    limit: int = Query(1000, description="Number of records to fetch"),
+    limit: int = Query(1000, ge=1, le=5000, description="Number of records to fetch"),
+    cursor: Optional[str] = Query(None, description="Resume after this cursor (from the X-Next-Cursor header)"),
+    stream: bool = Query(False, description="Stream every matching record as NDJSON instead of one page"),
     employee_id: Optional[int] = Query(None, description="Filter by employee ID"),
     date_from: Optional[date] = Query(None, description="Start date filter"),
     date_to: Optional[date] = Query(None, description="End date filter"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all attendance records (Admin/HR only)"""
+    """Get all attendance records (Admin/HR only), newest first, one page at a time"""
     if current_user.role not in ["admin", "hr"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    query = db.query(Attendance)
+    query = db.query(Attendance).options(selectinload(Attendance.break_records))
     
     # Apply filters only if provided
     if employee_id:
@@ -478,16 +545,16 @@ async def get_all_attendance(
     if date_to:
         query = query.filter(Attendance.date <= date_to)
     
-    # Get all records without skip/limit if no filters applied
-    if not employee_id and not date_from and not date_to and skip == 0:
-        records = query.order_by(Attendance.date.desc()).all()
-    else:
-        records = query.order_by(Attendance.date.desc()).offset(skip).limit(limit).all()
+    query = seek(query, Attendance.date, Attendance.id, cursor)
+    if stream:
+        return ndjson_response(query, lambda r: AttendanceResponse.model_validate(r).model_dump())
     
+    records = query.offset(skip).limit(limit).all()
+    set_next_cursor(response, records, limit, lambda r: (r.date, r.id))
     return records
 
 @router.post("/", response_model=AttendanceResponse)
-async def create_attendance_record(
+def create_attendance_record(
     attendance_data: AttendanceCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -508,7 +575,12 @@ async def create_attendance_record(
         raise HTTPException(status_code=400, detail="Attendance record already exists for this date")
     
     attendance = Attendance(**attendance_data.dict())
+    if attendance.hours_worked:
+        attendance.worked_minutes = attendance_rollup.hours_to_minutes(attendance.hours_worked)
+    attendance.department_id = db.scalar(select(attendance_rollup.department_stamp(attendance.employee_id)))
     db.add(attendance)
+    db.flush()
+    attendance_rollup.record(db, attendance.id, attendance.date, None, attendance_rollup.contribution(attendance))
     db.commit()
     db.refresh(attendance)
     
@@ -520,7 +592,7 @@ async def create_attendance_record(
 
 
 @router.get("/admin/notifications", response_model=List[dict])
-async def get_admin_attendance_notifications(
+def get_admin_attendance_notifications(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -531,11 +603,11 @@ async def get_admin_attendance_notifications(
     today = date.today()
     notifications = []
 
+    # Counters come from the daily rollup, not a scan of today's attendance rows.
+    summary = attendance_rollup.totals(db, today)
+
     # Late arrivals today (checked in after 09:00)
-    late_count = db.query(Attendance).filter(
-        Attendance.date == today,
-        Attendance.status == "late"
-    ).count()
+    late_count = summary["late"]
     if late_count > 0:
         notifications.append({
             "id": "late-today",
@@ -547,10 +619,7 @@ async def get_admin_attendance_notifications(
         })
 
     # Absent employees today (no attendance record at all or status = absent)
-    absent_count = db.query(Attendance).filter(
-        Attendance.date == today,
-        Attendance.status == "absent"
-    ).count()
+    absent_count = summary["absent"]
     if absent_count > 0:
         notifications.append({
             "id": "absent-today",
@@ -562,12 +631,7 @@ async def get_admin_attendance_notifications(
         })
 
     # Employees still checked in (no check-out by end of day)
-    checked_in_only = db.query(Attendance).filter(
-        Attendance.date == today,
-        Attendance.check_in.isnot(None),
-        Attendance.check_out.is_(None),
-        Attendance.status == "present"
-    ).count()
+    checked_in_only = summary["checked_in"]
     if checked_in_only > 0:
         notifications.append({
             "id": "still-checked-in",
@@ -581,7 +645,7 @@ async def get_admin_attendance_notifications(
     return notifications
 
 @router.post("/admin/export-report", response_model=dict)
-async def export_attendance_report(
+def export_attendance_report(
     filters: dict,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -593,7 +657,7 @@ async def export_attendance_report(
     return {"message": "Report export initiated", "status": "success"}
 
 @router.post("/admin/process-auto-absence", response_model=dict)
-async def process_auto_absence(
+def process_auto_absence(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -604,45 +668,60 @@ async def process_auto_absence(
     return {"message": "Auto-absence processing completed", "status": "success"}
 
 @router.get("/all", response_model=List[dict])
-async def get_all_attendance_records(
+def get_all_attendance_records(
+    response: Response,
+    limit: int = Query(1000, ge=1, le=5000, description="Number of records to fetch"),
+    cursor: Optional[str] = Query(None, description="Resume after this cursor (from the X-Next-Cursor header)"),
+    stream: bool = Query(False, description="Stream every record as NDJSON instead of one page"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all attendance records with employee details"""
+    """Get all attendance records with employee details, newest first"""
     if current_user.role not in ["admin", "hr"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    records = db.query(Attendance).join(User, Attendance.employee_id == User.id).all()
-    
-    result = []
-    for record in records:
-        result.append({
-            "id": record.id,
-            "employee_id": record.employee_id,
-            "employee_email": record.employee.email,
-            "employee_name": f"{record.employee.first_name} {record.employee.last_name}",
-            "date": record.date,
-            "check_in": record.check_in,
-            "check_out": record.check_out,
-            "status": record.status,
-            "hours_worked": record.hours_worked,
-            "notes": record.notes,
-            "created_at": record.created_at
-        })
+    query = db.query(
+        Attendance.id, Attendance.employee_id, User.email, User.first_name, User.last_name,
+        Attendance.date, Attendance.check_in, Attendance.check_out, Attendance.status,
+        Attendance.hours_worked, Attendance.notes, Attendance.created_at,
+    ).join(User, Attendance.employee_id == User.id)
+    query = seek(query, Attendance.date, Attendance.id, cursor)
+
+    def serialize(row):
+        return {
+            "id": row.id,
+            "employee_id": row.employee_id,
+            "employee_email": row.email,
+            "employee_name": f"{row.first_name} {row.last_name}",
+            "date": row.date,
+            "check_in": row.check_in,
+            "check_out": row.check_out,
+            "status": row.status,
+            "hours_worked": row.hours_worked,
+            "notes": row.notes,
+            "created_at": row.created_at
+        }
+
+    if stream:
+        return ndjson_response(query, serialize)
 
-    return result
+    rows = query.limit(limit).all()
+    set_next_cursor(response, rows, limit, lambda r: (r.date, r.id))
+    return [serialize(row) for row in rows]
 
 
 @router.get("/team", response_model=List[dict])
-async def get_team_attendance(
+def get_team_attendance(
     target_date: Optional[str] = Query(None, description="ISO date (YYYY-MM-DD); defaults to today"),
+    stream: bool = Query(False, description="Stream the snapshot as NDJSON instead of one JSON list"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Attendance snapshot for the current team lead's team on a given date.
 
-    Team membership is defined by employees whose manager_id equals the
-    team lead's user id. Admin/HR see all employees.
+    Team membership is the lead's direct reports in the org chart
+    (app/utils/org_chart.py). Admin/HR see all employees; for a large company
+    pass `stream=true` so the rows are not all held in memory at once.
     """
     from ..models.employee import Employee
     from ..models.department import Department
@@ -655,31 +734,38 @@ async def get_team_attendance(
     except ValueError:
         raise HTTPException(status_code=422, detail="target_date must be YYYY-MM-DD")
 
-    emp_query = db.query(Employee)
+    # One outer-joined snapshot instead of User/Attendance/Department lookups per member.
+    query = (
+        db.query(
+            Employee.employee_id, Employee.user_id, Employee.position,
+            User.first_name, User.last_name, User.email,
+            Department.name.label("department"),
+            Attendance.status, Attendance.check_in, Attendance.check_out, Attendance.hours_worked,
+        )
+        .join(User, User.id == Employee.user_id)
+        .outerjoin(Attendance, and_(Attendance.employee_id == Employee.user_id, Attendance.date == day))
+        .outerjoin(Department, Department.id == Employee.department_id)
+    )
     if current_user.role == "team_lead":
-        emp_query = emp_query.filter(Employee.manager_id == current_user.id)
-    members = emp_query.all()
-
-    result = []
-    for emp in members:
-        user = db.query(User).filter(User.id == emp.user_id).first()
-        if not user:
-            continue
-        record = db.query(Attendance).filter(
-            Attendance.employee_id == emp.user_id,
-            Attendance.date == day,
-        ).first()
-        dept = db.query(Department).filter(Department.id == emp.department_id).first() if emp.department_id else None
-        result.append({
-            "employee_id": emp.employee_id,
-            "user_id": emp.user_id,
-            "employee_name": user.full_name,
-            "department": dept.name if dept else None,
-            "position": emp.position,
-            "date": day.isoformat(),
-            "status": record.status if record else "absent",
-            "check_in": str(record.check_in) if record and record.check_in else None,
-            "check_out": str(record.check_out) if record and record.check_out else None,
-            "hours_worked": record.hours_worked if record else None,
-        })
-    return result
\ No newline at end of file
+        query = query.filter(Employee.user_id.in_(org_chart.direct_reports(db, current_user.id)))
+
+    day_iso = day.isoformat()
+
+    def serialize(row):
+        return {
+            "employee_id": row.employee_id,
+            "user_id": row.user_id,
+            "employee_name": User.format_full_name(row.first_name, row.last_name, row.email),
+            "department": row.department,
+            "position": row.position,
+            "date": day_iso,
+            "status": row.status or "absent",
+            "check_in": str(row.check_in) if row.check_in else None,
+            "check_out": str(row.check_out) if row.check_out else None,
+            "hours_worked": row.hours_worked,
+        }
+
+    query = query.order_by(Employee.id)
+    if stream:
+        return ndjson_response(query, serialize)
+    return [serialize(row) for row in query.all()]
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import Optional
 from ..database import get_db
 from ..models.user import User
 from ..models.employee import Employee
@@ -9,7 +11,11 @@ from ..models.department import Department
 from ..models.access_request import AccessRequest
 from ..schemas.user import UserCreate, UserLogin, Token, UserResponse, UserProfileUpdate
 from ..schemas.access_request import AccessRequestCreate, AccessRequestResponse
-from ..auth import verify_password, get_password_hash, create_access_token, create_refresh_token, get_current_user, verify_token
+from ..auth import verify_password, get_password_hash, create_access_token, create_refresh_token, get_current_user, verify_token, require_role
+from ..utils.principal_cache import principal_cache
+from ..utils.password_hashing import hash_pool, password_policy
+from ..utils.sequences import next_employee_id
+from ..utils.image_variants import store_image
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -85,18 +91,15 @@ def create_access_request(request_data: AccessRequestCreate, db: Session = Depen
             detail=f"Failed to create access request: {str(e)}"
         )
 
-@router.post("/login", response_model=Token)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == credentials.email).first()
-    
-    if not user or not verify_password(credentials.password, user.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid credentials"
-        )
-    
+def _find_user_by_email(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
+
+
+def _complete_login(user: User, db: Session, upgraded_hash: Optional[str] = None) -> Token:
     # Update last login
     user.last_login = datetime.utcnow()
+    if upgraded_hash:
+        user.hashed_password = upgraded_hash
     db.commit()
     
     # Create tokens
@@ -113,6 +116,26 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
         user=user_response
     )
 
+@router.post("/login", response_model=Token)
+async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+    # DB work runs on the threadpool; bcrypt runs on the bounded hashing pool,
+    # so a login burst never holds request threads while it waits to hash.
+    user = await run_in_threadpool(_find_user_by_email, db, credentials.email)
+    
+    if not user or not await hash_pool.run_async(verify_password, credentials.password, user.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid credentials"
+        )
+    
+    # Upgrade legacy sha256 and under-cost bcrypt hashes while the plaintext is
+    # at hand. Temporary passwords are about to be replaced, so leave those.
+    upgraded_hash = None
+    if not user.temp_password and password_policy.needs_rehash(user.hashed_password):
+        upgraded_hash = await hash_pool.run_async(password_policy.hash, credentials.password)
+    
+    return await run_in_threadpool(_complete_login, user, db, upgraded_hash)
+
 @router.get("/me", response_model=UserResponse)
 def get_current_user_info(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     user_response = UserResponse.from_orm(current_user)
@@ -143,6 +166,16 @@ def refresh_token(refresh_token: str, db: Session = Depends(get_db)):
 def logout(current_user: User = Depends(get_current_user)):
     return {"message": "Successfully logged out"}
 
+@router.get("/principal-cache/stats")
+def get_principal_cache_stats(current_user: User = Depends(require_role(["admin"]))):
+    """Hit rate of the authenticated-user cache used by get_current_user"""
+    return principal_cache.stats()
+
+@router.get("/password-hashing/stats")
+def get_password_hashing_stats(current_user: User = Depends(require_role(["admin"]))):
+    """Queue depth and latency of the bcrypt executors, and the active cost policy"""
+    return {**hash_pool.stats(), "policy": password_policy.describe()}
+
 @router.get("/profile/me")
 def get_profile_status(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     employee = db.query(Employee).filter(Employee.user_id == current_user.id).first()
@@ -178,8 +211,7 @@ def complete_profile(
     employee = db.query(Employee).filter(Employee.user_id == current_user.id).first()
     if not employee:
         # Generate employee ID
-        employee_count = db.query(Employee).count()
-        employee_id = f"EMP{str(employee_count + 1).zfill(4)}"
+        employee_id = next_employee_id(db)
         
         employee = Employee(
             user_id=current_user.id,
@@ -321,8 +353,7 @@ def update_profile(
         # Get or create employee record
         employee = db.query(Employee).filter(Employee.user_id == current_user.id).first()
         if not employee:
-            employee_count = db.query(Employee).count()
-            employee_id = f"EMP{str(employee_count + 1).zfill(4)}"
+            employee_id = next_employee_id(db)
             employee = Employee(
                 user_id=current_user.id,
                 employee_id=employee_id,
@@ -367,6 +398,8 @@ def update_profile(
         for field in employee_fields:
             value = getattr(profile_data, field, None)
             if value is not None:
+                if field in ('avatar_url', 'cover_image_url'):
+                    value = store_image(value, "avatar" if field == 'avatar_url' else "thumb")
                 setattr(employee, field, value)
         
         # Handle technical skills
@@ -437,8 +470,7 @@ def complete_onboarding(
         if not employee:
             # Generate employee ID if not provided
             if not onboarding_data.employee_id:
-                employee_count = db.query(Employee).count()
-                employee_id = f"EMP{str(employee_count + 1).zfill(4)}"
+                employee_id = next_employee_id(db)
             else:
                 employee_id = onboarding_data.employee_id
             
@@ -512,7 +544,7 @@ def complete_onboarding(
         
         # Set profile picture to avatar_url for employee
         if onboarding_data.profile_picture:
-            employee.avatar_url = onboarding_data.profile_picture
+            employee.avatar_url = store_image(onboarding_data.profile_picture, "avatar")
         
         # Handle technical skills
         if onboarding_data.technical_skills:
@@ -583,8 +615,38 @@ class ResetPasswordRequest(BaseModel):
     new_password: str
     confirm_password: str
 
+def _store_new_password(current_user: User, hashed_password: str, db: Session) -> dict:
+    # Check if user had temp password (new user)
+    had_temp_password = bool(current_user.temp_password)
+    
+    # Update password
+    current_user.hashed_password = hashed_password
+    current_user.temp_password = None  # Clear temp password
+    db.commit()
+    
+    # Determine next redirect - new employees go to onboarding
+    next_redirect = None
+    if had_temp_password:
+        # Check if employee record exists and has complete data
+        employee = db.query(Employee).filter(Employee.user_id == current_user.id).first()
+        if not employee or not employee.first_name:
+            next_redirect = "/onboarding"
+        else:
+            role_redirects = {
+                "admin": "/admin/dashboard",
+                "hr": "/admin/dashboard",
+                "team_lead": "/team-lead/dashboard",
+                "employee": "/employee/dashboard"
+            }
+            next_redirect = role_redirects.get(current_user.role, "/employee/dashboard")
+    
+    return {
+        "message": "Password changed successfully",
+        "redirect_url": next_redirect
+    }
+
 @router.post("/change-password")
-def change_password(
+async def change_password(
     request: ChangePasswordRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -594,7 +656,7 @@ def change_password(
     password_valid = False
     if current_user.temp_password and request.current_password == current_user.temp_password:
         password_valid = True
-    elif verify_password(request.current_password, current_user.hashed_password):
+    elif await hash_pool.run_async(verify_password, request.current_password, current_user.hashed_password):
         password_valid = True
     
     if not password_valid:
@@ -616,34 +678,8 @@ def change_password(
             detail="Password must be at least 6 characters long"
         )
     
-    # Check if user had temp password (new user)
-    had_temp_password = bool(current_user.temp_password)
-    
-    # Update password
-    current_user.hashed_password = get_password_hash(request.new_password)
-    current_user.temp_password = None  # Clear temp password
-    db.commit()
-    
-    # Determine next redirect - new employees go to onboarding
-    next_redirect = None
-    if had_temp_password:
-        # Check if employee record exists and has complete data
-        employee = db.query(Employee).filter(Employee.user_id == current_user.id).first()
-        if not employee or not employee.first_name:
-            next_redirect = "/onboarding"
-        else:
-            role_redirects = {
-                "admin": "/admin/dashboard",
-                "hr": "/admin/dashboard",
-                "team_lead": "/team-lead/dashboard",
-                "employee": "/employee/dashboard"
-            }
-            next_redirect = role_redirects.get(current_user.role, "/employee/dashboard")
-    
-    return {
-        "message": "Password changed successfully",
-        "redirect_url": next_redirect
-    }
+    hashed_password = await hash_pool.run_async(get_password_hash, request.new_password)
+    return await run_in_threadpool(_store_new_password, current_user, hashed_password, db)
 
 @router.post("/reset-password")
 def reset_password(
@@ -680,7 +716,7 @@ def reset_password(
         )
     
     # Update password and clear temp password
-    user.hashed_password = get_password_hash(request.new_password)
+    user.hashed_password = hash_pool.run(get_password_hash, request.new_password)
     user.temp_password = None
     db.commit()
     
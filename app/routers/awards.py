@@ -28,6 +28,8 @@ from ..models.award import Award, AwardNomination
 from ..models.employee import Employee
 from ..models.user import User
 from ..models.department import Department
+from ..utils.image_variants import thumbnail_url
+from ..utils.search_index import search_department_ids, search_employee_ids, search_positions
 from ..schemas.award import (
     AwardCreate,
     AwardResponse,
@@ -52,7 +54,7 @@ def _enrich_nomination(nom: AwardNomination) -> dict:
         **{c.key: getattr(nom, c.key) for c in nom.__table__.columns},
         "nominee_name": f"{user.first_name} {user.last_name}" if user else None,
         "nominee_position": emp.position if emp else None,
-        "nominee_avatar": emp.avatar_url if emp else None,
+        "nominee_avatar": thumbnail_url(emp.avatar_url, "avatar") if emp else None,
         "nominee_department": dept,
         "nominated_by_name": (
             f"{nominator.first_name} {nominator.last_name}" if nominator else None
@@ -68,7 +70,7 @@ def _enrich_award(award: Award) -> dict:
     return {
         **{c.key: getattr(award, c.key) for c in award.__table__.columns},
         "employee_name": f"{user.first_name} {user.last_name}" if user else None,
-        "employee_avatar": emp.avatar_url if emp else None,
+        "employee_avatar": thumbnail_url(emp.avatar_url, "avatar") if emp else None,
         "employee_position": emp.position if emp else None,
         "employee_department": dept,
         "granted_by_name": (
@@ -317,6 +319,10 @@ def delete_award(
 
 # ─── Global Search ───────────────────────────────────────────────────────────
 
+# Same columns the old ilike filter covered
+EMPLOYEE_SEARCH_COLUMNS = ["name", "email", "employee_id", "position"]
+
+
 @router.get("/search/global", response_model=List[SearchResult])
 def global_search(
     query: str = Query(..., min_length=2),
@@ -331,40 +337,57 @@ def global_search(
     q = f"%{query}%"
 
     # ── Employees ──
-    employees = (
-        db.query(Employee)
+    # Ranked FTS5 lookup (app/utils/search_index.py); ilike scan elsewhere.
+    employee_rows = (
+        db.query(Employee.id, User.first_name, User.last_name, Employee.position,
+                 Department.name.label("department_name"), Employee.avatar_url)
         .join(User, Employee.user_id == User.id)
-        .filter(
+        .outerjoin(Department, Department.id == Employee.department_id)
+    )
+    employee_ids = search_employee_ids(db, query, limit=10, columns=EMPLOYEE_SEARCH_COLUMNS)
+    if employee_ids is None:
+        employee_rows = employee_rows.filter(
             (User.first_name.ilike(q))
             | (User.last_name.ilike(q))
             | (User.email.ilike(q))
             | (Employee.employee_id.ilike(q))
             | (Employee.position.ilike(q))
-        )
-        .limit(10)
-        .all()
-    )
-    for emp in employees:
-        u = emp.user
+        ).limit(10).all()
+    elif employee_ids:
+        order = {eid: i for i, eid in enumerate(employee_ids)}
+        employee_rows = sorted(employee_rows.filter(Employee.id.in_(employee_ids)).all(), key=lambda r: order[r.id])
+    else:
+        employee_rows = []
+    for emp in employee_rows:
         role_prefix = "/admin"  # fallback; frontend can override
         results.append(
             {
                 "category": "Employees",
                 "id": emp.id,
-                "label": f"{u.first_name} {u.last_name}",
-                "subtitle": f"{emp.position or ''} · {emp.department.name if emp.department else ''}".strip(" ·"),
-                "avatar": emp.avatar_url,
+                "label": f"{emp.first_name} {emp.last_name}",
+                "subtitle": f"{emp.position or ''} · {emp.department_name or ''}".strip(" ·"),
+                "avatar": thumbnail_url(emp.avatar_url, "avatar"),
                 "route": f"{role_prefix}/employees",
             }
         )
 
     # ── Departments ──
-    departments = (
-        db.query(Department)
-        .filter(Department.name.ilike(q))
-        .limit(5)
-        .all()
-    )
+    department_ids = search_department_ids(db, query, limit=5) or []
+    departments = []
+    if department_ids:
+        order = {did: i for i, did in enumerate(department_ids)}
+        departments = sorted(
+            db.query(Department).filter(Department.id.in_(department_ids)).all(),
+            key=lambda d: order[d.id],
+        )
+    if len(departments) < 5:
+        # The table is tiny; ilike adds the mid-word matches prefix search misses.
+        departments += (
+            db.query(Department)
+            .filter(Department.name.ilike(q), Department.id.notin_(department_ids))
+            .limit(5 - len(departments))
+            .all()
+        )
     for dept in departments:
         results.append(
             {
@@ -378,15 +401,17 @@ def global_search(
         )
 
     # ── Positions (from Employee.position string column) ──
-    from sqlalchemy import distinct
-
-    positions = (
-        db.query(distinct(Employee.position))
-        .filter(Employee.position.ilike(q))
-        .limit(5)
-        .all()
-    )
-    for (pos,) in positions:
+    positions = search_positions(db, query, limit=5)
+    if positions is None:
+        from sqlalchemy import distinct
+
+        positions = [
+            pos for (pos,) in db.query(distinct(Employee.position))
+            .filter(Employee.position.ilike(q))
+            .limit(5)
+            .all()
+        ]
+    for pos in positions:
         if pos:
             results.append(
                 {
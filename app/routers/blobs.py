@@ -0,0 +1,96 @@
+"""
+Blob router — serves content-addressed image bytes (app/utils/blob_store.py).
+
+Endpoints:
+  GET    /api/blobs/{sha256}              – the blob; honours If-None-Match and Range
+  GET    /api/blobs/{sha256}/{variant}    – its WebP thumbnail (app/utils/image_variants.py)
+
+No login: <img> tags cannot send the bearer token. A blob URL is the sha256
+of its bytes, so it can only be found in an authenticated response (or by
+someone who already holds the image).
+"""
+import os
+import re
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
+
+from ..utils.blob_store import blob_store, sniff_type
+from ..utils.image_variants import MEDIA_TYPE, VARIANTS, queue_variants, variant_pipeline
+
+router = APIRouter(prefix="/api/blobs", tags=["blobs"])
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) inclusive for a single `bytes=` range; None means serve it all.
+    Raises 416 for a range that lies outside the blob."""
+    match = _RANGE.match((header or "").replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        return None  # absent, malformed or multi-range: a full 200 is allowed
+    first, last = match.groups()
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(0, size - int(last)), size - 1
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+def _serve(path: str, etag: str, media_type: str, request: Request):
+    headers = {
+        "ETag": etag,
+        # The URL names the bytes, so they never change under it.
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes",
+        "X-Content-Type-Options": "nosniff",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [
+        tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+    ]):
+        return Response(status_code=304, headers=headers)
+
+    size = os.path.getsize(path)
+    if_range = request.headers.get("if-range")
+    byte_range = _byte_range(request.headers.get("range"), size) if not if_range or if_range == etag else None
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    return StreamingResponse(
+        blob_store.read_range(path, start, end),
+        status_code=206,
+        media_type=media_type,
+        headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(end - start + 1)},
+    )
+
+
+@router.get("/{digest}")
+def get_blob(digest: str, request: Request):
+    path = blob_store.locate(digest)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    with open(path, "rb") as blob:
+        media_type = sniff_type(blob.read(16))
+    return _serve(path, f'"{digest}"', media_type, request)
+
+
+@router.get("/{digest}/{variant}")
+def get_blob_variant(digest: str, variant: str, request: Request):
+    if variant not in VARIANTS or blob_store.locate(digest) is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    path = variant_pipeline.path(digest, variant)
+    if os.path.exists(path):
+        return _serve(path, f'"{digest}-{VARIANTS[variant]}"', MEDIA_TYPE, request)
+    # Not rendered yet (or not renderable): the original will do meanwhile.
+    queue_variants(blob_store.url(digest), variant)
+    return RedirectResponse(blob_store.url(digest), status_code=307, headers={"Cache-Control": "no-store"})
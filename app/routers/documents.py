@@ -242,7 +242,7 @@ def delete_document(
     return {"message": "Document deleted successfully"}
 
 @router.post("/upload")
-async def upload_document(
+def upload_document(
     file: UploadFile = File(...),
     employee_id: Optional[int] = None,
     document_type: Optional[str] = None,
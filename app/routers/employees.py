@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from sqlalchemy.orm import Session, aliased
 from typing import List, Optional
+from app.config import settings
 from app.database import get_db
 from app.models.employee import Employee
 from app.models.skill import EmployeeSkill
@@ -9,6 +10,10 @@ from app.models.department import Department
 from app.models.currency import Currency
 from app.auth import get_current_user
 from app.schemas.employee import EmployeeCreate, EmployeeUpdate, EmployeeResponse
+from app.utils.employee_import import EmployeeImporter, iter_json_rows, iter_upload_rows
+from app.utils.image_variants import store_image, thumbnail_url
+from app.utils.sequences import next_employee_id, note_employee_ids, peek_employee_id
+from app.utils.search_index import search_employee_ids
 from pydantic import BaseModel
 from typing import Optional
 
@@ -33,7 +38,7 @@ class EmployeeCreateRequest(BaseModel):
     employee: EmployeeCreate
     
 class EmployeeCreateData(BaseModel):
-    employee_id: str
+    employee_id: Optional[str] = None  # allocated from the sequence when empty
     position: Optional[str] = None
     position_id: Optional[int] = None
     department_id: Optional[int] = None
@@ -61,19 +66,27 @@ def search_employees(
     Search employees by name for manager assignment
     """
     try:
-        # Search employees by first_name or last_name
-        employees = db.query(Employee).join(User).filter(
-            (User.first_name.ilike(f"%{query}%")) | 
-            (User.last_name.ilike(f"%{query}%"))
-        ).limit(10).all()
+        rows = db.query(Employee.id, User.first_name, User.last_name, Employee.position).join(
+            User, User.id == Employee.user_id
+        )
+        # Ranked full-text match on names; ilike scan where FTS5 is unavailable
+        ids = search_employee_ids(db, query, limit=10, columns=["name"])
+        if ids is None:
+            rows = rows.filter(
+                (User.first_name.ilike(f"%{query}%")) | 
+                (User.last_name.ilike(f"%{query}%"))
+            ).limit(10).all()
+        else:
+            order = {eid: i for i, eid in enumerate(ids)}
+            rows = sorted(rows.filter(Employee.id.in_(ids)).all(), key=lambda r: order[r.id]) if ids else []
         
         # Format response with employee names
         results = []
-        for employee in employees:
-            full_name = f"{employee.user.first_name} {employee.user.last_name}"
+        for row in rows:
+            full_name = f"{row.first_name} {row.last_name}"
             results.append({
                 "value": full_name,
-                "label": f"{full_name} - {employee.position or 'Employee'}"
+                "label": f"{full_name} - {row.position or 'Employee'}"
             })
         
         return {"employees": results}
@@ -194,10 +207,148 @@ def get_my_profile(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching employee profile: {str(e)}")
 
+# ── Employee list projections ───────────────────────────────────────────────
+# Each output key maps to the labelled columns it needs and how to render
+# them. GET / selects only the columns behind the requested keys, joins
+# department / manager only when asked for, and serializes straight from the
+# result tuples.
+
+_ManagerEmployee = aliased(Employee)
+_ManagerUser = aliased(User)
+
+
+def _column(column, label, render=None):
+    column = column.label(label)
+    if render is None:
+        return [column], lambda row: row[label]
+    return [column], lambda row: render(row[label]) if row[label] else None
+
+
+def _constant(value):
+    return [], lambda row: value
+
+
+_EMPLOYEE_FIELDS = {
+    # Employee table fields
+    "id": _column(Employee.id, "id"),
+    "user_id": _column(Employee.user_id, "user_id"),
+    "employee_id": _column(Employee.employee_id, "employee_id"),
+    "department_id": _column(Employee.department_id, "department_id"),
+    "position": _column(Employee.position, "position"),
+    "employment_type": _column(Employee.employment_type, "employment_type"),
+    "employment_status": _column(Employee.employment_status, "employment_status"),
+    "hire_date": _column(Employee.hire_date, "hire_date", str),
+    "salary": _column(Employee.salary, "salary"),
+    "manager_id": _column(Employee.manager_id, "manager_id"),
+    "work_location": _column(Employee.work_location, "work_location"),
+    "work_type": _column(Employee.work_type, "work_type"),
+    "gender": _column(Employee.gender, "gender"),
+    "date_of_birth": _column(Employee.date_of_birth, "date_of_birth", str),
+    "marital_status": _column(Employee.marital_status, "marital_status"),
+    "address": _column(Employee.address, "address"),
+    "emergency_contact_name": _column(Employee.emergency_contact_name, "emergency_contact_name"),
+    "emergency_contact_phone": _column(Employee.emergency_contact_phone, "emergency_contact_phone"),
+    "blood_group": _column(Employee.blood_group, "blood_group"),
+    "qualification": _column(Employee.qualification, "qualification"),
+    "work_schedule": _column(Employee.work_schedule, "work_schedule"),
+    "team_size": _column(Employee.team_size, "team_size"),
+    "avatar_url": _column(Employee.avatar_url, "avatar_url"),
+    "avatar_thumbnail_url": _column(Employee.avatar_url, "avatar_url", lambda url: thumbnail_url(url, "avatar")),
+    "cover_image_url": _column(Employee.cover_image_url, "cover_image_url"),
+    "emergency_contact_relationship": _column(Employee.emergency_contact_relationship, "emergency_contact_relationship"),
+    "emergency_contact_work_phone": _column(Employee.emergency_contact_work_phone, "emergency_contact_work_phone"),
+    "emergency_contact_home_phone": _column(Employee.emergency_contact_home_phone, "emergency_contact_home_phone"),
+    "emergency_contact_address": _column(Employee.emergency_contact_address, "emergency_contact_address"),
+    "bonus_target": _column(Employee.bonus_target, "bonus_target"),
+    "stock_options": _column(Employee.stock_options, "stock_options"),
+    "last_salary_increase": _column(Employee.last_salary_increase, "last_salary_increase"),
+    "next_review_date": _column(Employee.next_review_date, "next_review_date", str),
+    "personal_email": _column(Employee.personal_email, "personal_email"),
+    "nationality": _column(Employee.nationality, "nationality"),
+    "religion": _column(Employee.religion, "religion"),
+    "languages_known": _column(Employee.languages_known, "languages_known"),
+    "hobbies": _column(Employee.hobbies, "hobbies"),
+    "skills_summary": _column(Employee.skills_summary, "skills_summary"),
+    "certifications": _column(Employee.certifications, "certifications"),
+    "education_level": _column(Employee.education_level, "education_level"),
+    "university": _column(Employee.university, "university"),
+    "graduation_year": _column(Employee.graduation_year, "graduation_year"),
+    "currency_id": _constant(None),  # no such column on Employee
+    "salary_in_words": _column(Employee.salary_in_words, "salary_in_words"),
+    "created_at": _column(Employee.created_at, "created_at", lambda v: v.isoformat()),
+    "updated_at": _column(Employee.updated_at, "updated_at", lambda v: v.isoformat()),
+
+    # User table fields
+    "email": _column(User.email, "user_email"),
+    "title": _column(User.title, "user_title"),
+    "first_name": _column(User.first_name, "user_first_name"),
+    "last_name": _column(User.last_name, "user_last_name"),
+    "name": (
+        [User.first_name.label("user_first_name"), User.last_name.label("user_last_name")],
+        lambda row: f"{row['user_first_name']} {row['user_last_name']}",
+    ),
+    "phone": _column(User.phone, "user_phone"),
+    "role": _column(User.role, "user_role"),
+    "status": _column(User.status, "user_status"),
+    "is_profile_complete": _column(User.is_profile_complete, "user_is_profile_complete"),
+    "profile_picture": _column(User.profile_picture, "user_profile_picture"),
+    "temp_password": _column(User.temp_password, "user_temp_password"),  # admin only, see get_employees
+    "user_created_at": _column(User.created_at, "user_created_at", lambda v: v.isoformat()),
+    "user_updated_at": _column(User.updated_at, "user_updated_at", lambda v: v.isoformat()),
+    "last_login": _column(User.last_login, "user_last_login", str),
+    "active": _constant(True),  # no such column on User
+
+    # Computed fields
+    "department": (
+        [Department.name.label("department_name")],
+        lambda row: row["department_name"] or "Unknown",
+    ),
+    "manager": (
+        [_ManagerUser.id.label("manager_user_id"),
+         _ManagerUser.first_name.label("manager_first_name"),
+         _ManagerUser.last_name.label("manager_last_name")],
+        lambda row: f"{row['manager_first_name']} {row['manager_last_name']}" if row["manager_user_id"] else None,
+    ),
+}
+
+EMPLOYEE_PROJECTIONS = {
+    "full": list(_EMPLOYEE_FIELDS),
+    "directory": [
+        "id", "user_id", "employee_id", "title", "first_name", "last_name", "name", "email", "phone",
+        "role", "status", "department_id", "department", "position", "manager_id", "manager",
+        "avatar_url", "avatar_thumbnail_url", "profile_picture", "work_location", "work_type", "employment_status", "hire_date",
+    ],
+    "payroll": [
+        "id", "user_id", "employee_id", "first_name", "last_name", "name", "email", "status",
+        "department_id", "department", "position", "employment_type", "employment_status", "hire_date",
+        "salary", "salary_in_words", "currency_id", "bonus_target", "stock_options",
+        "last_salary_increase", "next_review_date",
+    ],
+}
+
+
+def _employee_list_query(db: Session, keys: List[str]):
+    columns = {}
+    for key in keys:
+        for column in _EMPLOYEE_FIELDS[key][0]:
+            columns.setdefault(column.name, column)
+    query = db.query(*columns.values()).select_from(Employee).join(User, User.id == Employee.user_id)
+    if "department" in keys:
+        query = query.outerjoin(Department, Department.id == Employee.department_id)
+    if "manager" in keys:
+        query = (
+            query.outerjoin(_ManagerEmployee, _ManagerEmployee.id == Employee.manager_id)
+            .outerjoin(_ManagerUser, _ManagerUser.id == _ManagerEmployee.user_id)
+        )
+    return query
+
+
 @router.get("/")
 def get_employees(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    projection: str = Query("full", description="directory, full or payroll"),
+    fields: Optional[str] = Query(None, description="Comma-separated keys; overrides projection"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -206,89 +357,30 @@ def get_employees(
         if current_user.role not in ["admin", "hr"]:
             raise HTTPException(status_code=403, detail="Not authorized")
         
-        employees = db.query(Employee).join(User).offset(skip).limit(limit).all()
+        if fields:
+            keys = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+            unknown = [k for k in keys if k not in _EMPLOYEE_FIELDS]
+            if unknown or not keys:
+                raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(unknown)}")
+        elif projection in EMPLOYEE_PROJECTIONS:
+            keys = EMPLOYEE_PROJECTIONS[projection]
+        else:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Unknown projection; use one of: {', '.join(EMPLOYEE_PROJECTIONS)}"
+            )
+        
+        rows = _employee_list_query(db, keys).order_by(Employee.id).offset(skip).limit(limit).all()
+        renderers = [(key, _EMPLOYEE_FIELDS[key][1]) for key in keys]
+        hide_temp_password = current_user.role != "admin"
         
         result = []
-        for emp in employees:
-            try:
-                dept_name = emp.department.name if emp.department else "Unknown"
-                manager_name = None
-                if emp.manager and emp.manager.user:
-                    manager_name = f"{emp.manager.user.first_name} {emp.manager.user.last_name}"
-                
-                result.append({
-                    # Employee table fields
-                    "id": emp.id,
-                    "user_id": emp.user_id,
-                    "employee_id": emp.employee_id,
-                    "department_id": emp.department_id,
-                    "position": emp.position,
-                    "employment_type": getattr(emp, 'employment_type', None),
-                    "employment_status": emp.employment_status,
-                    "hire_date": str(emp.hire_date) if emp.hire_date else None,
-                    "salary": emp.salary,
-                    "manager_id": emp.manager_id,
-                    "work_location": emp.work_location,
-                    "work_type": getattr(emp, 'work_type', None),
-                    "gender": getattr(emp, 'gender', None),
-                    "date_of_birth": str(emp.date_of_birth) if getattr(emp, 'date_of_birth', None) else None,
-                    "marital_status": getattr(emp, 'marital_status', None),
-                    "address": getattr(emp, 'address', None),
-                    "emergency_contact_name": getattr(emp, 'emergency_contact_name', None),
-                    "emergency_contact_phone": getattr(emp, 'emergency_contact_phone', None),
-                    "blood_group": getattr(emp, 'blood_group', None),
-                    "qualification": getattr(emp, 'qualification', None),
-                    "work_schedule": getattr(emp, 'work_schedule', None),
-                    "team_size": getattr(emp, 'team_size', None),
-                    "avatar_url": getattr(emp, 'avatar_url', None),
-                    "cover_image_url": getattr(emp, 'cover_image_url', None),
-                    "emergency_contact_relationship": getattr(emp, 'emergency_contact_relationship', None),
-                    "emergency_contact_work_phone": getattr(emp, 'emergency_contact_work_phone', None),
-                    "emergency_contact_home_phone": getattr(emp, 'emergency_contact_home_phone', None),
-                    "emergency_contact_address": getattr(emp, 'emergency_contact_address', None),
-                    "bonus_target": getattr(emp, 'bonus_target', None),
-                    "stock_options": getattr(emp, 'stock_options', None),
-                    "last_salary_increase": getattr(emp, 'last_salary_increase', None),
-                    "next_review_date": str(emp.next_review_date) if getattr(emp, 'next_review_date', None) else None,
-                    "personal_email": getattr(emp, 'personal_email', None),
-                    "nationality": getattr(emp, 'nationality', None),
-                    "religion": getattr(emp, 'religion', None),
-                    "languages_known": getattr(emp, 'languages_known', None),
-                    "hobbies": getattr(emp, 'hobbies', None),
-                    "skills_summary": getattr(emp, 'skills_summary', None),
-                    "certifications": getattr(emp, 'certifications', None),
-                    "education_level": getattr(emp, 'education_level', None),
-                    "university": getattr(emp, 'university', None),
-                    "graduation_year": getattr(emp, 'graduation_year', None),
-                    "currency_id": getattr(emp, 'currency_id', None),
-                    "salary_in_words": getattr(emp, 'salary_in_words', None),
-                    "created_at": emp.created_at.isoformat() if emp.created_at else None,
-                    "updated_at": emp.updated_at.isoformat() if getattr(emp, 'updated_at', None) else None,
-                    
-                    # User table fields
-                    "email": emp.user.email,
-                    "title": getattr(emp.user, 'title', None),
-                    "first_name": emp.user.first_name,
-                    "last_name": emp.user.last_name,
-                    "name": f"{emp.user.first_name} {emp.user.last_name}",
-                    "phone": emp.user.phone,
-                    "role": emp.user.role,
-                    "status": getattr(emp.user, 'status', 'active'),
-                    "is_profile_complete": getattr(emp.user, 'is_profile_complete', False),
-                    "profile_picture": getattr(emp.user, 'profile_picture', None),
-                    "temp_password": emp.user.temp_password if current_user.role == "admin" else None,
-                    "user_created_at": emp.user.created_at.isoformat() if emp.user.created_at else None,
-                    "user_updated_at": emp.user.updated_at.isoformat() if getattr(emp.user, 'updated_at', None) else None,
-                    "last_login": str(emp.user.last_login) if getattr(emp.user, 'last_login', None) else None,
-                    "active": getattr(emp.user, 'active', True),
-                    
-                    # Computed fields
-                    "department": dept_name,
-                    "manager": manager_name
-                })
-            except Exception as emp_error:
-                print(f"Error processing employee {emp.id}: {str(emp_error)}")
-                continue
+        for row in rows:
+            row = row._mapping
+            item = {key: render(row) for key, render in renderers}
+            if hide_temp_password and "temp_password" in item:
+                item["temp_password"] = None
+            result.append(item)
         
         return result
     except HTTPException:
@@ -351,7 +443,7 @@ def create_employee(
     
     employee = Employee(
         user_id=user.id,
-        employee_id=request.employee.employee_id,
+        employee_id=request.employee.employee_id or next_employee_id(db),
         position=position_title,
         position_id=request.employee.position_id,
         department_id=request.employee.department_id,
@@ -371,6 +463,7 @@ def create_employee(
     
     try:
         db.add(employee)
+        note_employee_ids(db, [employee.employee_id])
         db.commit()
         db.refresh(employee)
         
@@ -491,28 +584,20 @@ def generate_employee_id(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Generate next available employee ID"""
+    """Preview the next employee ID (EMP0001, EMP0002, ...).
+
+    Nothing is reserved, so two forms opened at once see the same ID. Leave
+    employee_id empty on create to have the number allocated then.
+    """
     if current_user.role not in ["admin", "hr"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Get the highest employee ID number
-    employees = db.query(Employee).all()
-    max_num = 0
-    
-    for emp in employees:
-        if emp.employee_id and emp.employee_id.startswith("EMP"):
-            try:
-                num = int(emp.employee_id[3:])  # Remove "EMP" prefix
-                max_num = max(max_num, num)
-            except ValueError:
-                continue
-    
-    next_id = f"EMP{max_num + 1:03d}"  # Format as EMP001, EMP002, etc.
-    return {"employee_id": next_id}
+    return {"employee_id": peek_employee_id(db)}
 
 @router.post("/import")
 def import_employees(
     request: dict,
+    chunk_size: int = Query(settings.employee_import_chunk_size, ge=1, le=5000),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -524,104 +609,25 @@ def import_employees(
     if not employees_data:
         raise HTTPException(status_code=400, detail="No employee data provided")
     
-    success_count = 0
-    failed_count = 0
-    errors = []
-    
-    for index, emp_data in enumerate(employees_data):
-        try:
-            # Generate secure temporary password
-            from app.utils.temp_password import generate_temp_password
-            password_data = generate_temp_password(length=12, include_symbols=False)
-            temp_password = password_data['temp_password']
-            hashed_password = password_data['hashed_password']
-            
-            # Check if email already exists
-            existing_user = db.query(User).filter(User.email == emp_data.get('email')).first()
-            if existing_user:
-                errors.append({
-                    "row": index + 1,
-                    "field": "email",
-                    "message": "Email already exists",
-                    "data": emp_data
-                })
-                failed_count += 1
-                continue
-            
-            # Create user
-            user = User(
-                title=emp_data.get('title'),
-                first_name=emp_data.get('first_name'),
-                last_name=emp_data.get('last_name'),
-                email=emp_data.get('email'),
-                phone=emp_data.get('phone'),
-                role=emp_data.get('role', 'employee'),
-                status="active",
-                hashed_password=hashed_password,
-                temp_password=temp_password
-            )
-            db.add(user)
-            db.flush()
-            
-            # Find department by name
-            department = None
-            if emp_data.get('department'):
-                department = db.query(Department).filter(Department.name == emp_data.get('department')).first()
-            
-            # Find position by title
-            position = None
-            if emp_data.get('position'):
-                from app.models.position import Position
-                position = db.query(Position).filter(Position.title == emp_data.get('position')).first()
-            
-            # Parse hire date
-            hire_date = None
-            if emp_data.get('hire_date'):
-                from datetime import datetime
-                try:
-                    hire_date = datetime.strptime(emp_data.get('hire_date'), '%Y-%m-%d').date()
-                except ValueError:
-                    pass
-            
-            # Create employee
-            employee = Employee(
-                user_id=user.id,
-                employee_id=emp_data.get('employee_id'),
-                position=emp_data.get('position'),
-                position_id=position.id if position else None,
-                department_id=department.id if department else None,
-                employment_type=emp_data.get('employment_type'),
-                employment_status=emp_data.get('employment_status', 'full_time'),
-                hire_date=hire_date,
-                salary=float(emp_data.get('salary', 0)) if emp_data.get('salary') else None,
-                work_location=emp_data.get('work_location', 'office')
-            )
-            
-            # Set optional fields
-            if hasattr(employee, 'work_schedule'):
-                employee.work_schedule = emp_data.get('work_schedule')
-            if hasattr(employee, 'work_type'):
-                employee.work_type = emp_data.get('work_type')
-            
-            db.add(employee)
-            db.commit()
-            success_count += 1
-            
-        except Exception as e:
-            db.rollback()
-            errors.append({
-                "row": index + 1,
-                "field": "general",
-                "message": str(e),
-                "data": emp_data
-            })
-            failed_count += 1
+    return EmployeeImporter(db, chunk_size).run(iter_json_rows(employees_data))
+
+@router.post("/import/upload")
+def import_employees_upload(
+    file: UploadFile = File(...),
+    chunk_size: int = Query(settings.employee_import_chunk_size, ge=1, le=5000),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Bulk import employees from an uploaded .csv or .ndjson file"""
+    if current_user.role not in ["admin", "hr"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
     
-    return {
-        "success": success_count,
-        "failed": failed_count,
-        "errors": errors
-    }
+    try:
+        rows = iter_upload_rows(file.file, file.filename, file.content_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Failures from here on are reported per row in the summary
+    return EmployeeImporter(db, chunk_size).run(rows)
 
 @router.get("/departments")
 def get_departments(
@@ -646,11 +652,12 @@ def update_profile_images(
         raise HTTPException(status_code=404, detail="Employee record not found")
     
     # Update the profile images
+    # Data URIs go to the blob store; the columns keep its URL.
     if request.avatar is not None:
-        employee_record.avatar_url = request.avatar
+        employee_record.avatar_url = store_image(request.avatar, "avatar")
     
     if request.coverImage is not None:
-        employee_record.cover_image_url = request.coverImage
+        employee_record.cover_image_url = store_image(request.coverImage, "thumb")
     
     if request.profileCrop is not None:
         import json
@@ -0,0 +1,89 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from ..auth import authenticate_token
+from ..config import settings
+from ..database import SessionLocal
+from ..utils.event_hub import channels_for, event_hub
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+
+def _principal(token: Optional[str]) -> SimpleNamespace:
+    # Streams stay open for hours; don't pin a pooled connection for that long.
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    db = SessionLocal()
+    try:
+        user = authenticate_token(token, db)
+        return SimpleNamespace(id=user.id, role=user.role)
+    finally:
+        db.close()
+
+
+def _bearer(request: Request) -> Optional[str]:
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    return credentials if scheme.lower() == "bearer" and credentials else None
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    token: Optional[str] = Query(None, description="Access token, for EventSource clients that cannot send headers"),
+):
+    """Server-sent events for the current user: `event: <name>` / `data: <json>`."""
+    principal = await run_in_threadpool(_principal, _bearer(request) or token)
+
+    async def body():
+        with event_hub.subscribe(channels_for(principal)) as inbox:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(inbox.get(), settings.event_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream.
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {message['event']}\ndata: {json.dumps(message['data'], default=str)}\n\n"
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _until_closed(websocket: WebSocket) -> None:
+    # Clients have nothing to say; reading is how a disconnect is noticed.
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/ws")
+async def events_socket(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """The same events as /stream, as {"event", "data"} JSON messages."""
+    try:
+        principal = await run_in_threadpool(_principal, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+
+    with event_hub.subscribe(channels_for(principal)) as inbox:
+        closed = asyncio.ensure_future(_until_closed(websocket))
+        try:
+            while True:
+                message = asyncio.ensure_future(inbox.get())
+                await asyncio.wait({message, closed}, return_when=asyncio.FIRST_COMPLETED)
+                if not message.done():
+                    message.cancel()
+                    break
+                await websocket.send_json(message.result())
+        finally:
+            closed.cancel()
@@ -28,6 +28,7 @@ from ..schemas.finance import (
     AuditLogResponse, FinancialSummary, CategoryBreakdown, CashFlowPoint,
 )
 from ..auth import require_role
+from ..utils.sequences import next_yearly_number
 
 router = APIRouter(prefix="/api/finance", tags=["finance"])
 
@@ -88,16 +89,9 @@ def _shift_months(any_day: date, months: int) -> date:
     return date(total // 12, total % 12 + 1, 1)
 
 
-def _next_sequence(db: Session, model, column, prefix: str, year: int) -> str:
-    """`PREFIX-YYYY-0001`, counting only rows issued in the same year."""
-    like = f"{prefix}-{year}-%"
-    count = db.query(model).filter(column.like(like)).count()
-    # Guard against gaps from deletes producing a duplicate.
-    while True:
-        count += 1
-        candidate = f"{prefix}-{year}-{count:04d}"
-        if not db.query(model).filter(column == candidate).first():
-            return candidate
+def _next_sequence(db: Session, column, prefix: str, year: int) -> str:
+    """`PREFIX-YYYY-0001`, numbered per year from the `id_sequences` table."""
+    return next_yearly_number(db, prefix, year, column)
 
 
 def _user_names(db: Session, ids) -> Dict[int, str]:
@@ -212,7 +206,7 @@ def create_expense(
 
     expense = Expense(
         **payload.dict(),
-        expense_number=_next_sequence(db, Expense, Expense.expense_number, "EXP", payload.expense_date.year),
+        expense_number=_next_sequence(db, Expense.expense_number, "EXP", payload.expense_date.year),
         status="pending",
         created_by=current_user.id,
     )
@@ -418,7 +412,7 @@ def create_invoice(
     invoice = Invoice(
         **data,
         status=status_value,
-        invoice_number=_next_sequence(db, Invoice, Invoice.invoice_number, "INV", payload.issue_date.year),
+        invoice_number=_next_sequence(db, Invoice.invoice_number, "INV", payload.issue_date.year),
         created_by=current_user.id,
     )
     db.add(invoice)
@@ -8,7 +8,7 @@ Endpoints:
   PUT    /api/gallery/albums/{id}         – HR updates album metadata
   DELETE /api/gallery/albums/{id}         – HR deletes album (cascades images)
 
-  POST   /api/gallery/albums/{id}/images  – HR uploads images (bulk)
+  POST   /api/gallery/albums/{id}/images  – HR uploads images (bulk; data URIs go to the blob store)
   DELETE /api/gallery/images/{id}         – HR deletes a single image
 
   GET    /api/gallery/celebrations        – active celebration broadcasts
@@ -17,9 +17,10 @@ Endpoints:
   DELETE /api/gallery/celebrations/{id}   – HR removes a broadcast
 """
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from ..auth import get_current_user, require_role
@@ -36,22 +37,36 @@ from ..schemas.gallery import (
     CelebrationResponse,
     ImageResponse,
 )
+from ..utils.blob_store import blob_store
+from ..utils.image_variants import queue_variants, thumbnail_url
 
 router = APIRouter(prefix="/api/gallery", tags=["gallery"])
 
 
 # ─── helpers ─────────────────────────────────────────────────────────────────
 
-def _album_to_dict(album: GalleryAlbum, include_images: bool = False) -> dict:
+def _image_counts(db: Session, album_ids: List[int]) -> Dict[int, int]:
+    # Counted in SQL: loading album.images would read every image row.
+    if not album_ids:
+        return {}
+    return dict(
+        db.query(GalleryImage.album_id, func.count(GalleryImage.id))
+        .filter(GalleryImage.album_id.in_(album_ids))
+        .group_by(GalleryImage.album_id)
+        .all()
+    )
+
+
+def _album_to_dict(album: GalleryAlbum, image_count: int, include_images: bool = False) -> dict:
     d = {
         "id": album.id,
         "title": album.title,
         "description": album.description,
-        "cover_image": album.cover_image,
+        "cover_image": thumbnail_url(album.cover_image, "thumb"),
         "is_published": album.is_published,
         "created_by": album.created_by,
         "created_at": album.created_at,
-        "image_count": len(album.images),
+        "image_count": image_count,
     }
     if include_images:
         d["images"] = [
@@ -61,6 +76,7 @@ def _album_to_dict(album: GalleryAlbum, include_images: bool = False) -> dict:
                 "title": img.title,
                 "file_name": img.file_name,
                 "file_url": img.file_url,
+                "thumbnail_url": thumbnail_url(img.file_url, "thumb"),
                 "file_size": img.file_size,
                 "mime_type": img.mime_type,
                 "uploaded_by": img.uploaded_by,
@@ -88,7 +104,7 @@ def _celebration_to_dict(cel: CelebrationBroadcast) -> dict:
         "created_by": cel.created_by,
         "created_at": cel.created_at,
         "subject_name": f"{user.first_name} {user.last_name}" if user else None,
-        "subject_avatar": emp.avatar_url if emp else None,
+        "subject_avatar": thumbnail_url(emp.avatar_url, "avatar") if emp else None,
         "subject_position": emp.position if emp else None,
         "award_type": award.award_type if award else None,
     }
@@ -110,7 +126,8 @@ def list_albums(
         q = q.filter(GalleryAlbum.is_published == True)  # noqa: E712
 
     albums = q.order_by(GalleryAlbum.created_at.desc()).all()
-    return [_album_to_dict(a) for a in albums]
+    counts = _image_counts(db, [a.id for a in albums])
+    return [_album_to_dict(a, counts.get(a.id, 0)) for a in albums]
 
 
 @router.post("/albums", response_model=AlbumResponse)
@@ -128,7 +145,7 @@ def create_album(
     db.add(album)
     db.commit()
     db.refresh(album)
-    return _album_to_dict(album)
+    return _album_to_dict(album, 0)
 
 
 @router.get("/albums/{album_id}", response_model=AlbumDetailResponse)
@@ -144,7 +161,7 @@ def get_album(
     if not album.is_published and current_user.role not in ("admin", "hr"):
         raise HTTPException(status_code=403, detail="Album not available")
 
-    return _album_to_dict(album, include_images=True)
+    return _album_to_dict(album, len(album.images), include_images=True)
 
 
 @router.put("/albums/{album_id}", response_model=AlbumResponse)
@@ -167,7 +184,7 @@ def update_album(
 
     db.commit()
     db.refresh(album)
-    return _album_to_dict(album)
+    return _album_to_dict(album, _image_counts(db, [album.id]).get(album.id, 0))
 
 
 @router.delete("/albums/{album_id}")
@@ -199,13 +216,21 @@ def upload_images(
 
     created = []
     for img_data in body.images:
+        file_url, file_size, mime_type = img_data.file_url, img_data.file_size, img_data.mime_type
+        try:
+            stored = blob_store.store_data_uri(file_url)
+        except OSError as exc:
+            raise HTTPException(status_code=500, detail=f"Could not store the image: {exc}")
+        if stored is not None:
+            file_url, mime_type, file_size = stored
+            queue_variants(file_url, "thumb")
         img = GalleryImage(
             album_id=album_id,
             title=img_data.title,
             file_name=img_data.file_name,
-            file_url=img_data.file_url,
-            file_size=img_data.file_size,
-            mime_type=img_data.mime_type,
+            file_url=file_url,
+            file_size=file_size,
+            mime_type=mime_type,
             uploaded_by=current_user.id,
         )
         db.add(img)
@@ -36,7 +36,6 @@ from ..models import (
     PurchaseRequisition,
     User,
 )
-from ..models.notification import Notification
 from ..schemas.it_asset import (
     AssetItemCreate,
     AssetItemResponse,
@@ -57,6 +56,8 @@ from ..schemas.it_asset import (
     RequisitionReceive,
     RequisitionResponse,
 )
+from ..utils.notifier import notify
+from ..utils.sequences import next_yearly_number
 
 router = APIRouter(prefix="/api/it-assets", tags=["it-assets"])
 
@@ -150,27 +151,19 @@ def _notify_roles(
     priority: str = "medium",
 ) -> int:
     """Fan a system notification out to every active holder of `roles`."""
-    recipients = (
-        db.query(User)
-        .filter(User.role.in_(list(roles)), User.status == "active", User.id != sender.id)
-        .all()
+    return notify(
+        db,
+        roles=roles,
+        exclude=(sender.id,),
+        sender_id=sender.id,
+        title=title,
+        message=message,
+        notification_type=notification_type,
+        priority=priority,
+        related_entity_type=related_entity_type,
+        related_entity_id=related_entity_id,
+        action_url=action_url,
     )
-    for recipient in recipients:
-        db.add(
-            Notification(
-                recipient_id=recipient.id,
-                sender_id=sender.id,
-                title=title,
-                message=message,
-                notification_type=notification_type,
-                priority=priority,
-                is_system_generated=True,
-                related_entity_type=related_entity_type,
-                related_entity_id=related_entity_id,
-                action_url=action_url,
-            )
-        )
-    return len(recipients)
 
 
 def _notify_user(
@@ -184,33 +177,21 @@ def _notify_user(
     related_entity_id: Optional[int] = None,
     action_url: Optional[str] = None,
 ) -> None:
-    db.add(
-        Notification(
-            recipient_id=recipient_id,
-            sender_id=sender.id,
-            title=title,
-            message=message,
-            notification_type="asset",
-            priority="medium",
-            is_system_generated=True,
-            related_entity_type=related_entity_type,
-            related_entity_id=related_entity_id,
-            action_url=action_url,
-        )
+    notify(
+        db,
+        (recipient_id,),
+        sender_id=sender.id,
+        title=title,
+        message=message,
+        notification_type="asset",
+        related_entity_type=related_entity_type,
+        related_entity_id=related_entity_id,
+        action_url=action_url,
     )
 
 
 def _next_requisition_number(db: Session, year: int) -> str:
-    count = db.query(PurchaseRequisition).filter(
-        PurchaseRequisition.requisition_number.like(f"PR-{year}-%")
-    ).count()
-    while True:
-        count += 1
-        candidate = f"PR-{year}-{count:04d}"
-        if not db.query(PurchaseRequisition).filter(
-            PurchaseRequisition.requisition_number == candidate
-        ).first():
-            return candidate
+    return next_yearly_number(db, "PR", year, PurchaseRequisition.requisition_number)
 
 
 def _generate_sku(db: Session, name: str) -> str:
@@ -1196,7 +1177,7 @@ def list_invoices(
 
 
 @router.post("/requisitions/{requisition_id}/invoice", response_model=InvoiceDocumentResponse, status_code=201)
-async def upload_invoice(
+def upload_invoice(
     requisition_id: int,
     invoice_number: str = Form(...),
     amount: float = Form(...),
@@ -1232,7 +1213,7 @@ async def upload_invoice(
                 status_code=415,
                 detail="Invoice must be a PDF, image or spreadsheet",
             )
-        contents = await file.read()
+        contents = file.file.read()
         if len(contents) > MAX_INVOICE_BYTES:
             raise HTTPException(status_code=413, detail="Invoice file must be 10 MB or smaller")
 
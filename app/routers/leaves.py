@@ -21,9 +21,12 @@ from ..models.leave import Leave, LeaveBalance
 from ..models.employee import Employee
 from ..models.department import Department
 from ..models.position import Position
-from ..models.notification import Notification, Holiday
+from ..models.notification import Holiday
 from ..schemas.leave import LeaveCreate, LeaveResponse
 from ..auth import get_current_user, require_role
+from ..utils.event_hub import event_hub, role_channel, user_channel
+from ..utils.notifier import notify
+from ..utils.org_chart import org_chart
 
 router = APIRouter(prefix="/api/leaves", tags=["Leave Management"])
 
@@ -62,34 +65,36 @@ def working_days(db: Session, start: date, end: date, duration_type: str = "full
 
 
 def _is_team_member(db: Session, lead_user_id: int, employee_user_id: int) -> bool:
-    """True if the employee reports to the given team lead.
+    """True if the employee reports directly to the given team lead.
 
     manager_id historically stored either the lead's user id or their
-    employee-record id depending on the writer, so both are accepted.
+    employee-record id depending on the writer; the org chart accepts both.
     """
-    employee = db.query(Employee).filter(Employee.user_id == employee_user_id).first()
-    if not employee or employee.manager_id is None:
-        return False
-    if employee.manager_id == lead_user_id:
-        return True
-    lead_employee = db.query(Employee).filter(Employee.user_id == lead_user_id).first()
-    return bool(lead_employee and employee.manager_id == lead_employee.id)
-
-
-def _notify(db: Session, recipient_id: int, sender_id: int, title: str, message: str,
-            leave_id: int, priority: str = "medium", action_url: str = ""):
-    db.add(Notification(
-        recipient_id=recipient_id,
+    return org_chart.is_in_org(db, lead_user_id, employee_user_id, direct_only=True)
+
+
+def _notify(db: Session, recipient_ids, sender_id: int, title: str, message: str,
+            leave_id: int, priority: str = "medium", action_url: str = "", roles=()):
+    notify(
+        db, recipient_ids,
+        roles=roles,
         sender_id=sender_id,
         title=title,
         message=message,
         notification_type="leave_request",
         priority=priority,
-        is_system_generated=True,
         related_entity_type="leave_request",
         related_entity_id=leave_id,
         action_url=action_url,
-    ))
+    )
+
+
+def _publish_decision(leave: Leave) -> None:
+    # The employee's leave page and the admin/hr pending queues refetch on this.
+    event_hub.publish(
+        [user_channel(leave.employee_id), role_channel("admin"), role_channel("hr")],
+        "leave", {"id": leave.id, "status": leave.status},
+    )
 
 
 def _balance_for(db: Session, employee_id: int, leave_type: str, year: int) -> Optional[LeaveBalance]:
@@ -151,9 +156,7 @@ def get_leaves(
     if current_user.role == "employee":
         query = query.filter(Leave.employee_id == current_user.id)
     elif current_user.role == "team_lead":
-        team_member_ids = [
-            row[0] for row in db.query(Employee.user_id).filter(Employee.manager_id == current_user.id).all()
-        ] + [current_user.id]
+        team_member_ids = list(org_chart.direct_reports(db, current_user.id)) + [current_user.id]
         query = query.filter(Leave.employee_id.in_(team_member_ids))
 
     if status_filter:
@@ -248,9 +251,7 @@ def get_pending_leave_requests(
     query = db.query(Leave).filter(Leave.status == "pending")
 
     if current_user.role == "team_lead":
-        team_member_ids = [
-            row[0] for row in db.query(Employee.user_id).filter(Employee.manager_id == current_user.id).all()
-        ]
+        team_member_ids = list(org_chart.direct_reports(db, current_user.id))
         query = query.filter(Leave.employee_id.in_(team_member_ids))
 
     leaves = query.order_by(Leave.created_at.desc()).all()
@@ -390,18 +391,15 @@ def create_leave_request(
     db.flush()
 
     # Notify approvers: the employee's team lead if any, plus admin/HR
-    employee_rec = db.query(Employee).filter(Employee.user_id == current_user.id).first()
-    approver_ids = {u.id for u in db.query(User).filter(User.role.in_(["admin", "hr"])).all()}
-    if employee_rec and employee_rec.manager_id:
-        approver_ids.add(employee_rec.manager_id)
-    for uid in approver_ids:
-        _notify(
-            db, uid, current_user.id,
-            "New leave request",
-            f"{current_user.first_name} {current_user.last_name} requested {days_requested:.1f} day(s) of {leave_data.leave_type} leave ({leave_data.start_date} – {leave_data.end_date})",
-            db_leave.id,
-            action_url=f"/admin/leave-management",
-        )
+    lead = org_chart.manager(db, current_user.id)
+    _notify(
+        db, [lead] if lead else [], current_user.id,
+        "New leave request",
+        f"{current_user.first_name} {current_user.last_name} requested {days_requested:.1f} day(s) of {leave_data.leave_type} leave ({leave_data.start_date} – {leave_data.end_date})",
+        db_leave.id,
+        action_url=f"/admin/leave-management",
+        roles=("admin", "hr"),
+    )
 
     db.commit()
     db.refresh(db_leave)
@@ -462,7 +460,7 @@ def approve_leave(
     leave.approved_at = datetime.now(timezone.utc)
 
     _notify(
-        db, leave.employee_id, current_user.id,
+        db, (leave.employee_id,), current_user.id,
         "Leave request approved",
         f"Your {leave.leave_type} leave ({leave.start_date} – {leave.end_date}, {leave.days_requested:.1f} day(s)) has been approved",
         leave.id,
@@ -471,6 +469,7 @@ def approve_leave(
 
     db.commit()
     db.refresh(leave)
+    _publish_decision(leave)
     return {"message": "Leave request approved", "leave_id": leave.id, "status": leave.status}
 
 
@@ -500,7 +499,7 @@ def reject_leave(
     leave.rejection_reason = reason
 
     _notify(
-        db, leave.employee_id, current_user.id,
+        db, (leave.employee_id,), current_user.id,
         "Leave request declined",
         f"Your {leave.leave_type} leave ({leave.start_date} – {leave.end_date}) was declined: {reason}",
         leave.id,
@@ -510,6 +509,7 @@ def reject_leave(
 
     db.commit()
     db.refresh(leave)
+    _publish_decision(leave)
     return leave
 
 
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import and_, func, update
 from typing import List, Optional
 from ..database import get_db
 from ..models.notification import Notification
@@ -9,6 +9,7 @@ from ..schemas.notification import (
     NotificationCreate, NotificationUpdate, NotificationResponse
 )
 from ..auth import get_current_user
+from ..utils import notification_retention, unread_counts
 
 router = APIRouter(prefix="/api/notifications", tags=["notifications"])
 
@@ -34,16 +35,30 @@ def get_unread_count(
     current_user: User = Depends(get_current_user)
 ):
     try:
-        count = db.query(Notification).filter(
-            Notification.recipient_id == current_user.id,
-            Notification.is_read == False
-        ).count()
-        return {"count": count}
+        # One counter row, usually straight from cache (app/utils/unread_counts.py)
+        return {"count": unread_counts.count(db, current_user.id)}
     except Exception as e:
         print(f"Error in get_unread_count: {str(e)}")
         # Return 0 count instead of error to prevent frontend crashes
         return {"count": 0}
 
+# Declared before /{notification_id} so "retention" is not parsed as an id.
+@router.get("/retention")
+def get_retention_metrics(current_user: User = Depends(get_current_user)):
+    """Archive sweep totals and the last sweep's numbers."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return notification_retention.retention_metrics
+
+@router.post("/retention/run")
+def run_retention_sweep(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    result = notification_retention.sweep()
+    if result is None:
+        raise HTTPException(status_code=409, detail="A retention sweep is already running")
+    return result
+
 @router.get("/{notification_id}", response_model=NotificationResponse)
 def get_notification(
     notification_id: int,
@@ -114,15 +129,16 @@ def mark_notification_read(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    notification = db.query(Notification).filter(
-        Notification.id == notification_id,
-        Notification.recipient_id == current_user.id
-    ).first()
-    if not notification:
+    mine = and_(Notification.id == notification_id, Notification.recipient_id == current_user.id)
+    # Conditional, so only the call that actually flips the row decrements
+    result = db.execute(
+        update(Notification).where(mine, Notification.is_read == False).values(is_read=True, read_at=func.now()),
+        execution_options={"synchronize_session": False},
+    )
+    if result.rowcount:
+        unread_counts.adjust(db, {current_user.id: -result.rowcount})
+    elif not db.query(Notification.id).filter(mine).first():
         raise HTTPException(status_code=404, detail="Notification not found")
-    
-    notification.is_read = True
-    notification.read_at = func.now()
     db.commit()
     return {"message": "Notification marked as read"}
 
@@ -131,13 +147,13 @@ def mark_all_notifications_read(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    db.query(Notification).filter(
-        Notification.recipient_id == current_user.id,
-        Notification.is_read == False
-    ).update({
-        "is_read": True,
-        "read_at": func.now()
-    })
+    result = db.execute(
+        update(Notification)
+        .where(Notification.recipient_id == current_user.id, Notification.is_read == False)
+        .values(is_read=True, read_at=func.now()),
+        execution_options={"synchronize_session": False},
+    )
+    unread_counts.adjust(db, {current_user.id: -result.rowcount})
     db.commit()
-    return {"message": "All notifications marked as read"}
+    return {"message": "All notifications marked as read", "updated": result.rowcount}
 
@@ -9,27 +9,24 @@ Design notes (accounting controls):
   Team leads intentionally have NO access to team pay data.
 """
 from fastapi import APIRouter, Depends, HTTPException, Body
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 
+from ..config import settings
 from ..database import get_db
-from ..models import Payslip, PayslipEarning, PayslipDeduction, SalaryStructure, Bonus, User, Employee
-from ..models.leave import Leave
+from ..models import Payslip, PayslipEarning, PayslipDeduction, SalaryStructure, Bonus, PayrollRun, User, Employee
 from ..schemas.payroll import (
     PayslipResponse, PayslipCreate, SalaryStructureResponse, SalaryStructureCreate,
     BonusResponse, BonusCreate,
 )
 from ..auth import get_current_user, require_role
+from ..utils.payroll_engine import parse_pay_period, generate_payslips
+from ..utils.payroll_jobs import ACTIVE_STATUSES, submit_run, run_payload
 
 router = APIRouter(prefix="/api/payroll", tags=["payroll"])
 
-# ESI statutory gross-salary eligibility ceiling (monthly). Configurable per deployment.
-ESI_GROSS_CEILING = 21000.0
-# PF statutory wage ceiling on basic (monthly). Contributions computed on min(basic, ceiling).
-PF_WAGE_CEILING = 15000.0
-
-
 def _period_bounds(year: int, month: Optional[int] = None):
     """Inclusive start, exclusive end for a year or month."""
     if month:
@@ -245,154 +242,115 @@ def generate_monthly_payslips(
     current_user: User = Depends(require_role(["admin", "hr"])),
 ):
     try:
-        year, month = (int(x) for x in pay_period.split("-"))
-        period_start, next_month = _period_bounds(year, month)
-        period_end = next_month - timedelta(days=1)
+        period = parse_pay_period(pay_period)
     except (ValueError, TypeError):
         raise HTTPException(status_code=422, detail="Invalid pay_period format. Use YYYY-MM")
 
-    days_in_month = (next_month - period_start).days
     # Active = the linked user account is active (Employee has no status column)
-    employees = (
-        db.query(Employee)
+    user_ids = [
+        uid for (uid,) in db.query(Employee.user_id)
         .join(User, User.id == Employee.user_id)
         .filter(User.status == "active")
-        .all()
-    )
-    generated, skipped_no_structure, skipped_existing = 0, [], 0
+    ]
+    # Set-based: a fixed number of queries per run, not per employee (see utils/payroll_engine.py).
+    result = generate_payslips(db, period, user_ids, generated_by=current_user.id)
+    db.commit()
+    return {
+        "message": f"Generated {result.generated} payslip(s) for {pay_period}",
+        "generated": result.generated,
+        "skipped_existing": result.skipped_existing,
+        "skipped_missing_salary_structure": result.skipped_no_structure,
+        "timings_ms": result.timings_ms,
+    }
 
-    for employee in employees:
-        uid = employee.user_id
 
-        if db.query(Payslip).filter(
-            Payslip.employee_id == uid,
-            Payslip.pay_period_start == period_start,
-        ).first():
-            skipped_existing += 1
-            continue
+# ── Background payroll runs ─────────────────────────────────────────────────
+# Same generation as above, but off the request thread with chunked commits.
+# Clients start a run, then poll GET /runs/{id} for progress.
 
-        structure = db.query(SalaryStructure).filter(
-            SalaryStructure.employee_id == uid,
-            SalaryStructure.is_active == True,  # noqa: E712
+def _commit_or_conflict(db: Session, pay_period: str) -> None:
+    # ux_payroll_runs_active_period allows one queued / running run per period;
+    # checking first and inserting after would let two requests both pass.
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        in_flight = db.query(PayrollRun).filter(
+            PayrollRun.pay_period == pay_period,
+            PayrollRun.status.in_(ACTIVE_STATUSES),
         ).first()
-        if not structure:
-            skipped_no_structure.append(uid)
-            continue
-
-        # Earnings
-        basic = structure.basic_salary or 0.0
-        hra = round(basic * (structure.hra_percentage or 0) / 100, 2)
-        transport = structure.transport_allowance or 0.0
-        medical = structure.medical_allowance or 0.0
-        special = structure.special_allowance or 0.0
-
-        # Approved bonuses dated in this period and not yet paid out
-        bonuses = db.query(Bonus).filter(
-            Bonus.employee_id == uid,
-            Bonus.status == "approved",
-            Bonus.paid_in_payslip_id.is_(None),
-            Bonus.bonus_date >= period_start,
-            Bonus.bonus_date < next_month,
-        ).all()
-        bonus_total = round(sum(b.amount for b in bonuses), 2)
-
-        gross_before_lop = basic + hra + transport + medical + special
-
-        # Loss of pay: approved unpaid leave days overlapping the period,
-        # prorated against the fixed monthly components.
-        unpaid_days = 0.0
-        unpaid_leaves = db.query(Leave).filter(
-            Leave.employee_id == uid,
-            Leave.status == "approved",
-            Leave.leave_type == "unpaid",
-            Leave.start_date <= period_end,
-            Leave.end_date >= period_start,
-        ).all()
-        for lv in unpaid_leaves:
-            overlap_start = max(lv.start_date, period_start)
-            overlap_end = min(lv.end_date, period_end)
-            overlap = (overlap_end - overlap_start).days + 1
-            if lv.days_requested and (lv.end_date - lv.start_date).days + 1 > 0:
-                # Scale requested days by the fraction of the leave inside this period
-                total_span = (lv.end_date - lv.start_date).days + 1
-                unpaid_days += lv.days_requested * (overlap / total_span)
-            else:
-                unpaid_days += overlap
-        lop_amount = round(gross_before_lop * min(unpaid_days, days_in_month) / days_in_month, 2)
-
-        total_earnings = round(gross_before_lop + bonus_total - lop_amount, 2)
-
-        # Statutory deductions
-        pf_base = min(basic, PF_WAGE_CEILING)
-        pf = round(pf_base * (structure.pf_percentage or 0) / 100, 2)
-        # ESI applies on gross, only if gross is within the eligibility ceiling
-        esi = 0.0
-        if total_earnings <= ESI_GROSS_CEILING:
-            esi = round(total_earnings * (structure.esi_percentage or 0) / 100, 2)
-        professional_tax = structure.professional_tax or 0.0
-        total_deductions = round(pf + esi + professional_tax, 2)
-
-        net_salary = round(total_earnings - total_deductions, 2)
-
-        payslip = Payslip(
-            employee_id=uid,
-            pay_period_start=period_start,
-            pay_period_end=period_end,
-            pay_date=date.today(),
-            basic_salary=basic,
-            gross_salary=total_earnings,
-            net_salary=net_salary,
-            total_earnings=total_earnings,
-            total_deductions=total_deductions,
-            payslip_number=f"PAY-{uid}-{pay_period}",
-            generated_by=current_user.id,
-            status="generated",
-        )
-        db.add(payslip)
-        db.flush()  # get payslip.id for line items
-
-        # Itemized lines — the audit trail behind the totals
-        earn_lines = [
-            ("basic", basic, "Basic salary"),
-            ("hra", hra, f"House rent allowance ({structure.hra_percentage or 0}% of basic)"),
-            ("transport", transport, "Transport allowance"),
-            ("medical", medical, "Medical allowance"),
-            ("special", special, "Special allowance"),
-        ]
-        for etype, amount, desc in earn_lines:
-            if amount:
-                db.add(PayslipEarning(payslip_id=payslip.id, earning_type=etype, amount=amount, description=desc))
-        for b in bonuses:
-            db.add(PayslipEarning(
-                payslip_id=payslip.id, earning_type="bonus", amount=b.amount,
-                description=f"{b.bonus_type.title()} bonus",
-            ))
-            b.status = "paid"
-            b.paid_in_payslip_id = payslip.id
-
-        if lop_amount:
-            db.add(PayslipDeduction(
-                payslip_id=payslip.id, deduction_type="loss_of_pay", amount=lop_amount,
-                description=f"Unpaid leave: {round(unpaid_days, 1)} day(s)",
-            ))
-        ded_lines = [
-            ("pf", pf, f"Provident fund ({structure.pf_percentage or 0}% of capped basic)"),
-            ("esi", esi, f"ESI ({structure.esi_percentage or 0}% of gross)"),
-            ("professional_tax", professional_tax, "Professional tax"),
-        ]
-        for dtype, amount, desc in ded_lines:
-            if amount:
-                db.add(PayslipDeduction(payslip_id=payslip.id, deduction_type=dtype, amount=amount, description=desc))
-
-        generated += 1
+        detail = f"Payroll run {in_flight.id} for {pay_period} is already {in_flight.status}" if in_flight \
+            else f"Another payroll run for {pay_period} is in progress"
+        raise HTTPException(status_code=409, detail=detail)
 
-    db.commit()
-    return {
-        "message": f"Generated {generated} payslip(s) for {pay_period}",
-        "generated": generated,
-        "skipped_existing": skipped_existing,
-        "skipped_missing_salary_structure": skipped_no_structure,
-    }
+
+@router.post("/runs", status_code=202)
+def start_payroll_run(
+    pay_period: str = Body(..., embed=True, description="Format: YYYY-MM"),
+    chunk_size: Optional[int] = Body(None, embed=True, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["admin", "hr"])),
+):
+    try:
+        parse_pay_period(pay_period)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=422, detail="Invalid pay_period format. Use YYYY-MM")
+
+    run = PayrollRun(
+        pay_period=pay_period,
+        status="queued",
+        chunk_size=chunk_size or settings.payroll_chunk_size,
+        skipped_no_structure=[],
+        failed=[],
+        started_by=current_user.id,
+    )
+    db.add(run)
+    _commit_or_conflict(db, pay_period)
+    db.refresh(run)
+    submit_run(run.id)
+    return run_payload(run)
+
+
+@router.get("/runs")
+def list_payroll_runs(
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["admin", "hr"])),
+):
+    runs = db.query(PayrollRun).order_by(PayrollRun.id.desc()).limit(limit).all()
+    return [run_payload(r) for r in runs]
+
+
+@router.get("/runs/{run_id}")
+def get_payroll_run(
+    run_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["admin", "hr"])),
+):
+    run = db.query(PayrollRun).filter(PayrollRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Payroll run not found")
+    return run_payload(run)
+
+
+@router.post("/runs/{run_id}/resume", status_code=202)
+def resume_payroll_run(
+    run_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["admin", "hr"])),
+):
+    run = db.query(PayrollRun).filter(PayrollRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Payroll run not found")
+    if run.status != "failed":
+        raise HTTPException(status_code=409, detail=f"Only failed runs can be resumed (current status: {run.status})")
+
+    # Picks up after last_user_id; earlier chunks are already committed.
+    run.status = "queued"
+    run.finished_at = None
+    _commit_or_conflict(db, run.pay_period)
+    submit_run(run.id)
+    return run_payload(run)
 
 
 # ── Salary structures ───────────────────────────────────────────────────────
@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, extract, text
 from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
-from ..database import get_db
+from datetime import date, datetime, timedelta
+from ..database import get_read_db
 from ..models.user import User
 from ..models.employee import Employee
 from ..models.department import Department
@@ -23,7 +23,7 @@ router = APIRouter(prefix="/api/reports", tags=["reports"])
 
 @router.get("/dashboard/admin")
 def get_admin_dashboard_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     try:
@@ -66,7 +66,7 @@ def get_admin_dashboard_stats(
 
 @router.get("/dashboard/employee")
 def get_employee_dashboard_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     try:
@@ -161,36 +161,40 @@ def get_monthly_attendance_report(
     year: int,
     month: int = 0,
     department: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role not in ["admin", "hr", "team_lead"]:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    from ..models.attendance import Attendance
-    from sqlalchemy import extract, func
+    from ..models.attendance import Attendance, AttendanceDailySummary
 
     if month == 0:
-        # Return monthly attendance rates for the full year
-        monthly_rates = []
-        for m in range(1, 13):
-            total = db.query(Attendance).filter(
-                extract('year', Attendance.date) == year,
-                extract('month', Attendance.date) == m
-            ).count()
-            present = db.query(Attendance).filter(
-                extract('year', Attendance.date) == year,
-                extract('month', Attendance.date) == m,
-                Attendance.status.in_(["present", "late"])
-            ).count()
-            rate = round((present / total * 100), 1) if total > 0 else 0.0
-            monthly_rates.append(rate)
+        # Return monthly attendance rates for the full year, read from the
+        # daily rollup: one range query over at most 366 days x departments.
+        totals, present = [0] * 12, [0] * 12
+        rows = db.query(
+            AttendanceDailySummary.date, AttendanceDailySummary.total,
+            AttendanceDailySummary.present, AttendanceDailySummary.late,
+        ).filter(
+            AttendanceDailySummary.date >= date(year, 1, 1),
+            AttendanceDailySummary.date < date(year + 1, 1, 1),
+        )
+        for day, total, on_time, late in rows:
+            totals[day.month - 1] += total
+            present[day.month - 1] += on_time + late
+        monthly_rates = [
+            round((p / t * 100), 1) if t > 0 else 0.0
+            for p, t in zip(present, totals)
+        ]
         return {"monthly_rates": monthly_rates}
     else:
         # Return individual records for that month
+        start = date(year, month, 1)
+        end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
         query = db.query(Attendance).filter(
-            extract('year', Attendance.date) == year,
-            extract('month', Attendance.date) == month
+            Attendance.date >= start,
+            Attendance.date < end,
         )
         records = query.all()
         return [
@@ -210,7 +214,7 @@ def get_monthly_attendance_report(
 def get_leave_summary_report(
     year: int,
     department: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role not in ["admin", "hr", "team_lead"]:
@@ -249,7 +253,7 @@ def get_payroll_summary_report(
     year: int,
     month: Optional[int] = None,
     department: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role not in ["admin", "hr"]:
@@ -286,7 +290,7 @@ def get_payroll_summary_report(
 def get_performance_summary_report(
     year: int,
     department: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role not in ["admin", "hr"]:
@@ -330,7 +334,7 @@ def get_performance_summary_report(
 @router.get("/training/progress")
 def get_training_progress_report(
     department: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role not in ["admin", "hr"]:
@@ -361,7 +365,7 @@ def get_training_progress_report(
 @router.get("/assets/utilization")
 def get_asset_utilization_report(
     asset_type: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role not in ["admin", "hr"]:
@@ -389,7 +393,7 @@ def get_asset_utilization_report(
 @router.get("/complaints/analysis")
 def get_complaints_analysis_report(
     year: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role not in ["admin", "hr"]:
@@ -431,7 +435,7 @@ def export_attendance_data(
     year: int,
     month: int,
     format: str = "json",
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role not in ["admin", "hr"]:
@@ -66,7 +66,7 @@ def get_request_types():
     ]
 
 @router.get("/", response_model=List[RequestResponse])
-async def get_requests(
+def get_requests(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = None,
@@ -106,7 +106,7 @@ async def get_requests(
     return requests
 
 @router.get("/{request_id}", response_model=RequestResponse)
-async def get_request(
+def get_request(
     request_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -123,7 +123,7 @@ async def get_request(
     return request
 
 @router.post("/", response_model=RequestResponse)
-async def create_request(
+def create_request(
     request_data: RequestCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -152,7 +152,7 @@ async def create_request(
     return request
 
 @router.put("/{request_id}", response_model=RequestResponse)
-async def update_request(
+def update_request(
     request_id: int,
     request_data: RequestUpdate,
     current_user: User = Depends(get_current_user),
@@ -177,7 +177,7 @@ async def update_request(
     return request
 
 @router.put("/{request_id}/approve")
-async def approve_request(
+def approve_request(
     request_id: int,
     comments: Optional[str] = None,
     current_user: User = Depends(require_role(['admin', 'hr'])),
@@ -199,7 +199,7 @@ async def approve_request(
     return {"message": "Request approved successfully"}
 
 @router.put("/{request_id}/reject")
-async def reject_request(
+def reject_request(
     request_id: int,
     comments: Optional[str] = None,
     current_user: User = Depends(require_role(['admin', 'hr'])),
@@ -221,7 +221,7 @@ async def reject_request(
     return {"message": "Request rejected successfully"}
 
 @router.delete("/{request_id}")
-async def delete_request(
+def delete_request(
     request_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
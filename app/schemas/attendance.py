@@ -41,6 +41,8 @@ class AttendanceUpdate(BaseModel):
 class AttendanceResponse(AttendanceBase):
     id: int
     employee_id: int
+    worked_minutes: Optional[int] = None
+    break_minutes: Optional[int] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     break_records: List[BreakRecordResponse] = []
@@ -0,0 +1,237 @@
+"""Incremental maintenance of `attendance_daily_summary`.
+
+Every attendance write computes the row's contribution to the counters
+before and after the change and applies the difference to its (date,
+department) bucket with an atomic upsert, inside the caller's transaction:
+
+    before = attendance_rollup.contribution(record)   # None for a new row
+    ... mutate record ...
+    attendance_rollup.record(db, record.id, record.date, before,
+                             attendance_rollup.contribution(record))
+    db.commit()
+
+The bucket's department is the one stamped on the attendance row when it
+was inserted (`department_stamp`), not the employee's current one. Moving an
+employee mid-day therefore cannot subtract check-out from a different bucket
+than check-in added to, and `rebuild` groups by the same stamp.
+
+Breaks don't change the attendance row, so they bump `on_break` directly via
+`record_break`. `rebuild` recomputes buckets from `attendance` and backs the
+one-shot backfill run at startup.
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Optional
+
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.attendance import Attendance, AttendanceDailySummary, BreakRecord
+from ..models.employee import Employee
+
+COUNTERS = ("total", "present", "late", "absent", "other", "checked_in", "on_break", "worked_minutes")
+_STATUS_COUNTERS = {"present": "present", "late": "late", "absent": "absent"}
+# Bucket for employees without a department (see AttendanceDailySummary).
+NO_DEPARTMENT = 0
+
+
+def hours_to_minutes(hours_worked: Optional[str]) -> int:
+    """Parse "H:MM" into minutes; anything unparseable counts as zero."""
+    if not hours_worked or ":" not in hours_worked:
+        return 0
+    try:
+        hours, minutes = hours_worked.split(":")
+        return int(hours) * 60 + int(minutes)
+    except ValueError:
+        return 0
+
+
+def contribution(record) -> Dict[str, int]:
+    """What one attendance row adds to its bucket. Works on ORM rows and tuples alike."""
+    out = {"total": 1, _STATUS_COUNTERS.get(record.status, "other"): 1}
+    if record.status == "present" and record.check_in and not record.check_out:
+        out["checked_in"] = 1
+    minutes = record.worked_minutes
+    if minutes is None:  # legacy row not yet backfilled
+        minutes = hours_to_minutes(record.hours_worked)
+    if minutes:
+        out["worked_minutes"] = minutes
+    return out
+
+
+def department_stamp(user_id):
+    """SQL for the value to store in `Attendance.department_id` on insert."""
+    return func.coalesce(
+        select(Employee.department_id).where(Employee.user_id == user_id).scalar_subquery(),
+        NO_DEPARTMENT,
+    )
+
+
+def _bucket(attendance_id):
+    # Resolved inside the upsert, so a punch needs no extra read for it.
+    return func.coalesce(
+        select(Attendance.department_id).where(Attendance.id == attendance_id).scalar_subquery(),
+        NO_DEPARTMENT,
+    )
+
+
+def _apply(db: Session, day: date, department_id, deltas: Dict[str, int]) -> None:
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else pg_insert
+        values = {c: 0 for c in COUNTERS}
+        values.update(deltas, date=day, department_id=department_id)
+        stmt = insert(AttendanceDailySummary).values(**values)
+        set_ = {c: getattr(AttendanceDailySummary, c) + stmt.excluded[c] for c in deltas}
+        set_["updated_at"] = func.now()
+        db.execute(stmt.on_conflict_do_update(index_elements=["date", "department_id"], set_=set_))
+        return
+
+    # Other backends: lock the bucket row and update it in place.
+    department_id = db.scalar(select(department_id))
+    bucket = db.query(AttendanceDailySummary).filter(
+        AttendanceDailySummary.date == day,
+        AttendanceDailySummary.department_id == department_id,
+    ).with_for_update().first()
+    if bucket is None:
+        bucket = AttendanceDailySummary(date=day, department_id=department_id, **{c: 0 for c in COUNTERS})
+        db.add(bucket)
+    for column, delta in deltas.items():
+        setattr(bucket, column, (getattr(bucket, column) or 0) + delta)
+    db.flush()
+
+
+def record(db: Session, attendance_id: int, day: date,
+           before: Optional[Dict[str, int]], after: Optional[Dict[str, int]]) -> None:
+    """Apply `after - before` to the bucket of attendance row `attendance_id` (dated `day`)."""
+    deltas = defaultdict(int)
+    for column, value in (after or {}).items():
+        deltas[column] += value
+    for column, value in (before or {}).items():
+        deltas[column] -= value
+    _apply(db, day, _bucket(attendance_id), deltas)
+
+
+def record_break(db: Session, attendance_id: int, day: date, delta: int) -> None:
+    """+1 when a break on attendance row `attendance_id` starts, -1 when it ends."""
+    _apply(db, day, _bucket(attendance_id), {"on_break": delta})
+
+
+def rebuild(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """Recompute buckets for [start, end] (inclusive; open-ended if omitted). Does not commit."""
+    summary = db.query(AttendanceDailySummary)
+    source = (
+        db.query(
+            Attendance.date, Attendance.department_id, Attendance.status,
+            Attendance.check_in, Attendance.check_out, Attendance.hours_worked, Attendance.worked_minutes,
+            exists().where(
+                BreakRecord.attendance_id == Attendance.id,
+                BreakRecord.end_time.is_(None),
+            ).label("on_break"),
+        )
+    )
+    if start:
+        summary = summary.filter(AttendanceDailySummary.date >= start)
+        source = source.filter(Attendance.date >= start)
+    if end:
+        summary = summary.filter(AttendanceDailySummary.date <= end)
+        source = source.filter(Attendance.date <= end)
+    summary.delete(synchronize_session=False)
+
+    buckets: Dict[tuple, Dict[str, int]] = defaultdict(lambda: {c: 0 for c in COUNTERS})
+    for row in source.yield_per(1000):
+        bucket = buckets[(row.date, row.department_id or NO_DEPARTMENT)]
+        for column, value in contribution(row).items():
+            bucket[column] += value
+        if row.on_break:
+            bucket["on_break"] += 1
+
+    if buckets:
+        db.bulk_insert_mappings(AttendanceDailySummary, [
+            {"date": day, "department_id": dept, **counters} for (day, dept), counters in buckets.items()
+        ])
+    return len(buckets)
+
+
+def backfill_worked_minutes(batch_size: int = 1000) -> int:
+    """One-shot fill of worked_minutes/break_minutes for rows written before those
+    columns existed. Idempotent; call at startup before `backfill_if_empty`."""
+    db = SessionLocal()
+    try:
+        updated, last_id = 0, 0
+        while True:
+            rows = db.query(Attendance.id, Attendance.hours_worked).filter(
+                Attendance.worked_minutes.is_(None),
+                Attendance.hours_worked.isnot(None),
+                Attendance.id > last_id,
+            ).order_by(Attendance.id).limit(batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            db.bulk_update_mappings(Attendance, [
+                {"id": row.id, "worked_minutes": hours_to_minutes(row.hours_worked)} for row in rows
+            ])
+            db.commit()
+            updated += len(rows)
+
+        closed_breaks = (
+            select(func.coalesce(func.sum(BreakRecord.duration_minutes), 0))
+            .where(BreakRecord.attendance_id == Attendance.id, BreakRecord.end_time.isnot(None))
+            .scalar_subquery()
+        )
+        db.execute(
+            update(Attendance)
+            .where(Attendance.break_minutes.is_(None), Attendance.check_out.isnot(None))
+            .values(break_minutes=closed_breaks)
+        )
+        db.commit()
+        return updated
+    finally:
+        db.close()
+
+
+def backfill_department_ids() -> int:
+    """One-shot stamp of `Attendance.department_id` on rows written before the
+    column existed, from the employee's current department. Idempotent; call
+    at startup before `backfill_if_empty`."""
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            update(Attendance)
+            .where(Attendance.department_id.is_(None))
+            .values(department_id=department_stamp(Attendance.employee_id)),
+            execution_options={"synchronize_session": False},
+        )
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
+
+
+def backfill_if_empty() -> int:
+    """One-shot backfill for databases that predate the rollup table. Call at startup."""
+    db = SessionLocal()
+    try:
+        if db.query(AttendanceDailySummary.id).first() or not db.query(Attendance.id).first():
+            return 0
+        count = rebuild(db)
+        db.commit()
+        return count
+    finally:
+        db.close()
+
+
+def totals(db: Session, start: date, end: Optional[date] = None) -> Dict[str, int]:
+    """Counters summed over all departments for [start, end] (inclusive)."""
+    end = end or start
+    row = db.query(*[func.coalesce(func.sum(getattr(AttendanceDailySummary, c)), 0) for c in COUNTERS]).filter(
+        AttendanceDailySummary.date >= start,
+        AttendanceDailySummary.date <= end,
+    ).one()
+    return dict(zip(COUNTERS, row))
@@ -0,0 +1,193 @@
+"""Content-addressed blob store for uploaded images.
+
+Gallery images, album covers and employee avatar / cover images used to live
+in text columns as base64 data URIs. Every album detail response carried them
+all inline, and a listing that only counted images loaded them anyway. Now the
+bytes live on disk and the columns hold a URL:
+
+- A blob is named by the sha256 of its bytes and stored at
+  `<blob_store_dir>/ab/cd/abcd...` (two levels of fan-out, so no directory
+  grows past a few thousand entries).
+- Storing the same bytes twice writes nothing the second time; both rows get
+  the same URL.
+- Writes go to a temp file in the same directory tree and are renamed into
+  place, so a reader never sees a half-written blob and two concurrent puts
+  of the same bytes both succeed.
+- Blobs are immutable, so the hash doubles as a strong ETag and responses can
+  be cached forever. GET /api/blobs/{sha256} serves them (app/routers/blobs.py).
+
+The media type is sniffed from the bytes when served, not taken from the
+uploader, and only the image types below are served as such.
+
+Blobs are not deleted with the rows that point at them: another row may share
+the bytes.
+
+Thumbnails of stored images are derived from them in app/utils/image_variants.py.
+
+`migrate_data_uris()` moves existing data URIs out of those columns. It runs at
+startup and is a no-op once nothing is left to move.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import select, update
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.employee import Employee
+from ..models.gallery import GalleryAlbum, GalleryImage
+
+URL_PREFIX = "/api/blobs/"
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+_DATA_URI = re.compile(r"^data:([\w.+-]+/[\w.+-]+)?((?:;[^;,]*)*?);base64,", re.IGNORECASE)
+
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+
+def sniff_type(head: bytes) -> str:
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif"
+    return "application/octet-stream"
+
+
+def parse_data_uri(value: Optional[str]) -> Optional[Tuple[str, bytes]]:
+    """(declared mime type, bytes) of a base64 data URI, or None for anything else."""
+    if not value or value[:5].lower() != "data:":
+        return None
+    match = _DATA_URI.match(value)
+    if not match:
+        return None
+    try:
+        data = base64.b64decode(value[match.end():], validate=False)
+    except (binascii.Error, ValueError):
+        return None
+    return (match.group(1) or "application/octet-stream").lower(), data
+
+
+class BlobStore:
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def url(self, digest: str) -> str:
+        return URL_PREFIX + digest
+
+    def digest_from_url(self, url: Optional[str]) -> Optional[str]:
+        if url and url.startswith(URL_PREFIX):
+            digest = url[len(URL_PREFIX):]
+            if _DIGEST.match(digest):
+                return digest
+        return None
+
+    def locate(self, digest: str) -> Optional[str]:
+        """Path of the blob, or None if `digest` is malformed or not stored."""
+        if not _DIGEST.match(digest):
+            return None
+        path = self.path(digest)
+        return path if os.path.isfile(path) else None
+
+    def put(self, data: bytes) -> str:
+        """Store `data` unless already present. Returns its sha256 hex digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as temp:
+                temp.write(data)
+                temp.flush()
+                os.fsync(temp.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return digest
+
+    def store_data_uri(self, value: Optional[str]) -> Optional[Tuple[str, str, int]]:
+        """Store a data URI's bytes. Returns (url, mime type, size), or None if
+        `value` is not a base64 data URI. The type is sniffed, falling back to
+        the declared one."""
+        parsed = parse_data_uri(value)
+        if parsed is None:
+            return None
+        declared, data = parsed
+        sniffed = sniff_type(data[:16])
+        return self.url(self.put(data)), declared if sniffed == "application/octet-stream" else sniffed, len(data)
+
+    def read_range(self, path: str, start: int, end: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Yield bytes `start`..`end` (inclusive) of the file at `path`."""
+        with open(path, "rb") as blob:
+            blob.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = blob.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+blob_store = BlobStore(settings.blob_store_dir)
+
+
+def _migrate_column(db, column, batch_size: int) -> int:
+    table = column.table
+    moved, last_id = 0, 0
+    while True:
+        # Ids first: each batch holds only `batch_size` data URIs in memory.
+        ids = db.execute(
+            select(table.c.id).where(column.like("data:%"), table.c.id > last_id)
+            .order_by(table.c.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return moved
+        last_id = ids[-1]
+        for row_id, value in db.execute(select(table.c.id, column).where(table.c.id.in_(ids))).all():
+            stored = blob_store.store_data_uri(value)
+            if stored is None:
+                print(f"[blob-store] {table.name}.{column.key} id={row_id}: not a base64 data URI, left as is")
+                continue
+            url, mime_type, size = stored
+            values = {column.key: url}
+            if "file_size" in table.c:
+                values.update(file_size=size, mime_type=mime_type)
+            db.execute(update(table).where(table.c.id == row_id).values(**values))
+            moved += 1
+        db.commit()
+
+
+def migrate_data_uris(batch_size: int = 50) -> int:
+    """Move base64 data URIs in image columns into the blob store. Call at startup."""
+    columns = (
+        GalleryImage.__table__.c.file_url,
+        GalleryAlbum.__table__.c.cover_image,
+        Employee.__table__.c.avatar_url,
+        Employee.__table__.c.cover_image_url,
+    )
+    db = SessionLocal()
+    try:
+        return sum(_migrate_column(db, column, batch_size) for column in columns)
+    finally:
+        db.close()
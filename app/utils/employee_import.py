@@ -0,0 +1,298 @@
+"""Bulk employee import: CSV / NDJSON / JSON rows in, per-row error report out.
+
+Rows are consumed as a stream, `chunk_size` at a time. For each chunk:
+
+1. Emails and employee IDs already taken are looked up with one IN query
+   each. Department names and position titles are resolved the same way and
+   cached for the rest of the import.
+2. Rows are validated (rows without an employee ID get the next one from
+   the sequence allocator), then the survivors' temporary passwords are hashed in
+   one batch across processes (`hash_pool.hash_many`).
+3. The chunk is bulk-inserted inside a savepoint. If that fails, the savepoint
+   is rolled back and the rows are replayed one savepoint each, so a single
+   bad row is reported instead of sinking its chunk. Then the chunk commits.
+
+Errors keep the shape the import endpoint has always returned:
+{"row", "field", "message", "data"}, with rows numbered from 1. Uploads are
+decoded line by line, so bad UTF-8 is reported on its own row: an NDJSON
+line is skipped, while a CSV file ends there (a CSV row may span lines). The
+chunks before it have already committed, so the summary still reports them.
+"""
+import csv
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..models.department import Department
+from ..models.employee import Employee
+from ..models.position import Position
+from ..models.user import User
+from .notifier import role_directory
+from .org_chart import org_chart
+from .password_hashing import hash_pool, password_policy
+from .search_index import reindex_employees
+from .sequences import next_employee_id, note_employee_ids
+from .temp_password import generate_temp_plaintext
+
+CSV_TYPES = ("text/csv", "application/csv", "application/vnd.ms-excel")
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+# Stay well under SQLite's bound-parameter limit in IN (...) lookups.
+LOOKUP_BATCH = 500
+
+# (row number, row data, parse error)
+ParsedRow = Tuple[int, dict, Optional[str]]
+
+
+def _clean(row: dict) -> dict:
+    out = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip() or None
+        out[key.strip()] = value
+    return out
+
+
+def iter_json_rows(rows: Iterable[dict]) -> Iterator[ParsedRow]:
+    for index, row in enumerate(rows):
+        if isinstance(row, dict):
+            yield index + 1, _clean(row), None
+        else:
+            yield index + 1, {}, "Row must be an object"
+
+
+def _decoded_lines(stream) -> Iterator[str]:
+    # Line by line, so a decode error surfaces at the row that holds it
+    # instead of at the start of the block around it.
+    for number, raw in enumerate(stream):
+        yield raw.decode("utf-8-sig" if number == 0 else "utf-8")
+
+
+def _csv_rows(stream) -> Iterator[ParsedRow]:
+    index = 0
+    try:
+        for row in csv.DictReader(_decoded_lines(stream)):
+            index += 1
+            yield index, _clean(row), None
+    except (UnicodeDecodeError, csv.Error) as exc:
+        yield index + 1, {}, f"Could not read the file from this row on: {exc}"
+
+
+def _ndjson_rows(stream) -> Iterator[ParsedRow]:
+    index = 0
+    for raw in stream:
+        if not raw.strip():
+            continue
+        index += 1
+        try:
+            line = raw.decode("utf-8-sig" if index == 1 else "utf-8")
+        except UnicodeDecodeError:
+            yield index, {"raw": raw.strip().decode("utf-8", "replace")}, "Invalid UTF-8"
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield index, {"raw": line.strip()}, "Invalid JSON"
+            continue
+        if not isinstance(row, dict):
+            yield index, {"raw": line.strip()}, "Row must be an object"
+            continue
+        yield index, _clean(row), None
+
+
+def iter_upload_rows(stream, filename: str = "", content_type: str = "") -> Iterator[ParsedRow]:
+    """Parse an uploaded CSV (header row required) or NDJSON file lazily.
+
+    Not a generator itself: an unsupported file type raises ValueError here,
+    at the call. Read errors while iterating come back as parse error rows.
+    """
+    name = (filename or "").lower()
+    content_type = (content_type or "").split(";")[0].strip().lower()
+
+    if name.endswith(".csv") or content_type in CSV_TYPES:
+        return _csv_rows(stream)
+    if name.endswith((".ndjson", ".jsonl")) or content_type in NDJSON_TYPES:
+        return _ndjson_rows(stream)
+    raise ValueError("Unsupported file type; upload a .csv or .ndjson file")
+
+
+def _in_lookup(db: Session, column, values) -> set:
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), LOOKUP_BATCH):
+        found.update(v for (v,) in db.query(column).filter(column.in_(values[start:start + LOOKUP_BATCH])))
+    return found
+
+
+def _begin(db: Session) -> None:
+    # pysqlite only opens a transaction at the first DML statement, so a
+    # leading SAVEPOINT would run outside one and its RELEASE would commit.
+    # Open the chunk's transaction explicitly.
+    connection = db.connection()
+    if connection.dialect.name == "sqlite" and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN")
+
+
+class EmployeeImporter:
+    def __init__(self, db: Session, chunk_size: int):
+        self.db = db
+        self.chunk_size = max(1, chunk_size)
+        self.success = 0
+        self.errors: List[dict] = []
+        self._seen_emails: set = set()
+        self._seen_employee_ids: set = set()
+        self._departments: Dict[str, Optional[int]] = {}
+        self._positions: Dict[str, Optional[int]] = {}
+
+    def run(self, rows: Iterable[ParsedRow]) -> dict:
+        chunk: List[ParsedRow] = []
+        for parsed in rows:
+            chunk.append(parsed)
+            if len(chunk) >= self.chunk_size:
+                self._process(chunk)
+                chunk = []
+        if chunk:
+            self._process(chunk)
+        return {
+            "success": self.success,
+            "failed": len(self.errors),
+            "errors": sorted(self.errors, key=lambda e: e["row"]),
+        }
+
+    def _fail(self, row_no: int, field: str, message: str, data: dict) -> None:
+        self.errors.append({"row": row_no, "field": field, "message": message, "data": data})
+
+    # ── lookups ───────────────────────────────────────────────────────────
+
+    def _resolve(self, cache: Dict[str, Optional[int]], id_column, key_column, keys: set) -> None:
+        missing = [k for k in keys if k not in cache]
+        for start in range(0, len(missing), LOOKUP_BATCH):
+            batch = missing[start:start + LOOKUP_BATCH]
+            found = dict((key, rid) for rid, key in self.db.query(id_column, key_column).filter(key_column.in_(batch)))
+            for key in batch:
+                cache[key] = found.get(key)
+
+    # ── validation ────────────────────────────────────────────────────────
+
+    def _validate(self, chunk: List[ParsedRow]) -> List[Tuple[int, dict, dict]]:
+        parsed = []
+        for row_no, data, error in chunk:
+            if error:
+                self._fail(row_no, "general", error, data)
+            else:
+                parsed.append((row_no, data))
+
+        taken_emails = _in_lookup(self.db, User.email, {d["email"] for _, d in parsed if d.get("email")})
+        taken_ids = _in_lookup(self.db, Employee.employee_id, {str(d["employee_id"]) for _, d in parsed if d.get("employee_id")})
+        self._resolve(self._departments, Department.id, Department.name, {d["department"] for _, d in parsed if d.get("department")})
+        self._resolve(self._positions, Position.id, Position.title, {d["position"] for _, d in parsed if d.get("position")})
+
+        valid = []
+        for row_no, data in parsed:
+            email = data.get("email")
+            employee_id = str(data["employee_id"]) if data.get("employee_id") else None
+            if not email or "@" not in email:
+                self._fail(row_no, "email", "A valid email is required", data)
+                continue
+            if email in taken_emails:
+                self._fail(row_no, "email", "Email already exists", data)
+                continue
+            if email in self._seen_emails:
+                self._fail(row_no, "email", "Duplicate email in this import", data)
+                continue
+            if employee_id in taken_ids or employee_id in self._seen_employee_ids:
+                self._fail(row_no, "employee_id", "Employee ID already exists", data)
+                continue
+
+            salary = None
+            if data.get("salary"):
+                try:
+                    salary = float(data["salary"])
+                except (TypeError, ValueError):
+                    self._fail(row_no, "salary", "Salary must be a number", data)
+                    continue
+
+            # Unparseable hire dates are dropped, as the row-by-row import did.
+            hire_date = None
+            if data.get("hire_date"):
+                try:
+                    hire_date = datetime.strptime(str(data["hire_date"]), "%Y-%m-%d").date()
+                except ValueError:
+                    pass
+
+            if not employee_id:
+                employee_id = next_employee_id(self.db)
+            self._seen_emails.add(email)
+            self._seen_employee_ids.add(employee_id)
+            user = {
+                "title": data.get("title"),
+                "first_name": data.get("first_name"),
+                "last_name": data.get("last_name"),
+                "email": email,
+                "phone": data.get("phone"),
+                "role": data.get("role") or "employee",
+                "status": "active",
+            }
+            employee = {
+                "employee_id": employee_id,
+                "position": data.get("position"),
+                "position_id": self._positions.get(data.get("position")),
+                "department_id": self._departments.get(data.get("department")),
+                "employment_type": data.get("employment_type"),
+                "employment_status": data.get("employment_status") or "full_time",
+                "hire_date": hire_date,
+                "salary": salary,
+                "work_location": data.get("work_location") or "office",
+                "work_schedule": data.get("work_schedule"),
+                "work_type": data.get("work_type"),
+            }
+            valid.append((row_no, data, {"user": user, "employee": employee}))
+        return valid
+
+    # ── insertion ─────────────────────────────────────────────────────────
+
+    def _insert(self, records: List[dict]) -> None:
+        self.db.execute(insert(User), [r["user"] for r in records])
+        emails = [r["user"]["email"] for r in records]
+        user_ids = dict((email, uid) for uid, email in self.db.query(User.id, User.email).filter(User.email.in_(emails)))
+        self.db.execute(insert(Employee), [
+            {**r["employee"], "user_id": user_ids[r["user"]["email"]]} for r in records
+        ])
+        # Core inserts skip the ORM hooks that maintain the search index.
+        reindex_employees(self.db, [
+            eid for (eid,) in self.db.query(Employee.id).filter(Employee.user_id.in_(list(user_ids.values())))
+        ])
+
+    def _process(self, chunk: List[ParsedRow]) -> None:
+        valid = self._validate(chunk)
+        if not valid:
+            return
+
+        temp_passwords = [generate_temp_plaintext(length=12, include_symbols=False) for _ in valid]
+        hashed = hash_pool.hash_many(temp_passwords, rounds=password_policy.temp_rounds)
+        for (_, _, record), temp_password, hashed_password in zip(valid, temp_passwords, hashed):
+            record["user"].update(temp_password=temp_password, hashed_password=hashed_password)
+
+        _begin(self.db)
+        try:
+            with self.db.begin_nested():
+                self._insert([record for _, _, record in valid])
+            self.success += len(valid)
+        except Exception:
+            # Replay row by row to isolate the failures.
+            for row_no, data, record in valid:
+                try:
+                    with self.db.begin_nested():
+                        self._insert([record])
+                    self.success += 1
+                except Exception as exc:
+                    self._fail(row_no, "general", str(exc.__cause__ or exc), data)
+        note_employee_ids(self.db, [record["employee"]["employee_id"] for _, _, record in valid])
+        self.db.commit()
+        # The new rows went in through Core, past the org chart's and role directory's hooks.
+        org_chart.invalidate()
+        role_directory.invalidate()
@@ -0,0 +1,236 @@
+"""Server push: a pub/sub hub behind the /api/events SSE and WebSocket endpoints.
+
+The dashboard polled /attendance/today, /notifications/unread-count and the
+admin notification feeds on timers, and the answer rarely changed in between.
+Clients now hold one stream open and refetch only when told something changed.
+
+Events go to channels:
+
+- `user:<id>`: the user's own punches, leave decisions, and new notifications.
+- `role:<role>`: role-wide feeds, e.g. admin/hr see every punch.
+- `all`: announcements.
+
+A connection subscribes to its user channel, its role channel and `all`. Each
+connection gets a bounded queue. A client too slow to drain it loses its
+oldest events first; events are hints to refetch, so that is safe.
+
+The broker carries published events to subscribers:
+
+- `LocalBroker` (the default) delivers within this process.
+- With `EVENT_BROKER_URL=redis://...`, `RedisBroker` relays every event
+  through one Redis pub/sub channel, so all workers see every publish. It
+  needs the optional `redis` package.
+
+Any object with `start(deliver)` and `publish(message)` can serve as a broker.
+
+`publish()` is safe from any thread. The sync routers call it from the
+threadpool, and delivery hops onto the event loop that owns the subscriber
+queues. Notification rows added through the ORM are published by the session
+hooks at the bottom, once committed. Core writers call `publish_on_commit`.
+"""
+import asyncio
+import json
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.notification import Notification
+
+BROADCAST = "all"
+
+
+def user_channel(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def role_channel(role: str) -> str:
+    return f"role:{role}"
+
+
+def channels_for(user) -> List[str]:
+    return [user_channel(user.id), role_channel(user.role), BROADCAST]
+
+
+class LocalBroker:
+    """In-process delivery: every publish goes straight to this worker's subscribers."""
+
+    local = True
+
+    def start(self, deliver: Callable[[str], None]) -> None:
+        self._deliver = deliver
+
+    def publish(self, message: str) -> None:
+        self._deliver(message)
+
+
+class RedisBroker:
+    """Relays events through a Redis pub/sub channel shared by all workers.
+
+    A sender thread drains an outbox, so `publish` never blocks the caller
+    on the network. A listener thread feeds every message, this worker's own
+    included, back to the hub. Both reconnect after Redis errors.
+    """
+
+    local = False
+
+    def __init__(self, url: str, channel: str = "hrm-events"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("EVENT_BROKER_URL points at Redis but the `redis` package is not installed")
+        self._redis = redis
+        self._client = redis.Redis.from_url(url)
+        self._channel = channel
+        self._outbox: "queue.Queue[str]" = queue.Queue()
+
+    def start(self, deliver: Callable[[str], None]) -> None:
+        self._deliver = deliver
+        threading.Thread(target=self._send, name="event-broker-send", daemon=True).start()
+        threading.Thread(target=self._listen, name="event-broker-listen", daemon=True).start()
+
+    def publish(self, message: str) -> None:
+        self._outbox.put(message)
+
+    def _send(self) -> None:
+        while True:
+            message = self._outbox.get()
+            try:
+                self._client.publish(self._channel, message)
+            except self._redis.RedisError as exc:
+                print(f"[events] publish failed, event dropped: {exc}")
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._channel)
+                for item in pubsub.listen():
+                    self._deliver(item["data"].decode())
+            except self._redis.RedisError as exc:
+                print(f"[events] broker connection lost, retrying: {exc}")
+                time.sleep(1)
+
+
+def make_broker(url: str):
+    if not url or url == "memory":
+        return LocalBroker()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url)
+    raise ValueError(f"Unsupported EVENT_BROKER_URL: {url}")
+
+
+class EventHub:
+    def __init__(self, broker, queue_size: int):
+        self.broker = broker
+        self.queue_size = max(1, queue_size)
+        # channel -> subscriber queues; touched only on the event loop thread
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._started = False
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+
+    def _start(self) -> None:
+        with self._lock:
+            if not self._started:
+                self.broker.start(self._receive)
+                self._started = True
+
+    def publish(self, channels: Iterable[str], name: str, data: Any = None) -> None:
+        """Send event `name` with a JSON-able `data` to `channels`. Any thread."""
+        if self.broker.local and not self._subscribers:
+            return
+        self._start()
+        self.published += 1
+        self.broker.publish(json.dumps({"channels": list(channels), "event": name, "data": data}, default=str))
+
+    def _receive(self, message: str) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._fanout, message)
+        except RuntimeError:
+            pass  # loop shut down between the check and the call
+
+    def _fanout(self, message: str) -> None:
+        payload = json.loads(message)
+        targets: Set[asyncio.Queue] = set()
+        for channel in payload.pop("channels"):
+            targets |= self._subscribers.get(channel, set())
+        for target in targets:
+            if target.full():
+                target.get_nowait()
+                self.dropped += 1
+            target.put_nowait(payload)
+
+    @contextmanager
+    def subscribe(self, channels: Iterable[str]):
+        """Yield a queue of {"event", "data"} dicts. Call on the event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._start()
+        channels = list(channels)
+        inbox: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        for channel in channels:
+            self._subscribers.setdefault(channel, set()).add(inbox)
+        try:
+            yield inbox
+        finally:
+            for channel in channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(inbox)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    @property
+    def connections(self) -> int:
+        return len({q for subscribers in self._subscribers.values() for q in subscribers})
+
+
+event_hub = EventHub(make_broker(settings.event_broker_url), settings.event_queue_size)
+
+
+def notification_event(row) -> dict:
+    return {
+        "id": row.id,
+        "title": row.title,
+        "notification_type": row.notification_type,
+        "priority": row.priority,
+    }
+
+
+def publish_on_commit(session: Session, created: List[tuple]) -> None:
+    """Queue (recipient id, notification_event) pairs until `session` commits.
+
+    For notifications written through Core, which the hooks below do not see.
+    """
+    if created:
+        session.info.setdefault("pending_notification_events", []).extend(created)
+
+
+# As in principal_cache: collect at flush, publish only once committed.
+@event.listens_for(Session, "after_flush")
+def _collect_notifications(session, flush_context):
+    publish_on_commit(session, [
+        (obj.recipient_id, notification_event(obj))
+        for obj in session.new if isinstance(obj, Notification)
+    ])
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_notifications(session):
+    for recipient_id, data in session.info.pop("pending_notification_events", ()):
+        event_hub.publish([user_channel(recipient_id)], "notification", data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_notifications(session):
+    session.info.pop("pending_notification_events", None)
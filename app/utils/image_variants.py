@@ -0,0 +1,198 @@
+"""Thumbnails: small WebP renditions of blob store images for list views.
+
+Album grids, award and celebration cards, the directory and the attendance
+log all showed avatars and covers at full resolution. Each blob store image
+(app/utils/blob_store.py) now also has fixed-size variants:
+
+- `avatar`: fits in 128x128, for people in lists.
+- `thumb`: fits in 480x480, for album covers and grids.
+
+A variant is a WebP file under `image_variant_dir`, named by the source's
+sha256 and the variant's size. The files are only a cache: deleting them (or
+changing a size) makes them render again.
+
+Rendering is CPU-bound, so it runs in a process pool of
+`image_variant_workers` processes. Uploads queue their variants right away.
+GET /api/blobs/{sha256}/{variant} serves the file once it exists. Until then
+it queues the render and redirects to the original, so rows moved in by the
+migration get variants on first view. A source Pillow cannot read is not
+retried until restart.
+
+A worker that dies (e.g. out of memory on a huge decode) breaks the whole
+pool and fails every render in it. The pool is then replaced on the next
+schedule and those renders may be queued again. Only a source that has
+broken the pool MAX_CRASHES times is given up on. Queuing variants is
+best-effort: it never fails the upload or request it runs in.
+
+`thumbnail_url()` maps a stored URL to its variant's URL. Anything that is
+not a blob store URL (external links, leftover data URIs) comes back as is.
+So does everything when the pool is off: with 0 workers, or without the
+optional Pillow package.
+"""
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, List, Optional, Set, Tuple
+
+from ..config import settings
+from .blob_store import blob_store
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional: list views fall back to the originals
+    Image = None
+
+VARIANTS = {"avatar": 128, "thumb": 480}
+MEDIA_TYPE = "image/webp"
+MAX_CRASHES = 2
+
+
+def _render(source: str, targets: List[Tuple[int, str]], quality: int) -> None:
+    """Write a WebP of `source` fitting in size x size to each (size, path). Runs in a worker process."""
+    with Image.open(source) as image:
+        # JPEGs decode straight at a reduced scale instead of full size.
+        largest = max(size for size, _ in targets)
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            transparent = image.mode in ("LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if transparent else "RGB")
+        for size, path in targets:
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+            directory = os.path.dirname(path)
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as temp:
+                    variant.save(temp, "WEBP", quality=quality, method=4)
+                os.replace(temp_path, path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+
+
+class VariantPipeline:
+    def __init__(self, root: str, workers: int, quality: int):
+        self.root = root
+        self.workers = workers
+        self.quality = quality
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Re-entrant: cancelling futures in _discard_pool runs their callbacks here.
+        self._lock = threading.RLock()
+        self._pending: Set[str] = set()
+        self._failed: Set[str] = set()
+        self._crashes: Counter = Counter()  # digest -> pools it was in when they broke
+
+    @property
+    def enabled(self) -> bool:
+        return Image is not None and self.workers > 0
+
+    def path(self, digest: str, name: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], f"{digest}-{VARIANTS[name]}.webp")
+
+    def _discard_pool(self, pool: Optional[ProcessPoolExecutor]) -> None:
+        # Under self._lock. A broken pool refuses every submit; the next
+        # _executor() call starts a new one.
+        if pool is not None and self._pool is pool:
+            self._pool = None
+            self._pending.clear()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Not fork: the server process has threads (and their locks) a
+            # forked child would inherit mid-use.
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def schedule(self, digest: str, names: Iterable[str]) -> int:
+        """Queue the missing variants of blob `digest`. Returns how many were queued."""
+        source = blob_store.locate(digest) if self.enabled else None
+        if source is None:
+            return 0
+        with self._lock:
+            targets = []
+            for name in names:
+                path = self.path(digest, name)
+                if path not in self._pending and path not in self._failed and not os.path.exists(path):
+                    self._pending.add(path)
+                    targets.append((VARIANTS[name], path))
+            if not targets:
+                return 0
+            pool = self._executor()
+            try:
+                future = pool.submit(_render, source, targets, self.quality)
+            except BrokenProcessPool:
+                self._discard_pool(pool)
+                pool = self._executor()
+                self._pending.update(path for _, path in targets)
+                future = pool.submit(_render, source, targets, self.quality)
+        future.add_done_callback(lambda done: self._finished(digest, targets, pool, done))
+        return len(targets)
+
+    def _finished(self, digest: str, targets: List[Tuple[int, str]], pool, future) -> None:
+        if future.cancelled():  # its pool was discarded; may be queued again
+            with self._lock:
+                for _, path in targets:
+                    self._pending.discard(path)
+            return
+        error = future.exception()
+        crashed = isinstance(error, BrokenProcessPool)
+        with self._lock:
+            if crashed:
+                self._discard_pool(pool)
+                self._crashes[digest] += 1
+            give_up = error is not None and (not crashed or self._crashes[digest] >= MAX_CRASHES)
+            for _, path in targets:
+                self._pending.discard(path)
+                if give_up:
+                    self._failed.add(path)
+        if error is not None:
+            print(f"[image-variants] could not render {digest}: {error!r}")
+
+    def wait(self) -> None:
+        """Block until every queued render has finished (scripts and shutdown)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+variant_pipeline = VariantPipeline(
+    settings.image_variant_dir, settings.image_variant_workers, settings.image_variant_quality,
+)
+
+
+def thumbnail_url(url: Optional[str], name: str) -> Optional[str]:
+    """URL of variant `name` of a stored image URL; other values unchanged."""
+    if variant_pipeline.enabled and blob_store.digest_from_url(url) is not None:
+        return f"{url}/{name}"
+    return url
+
+
+def queue_variants(url: Optional[str], *names: str) -> None:
+    """Queue variants of a stored image URL. Best-effort: logs instead of raising."""
+    digest = blob_store.digest_from_url(url)
+    if digest is None:
+        return
+    try:
+        variant_pipeline.schedule(digest, names)
+    except Exception as exc:
+        print(f"[image-variants] could not queue {digest}: {exc!r}")
+
+
+def store_image(value: Optional[str], *names: str) -> Optional[str]:
+    """The value to save for an uploaded image: data URIs move into the blob
+    store (with `names` queued), anything else is returned unchanged."""
+    stored = blob_store.store_data_uri(value)
+    if stored is None:
+        return value
+    queue_variants(stored[0], *names)
+    return stored[0]
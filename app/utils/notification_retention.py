@@ -0,0 +1,257 @@
+"""Notification retention: sweep old rows out of `notifications` into an archive.
+
+A read row leaves the live table when either:
+
+- it has expired (`expires_at` in the past); or
+- it is older than its type's retention: the number of days in
+  `notification_retention_policy[type]`, else `notification_retention_days`.
+  0 keeps that type forever.
+
+Unread rows stay, expired or not, so nothing disappears before its recipient
+has seen it. With `notification_archive_unread_expired` on, unread rows go
+too once they expire.
+
+A sweep walks the eligible ids in ascending order, `batch_size` at a time. Each
+batch is copied to the archive and deleted in one transaction:
+
+- `table` (the default): INSERT ... SELECT into `notifications_archive`. A
+  batch is archived exactly once.
+- `ndjson`: appended to one gzip NDJSON file per sweep under
+  `notification_archive_dir`, fsynced before the delete commits. A crash in
+  between repeats the batch in the next sweep's file but never loses it.
+
+Archived unread rows come off the unread counters in the same transaction.
+
+SQLite keeps freed pages inside the file. `notification_retention_vacuum`
+decides what happens after a sweep that moved rows:
+
+- "incremental": `PRAGMA incremental_vacuum`. It only works once the database
+  has auto_vacuum=INCREMENTAL, which in turn needs one full VACUUM to switch
+  on. The sweep logs if it is not set.
+- "full": VACUUM. It rewrites the whole file and blocks writers while it runs.
+
+`start_worker()` sweeps every `notification_retention_interval_hours`.
+`retention_metrics` holds running totals and the last sweep's numbers. It is
+served by GET /api/notifications/retention.
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, insert, or_, select, true
+
+from ..config import settings
+from ..database import SessionLocal, engine
+from ..models.notification import Notification, NotificationArchive
+from . import unread_counts
+
+_ARCHIVED = [c.key for c in NotificationArchive.__table__.columns if c.key != "archived_at"]
+_COLUMNS = Notification.__table__.columns
+
+retention_metrics: Dict[str, object] = {
+    "sweeps": 0,
+    "rows_archived": 0,
+    "rows_by_type": {},
+    "payload_bytes": 0,
+    "archive_bytes_written": 0,
+    "db_bytes_freed": 0,
+    "last_sweep": None,
+}
+_sweep_lock = threading.Lock()
+
+
+def _eligible(now: datetime):
+    policy = settings.notification_retention_policy
+    aged = [
+        and_(Notification.notification_type == ntype, Notification.created_at < now - timedelta(days=days))
+        for ntype, days in policy.items() if days > 0
+    ]
+    if settings.notification_retention_days > 0:
+        aged.append(and_(
+            Notification.notification_type.notin_(list(policy)) if policy else true(),
+            Notification.created_at < now - timedelta(days=settings.notification_retention_days),
+        ))
+    expired = Notification.expires_at < now
+    eligible = and_(Notification.is_read == true(), or_(expired, *aged))
+    if settings.notification_archive_unread_expired:
+        eligible = or_(eligible, expired)
+    return eligible
+
+
+class _NdjsonSink:
+    def __init__(self, directory: str, started: datetime):
+        self.path = os.path.join(directory, f"notifications-{started:%Y%m%dT%H%M%S}.ndjson.gz")
+        self._raw = None
+        self._gzip = None
+
+    def write(self, rows: List[dict]) -> int:
+        if self._raw is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._raw = open(self.path, "ab")
+            self._gzip = gzip.GzipFile(fileobj=self._raw, mode="ab")
+        start = self._raw.tell()
+        for row in rows:
+            self._gzip.write(json.dumps(row, default=str).encode() + b"\n")
+        # Durable before the rows are deleted.
+        self._gzip.flush()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        return self._raw.tell() - start
+
+    def close(self) -> int:
+        if self._raw is None:
+            return 0
+        self._gzip.close()
+        self._raw.close()
+        return os.path.getsize(self.path)
+
+
+def _archive_batch(db, ids: List[int], sink: Optional[_NdjsonSink]) -> dict:
+    in_batch = Notification.id.in_(ids)
+    stats = db.execute(
+        select(
+            Notification.recipient_id, Notification.notification_type, Notification.is_read,
+            func.count(),
+            func.coalesce(func.sum(func.length(Notification.title) + func.length(Notification.message)), 0),
+        ).where(in_batch).group_by(Notification.recipient_id, Notification.notification_type, Notification.is_read)
+    ).all()
+
+    written = 0
+    if sink is None:
+        db.execute(insert(NotificationArchive).from_select(
+            _ARCHIVED, select(*[_COLUMNS[key] for key in _ARCHIVED]).where(in_batch)
+        ))
+    else:
+        rows = [dict(row._mapping) for row in db.execute(select(Notification.__table__).where(in_batch))]
+        written = sink.write(rows)
+    db.execute(delete(Notification).where(in_batch), execution_options={"synchronize_session": False})
+
+    unread: Counter = Counter()
+    by_type: Counter = Counter()
+    payload = 0
+    for recipient_id, ntype, is_read, count, size in stats:
+        by_type[ntype] += count
+        payload += size
+        if is_read is False:
+            unread[recipient_id] -= count
+    # Core delete: the unread-counter hooks don't see it.
+    unread_counts.adjust(db, unread)
+    db.commit()
+    return {"rows": len(ids), "by_type": by_type, "payload_bytes": payload, "archive_bytes": written}
+
+
+def _sqlite_file_bytes(connection) -> int:
+    page_size = connection.exec_driver_sql("PRAGMA page_size").scalar()
+    return connection.exec_driver_sql("PRAGMA page_count").scalar() * page_size
+
+
+def _vacuum(mode: str) -> dict:
+    if engine.dialect.name != "sqlite" or mode not in ("incremental", "full"):
+        return {}
+    with engine.connect() as connection:
+        # VACUUM cannot run inside a transaction.
+        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+        page_size = connection.exec_driver_sql("PRAGMA page_size").scalar()
+        free_bytes = connection.exec_driver_sql("PRAGMA freelist_count").scalar() * page_size
+        before = _sqlite_file_bytes(connection)
+        if mode == "incremental":
+            if connection.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+                print("[notification-retention] incremental vacuum needs PRAGMA auto_vacuum=INCREMENTAL "
+                      "(and one full VACUUM to take effect); skipped")
+                return {"free_bytes": free_bytes}
+            connection.exec_driver_sql("PRAGMA incremental_vacuum")
+        else:
+            connection.exec_driver_sql("VACUUM")
+        return {"free_bytes": free_bytes, "db_bytes_freed": before - _sqlite_file_bytes(connection)}
+
+
+def sweep(batch_size: Optional[int] = None) -> Optional[dict]:
+    """Archive every eligible notification. Returns this sweep's numbers, or
+    None if another sweep is already running in this process."""
+    if not _sweep_lock.acquire(blocking=False):
+        return None
+    try:
+        batch_size = max(1, batch_size or settings.notification_retention_batch_size)
+        started = datetime.utcnow()
+        clock = time.monotonic()
+        sink = _NdjsonSink(settings.notification_archive_dir, started) if settings.notification_archive == "ndjson" else None
+        moved, payload, archive_bytes, by_type = 0, 0, 0, Counter()
+        eligible = _eligible(started)
+        db = SessionLocal()
+        try:
+            last_id = 0
+            while True:
+                ids = [nid for (nid,) in db.execute(
+                    select(Notification.id).where(eligible, Notification.id > last_id)
+                    .order_by(Notification.id).limit(batch_size)
+                )]
+                if not ids:
+                    break
+                last_id = ids[-1]
+                batch = _archive_batch(db, ids, sink)
+                moved += batch["rows"]
+                payload += batch["payload_bytes"]
+                archive_bytes += batch["archive_bytes"]
+                by_type.update(batch["by_type"])
+        except Exception as exc:
+            db.rollback()
+            print(f"[notification-retention] sweep stopped after {moved} row(s): {exc}")
+        finally:
+            db.close()
+            if sink is not None:
+                sink.close()
+
+        vacuum = {}
+        if moved:
+            try:
+                vacuum = _vacuum(settings.notification_retention_vacuum)
+            except Exception as exc:
+                # e.g. VACUUM could not get its exclusive lock; the rows are archived regardless
+                print(f"[notification-retention] vacuum skipped: {exc}")
+        result = {
+            "started_at": started.isoformat(),
+            "seconds": round(time.monotonic() - clock, 3),
+            "rows_archived": moved,
+            "rows_by_type": dict(by_type),
+            "payload_bytes": payload,
+            "archive": sink.path if sink is not None and archive_bytes else settings.notification_archive,
+            "archive_bytes_written": archive_bytes,
+            **vacuum,
+        }
+        retention_metrics["sweeps"] += 1
+        retention_metrics["rows_archived"] += moved
+        retention_metrics["rows_by_type"] = dict(Counter(retention_metrics["rows_by_type"]) + by_type)
+        retention_metrics["payload_bytes"] += payload
+        retention_metrics["archive_bytes_written"] += archive_bytes
+        retention_metrics["db_bytes_freed"] += vacuum.get("db_bytes_freed", 0)
+        retention_metrics["last_sweep"] = result
+        if moved:
+            print(f"[notification-retention] archived {moved} notification(s) in {result['seconds']}s")
+        return result
+    finally:
+        _sweep_lock.release()
+
+
+_stop = threading.Event()
+
+
+def _run() -> None:
+    interval = settings.notification_retention_interval_hours * 3600
+    while not _stop.wait(interval):
+        try:
+            sweep()
+        except Exception as exc:
+            print(f"[notification-retention] sweep failed: {exc}")
+
+
+def start_worker() -> bool:
+    """Start the periodic sweep thread unless the interval is 0. Call at startup."""
+    if settings.notification_retention_interval_hours <= 0:
+        return False
+    threading.Thread(target=_run, name="notification-retention", daemon=True).start()
+    return True
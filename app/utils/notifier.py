@@ -0,0 +1,200 @@
+"""Notification fan-out: resolve recipients, write them in bulk, optionally off-request.
+
+Leave requests, asset tickets and requisitions notify every holder of one or
+more roles. Each used to run its own `User.role.in_` query and `db.add()` one
+ORM `Notification` per recipient, inside the request. `notify()` replaces
+that:
+
+- Role holders come from `RoleDirectory`, an in-memory role -> active user
+  ids index. It loads once and is kept current by the session hooks at the
+  bottom. Like the org chart, it reloads every `role_directory_ttl_seconds`
+  so other workers' changes show up.
+- Rows go in through one Core `insert()` executed with the list of rows.
+  SQLAlchemy sends that as a few multi-row INSERTs sized to the driver's
+  parameter limit ("insertmanyvalues"), compiled once and cached. Push
+  events for the rows are published when the transaction commits.
+- With `NOTIFICATION_DELIVERY=background` the insert is handed to a worker
+  thread once the caller's transaction commits, so a request that rolls
+  back notifies nobody. The request returns without waiting for the write.
+  A crash between the commit and the write loses those notifications; the
+  default, `inline`, writes them in the caller's transaction.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.notification import Notification
+from ..models.user import User
+from . import unread_counts
+from .event_hub import notification_event, publish_on_commit
+
+_FIELDS = ("role", "status")
+
+
+class RoleDirectory:
+    def __init__(self, ttl_seconds: float):
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._holders: Dict[str, Set[int]] = {}
+        self._role_of: Dict[int, str] = {}
+
+    def _unlink(self, user_id: int) -> None:
+        role = self._role_of.pop(user_id, None)
+        if role is not None:
+            self._holders[role].discard(user_id)
+
+    def _link(self, user_id: int, role: str) -> None:
+        self._role_of[user_id] = role
+        self._holders.setdefault(role, set()).add(user_id)
+
+    def _ensure(self, db: Session) -> None:
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return
+        rows = db.query(User.id, User.role).filter(User.status == "active").all()
+        with self._lock:
+            self._holders, self._role_of = {}, {}
+            for user_id, role in rows:
+                self._link(user_id, role)
+            self._loaded_at = time.monotonic()
+
+    def apply(self, changes: Dict[int, Optional[str]]) -> None:
+        """Apply committed users: user id -> role if active, else None."""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for user_id, role in changes.items():
+                self._unlink(user_id)
+                if role is not None:
+                    self._link(user_id, role)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    def holders(self, db: Session, roles: Iterable[str]) -> Set[int]:
+        """Active user ids holding any of `roles`."""
+        self._ensure(db)
+        with self._lock:
+            return set().union(*(self._holders.get(role, ()) for role in roles))
+
+
+role_directory = RoleDirectory(settings.role_directory_ttl_seconds)
+
+_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.notification_worker_threads),
+    thread_name_prefix="notify",
+)
+
+
+def _write(db: Session, recipient_ids: List[int], fields: dict) -> None:
+    rows = [{**fields, "recipient_id": rid, "is_read": False} for rid in recipient_ids]
+    # Core inserts are invisible to the unread-counter hooks.
+    unread_counts.added(db, recipient_ids)
+    if not db.get_bind().dialect.insert_executemany_returning:
+        db.execute(insert(Notification), rows)
+        return
+    result = db.execute(insert(Notification).returning(Notification.id, Notification.recipient_id), rows)
+    publish_on_commit(db, [
+        (rid, notification_event(SimpleNamespace(id=nid, **fields))) for nid, rid in result
+    ])
+
+
+def _deliver(recipient_ids: List[int], fields: dict) -> None:
+    db = SessionLocal()
+    try:
+        _write(db, recipient_ids, fields)
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        print(f"[notify] dropped {len(recipient_ids)} '{fields['title']}' notification(s): {exc}")
+    finally:
+        db.close()
+
+
+def notify(
+    db: Session,
+    recipient_ids: Iterable[int] = (),
+    *,
+    roles: Iterable[str] = (),
+    exclude: Iterable[int] = (),
+    sender_id: Optional[int],
+    title: str,
+    message: str,
+    notification_type: str,
+    priority: str = "medium",
+    related_entity_type: Optional[str] = None,
+    related_entity_id: Optional[int] = None,
+    action_url: Optional[str] = None,
+) -> int:
+    """Notify `recipient_ids` plus every active holder of `roles`, minus `exclude`.
+
+    The rows become visible when `db` commits (inline) or shortly after
+    (background). Returns the number of recipients.
+    """
+    recipients = set(recipient_ids)
+    roles = tuple(roles)
+    if roles:
+        recipients |= role_directory.holders(db, roles)
+    recipients -= set(exclude)
+    if not recipients:
+        return 0
+    fields = {
+        "sender_id": sender_id,
+        "title": title,
+        "message": message,
+        "notification_type": notification_type,
+        "priority": priority,
+        "is_system_generated": True,
+        "related_entity_type": related_entity_type,
+        "related_entity_id": related_entity_id,
+        "action_url": action_url,
+    }
+    if settings.notification_delivery == "background":
+        db.info.setdefault("notification_jobs", []).append((sorted(recipients), fields))
+    else:
+        _write(db, sorted(recipients), fields)
+    return len(recipients)
+
+
+# As in principal_cache: collect at flush, apply only once committed.
+@event.listens_for(Session, "after_flush")
+def _collect_role_changes(session, flush_context):
+    changes = {}
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, User) and (obj in session.new or any(
+            inspect(obj).attrs[name].history.has_changes() for name in _FIELDS
+        )):
+            changes[obj.id] = obj.role if obj.status == "active" else None
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changes[obj.id] = None
+    if changes:
+        session.info.setdefault("role_directory_changes", {}).update(changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_role_changes(session):
+    changes = session.info.pop("role_directory_changes", None)
+    if changes:
+        role_directory.apply(changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_notification_jobs(session):
+    for recipient_ids, fields in session.info.pop("notification_jobs", ()):
+        _executor.submit(_deliver, recipient_ids, fields)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("role_directory_changes", None)
+    session.info.pop("notification_jobs", None)
@@ -0,0 +1,196 @@
+"""In-memory reporting tree for team-lead scoping.
+
+Team leads see their team's leaves and attendance. Each of those checks used
+to query `employees` per request, and `_is_team_member` did it twice, because
+`Employee.manager_id` holds the lead's user id or their employee id,
+depending on which writer set it. `OrgChart` loads (id, user_id, manager_id)
+for every employee once and indexes reports by the raw `manager_id`. A lead
+is matched under both keys, their user id and their employee id:
+
+- `direct_reports(lead)`: two dict lookups.
+- `subtree(lead)`: a walk over the lead's org only.
+- `is_in_org(lead, user)`: a walk up from `user` through its managers.
+- `manager(user)`: the one lead to notify. Only a reading whose user holds a
+  lead role counts, so the other reading never notifies an unrelated user.
+
+Everything is in user ids, like `Leave.employee_id` and `Attendance.employee_id`.
+
+Committed ORM writes to an Employee's `user_id` / `manager_id` (and inserts and
+deletes) are applied incrementally by the session hooks at the bottom. Core
+bulk writers must call `org_chart.invalidate()`, which reloads on the next
+read. The chart is per-process, so other workers reload within
+`org_chart_ttl_seconds`.
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.employee import Employee
+from .notifier import role_directory
+
+_FIELDS = ("user_id", "manager_id")
+# Roles whose holders may be notified as someone's manager
+LEAD_ROLES = ("team_lead", "admin", "hr")
+
+
+class OrgChart:
+    def __init__(self, ttl_seconds: float):
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        # employee id -> (user id, raw manager_id)
+        self._employees: Dict[int, Tuple[int, Optional[int]]] = {}
+        self._employee_of_user: Dict[int, int] = {}
+        # raw manager_id -> employee ids carrying it
+        self._reports: Dict[int, Set[int]] = {}
+
+    # ── index maintenance ─────────────────────────────────────────────────
+
+    def _unlink(self, employee_id: int) -> None:
+        old = self._employees.pop(employee_id, None)
+        if old is None:
+            return
+        user_id, manager_id = old
+        if self._employee_of_user.get(user_id) == employee_id:
+            del self._employee_of_user[user_id]
+        if manager_id is not None:
+            reports = self._reports.get(manager_id)
+            if reports is not None:
+                reports.discard(employee_id)
+                if not reports:
+                    del self._reports[manager_id]
+
+    def _link(self, employee_id: int, user_id: int, manager_id: Optional[int]) -> None:
+        self._employees[employee_id] = (user_id, manager_id)
+        self._employee_of_user[user_id] = employee_id
+        if manager_id is not None:
+            self._reports.setdefault(manager_id, set()).add(employee_id)
+
+    def _ensure(self, db: Session) -> None:
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return
+        rows = db.query(Employee.id, Employee.user_id, Employee.manager_id).all()
+        with self._lock:
+            self._employees, self._employee_of_user, self._reports = {}, {}, {}
+            for employee_id, user_id, manager_id in rows:
+                self._link(employee_id, user_id, manager_id)
+            self._loaded_at = time.monotonic()
+
+    def apply(self, changes: Dict[int, Optional[Tuple[int, Optional[int]]]]) -> None:
+        """Apply committed rows: employee id -> (user_id, manager_id), or None if deleted."""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for employee_id, row in changes.items():
+                self._unlink(employee_id)
+                if row is not None:
+                    self._link(employee_id, *row)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    # ── queries (user ids in, user ids out) ───────────────────────────────
+
+    def _direct(self, lead_user_id: int) -> Set[int]:
+        employee_ids = set(self._reports.get(lead_user_id, ()))
+        lead_employee_id = self._employee_of_user.get(lead_user_id)
+        if lead_employee_id is not None:
+            employee_ids |= self._reports.get(lead_employee_id, set())
+        reports = {self._employees[e][0] for e in employee_ids}
+        reports.discard(lead_user_id)
+        return reports
+
+    def _readings(self, user_id: int) -> List[int]:
+        """User ids `manager_id` may refer to: as an employee id (the column's
+        foreign key) first, then as a user id. Either may be the one the writer meant."""
+        employee_id = self._employee_of_user.get(user_id)
+        manager_id = self._employees[employee_id][1] if employee_id is not None else None
+        if manager_id is None:
+            return []
+        readings = [self._employees[manager_id][0]] if manager_id in self._employees else []
+        return [reading for reading in readings + [manager_id] if reading != user_id]
+
+    def _managers(self, user_id: int) -> Set[int]:
+        return set(self._readings(user_id))
+
+    def direct_reports(self, db: Session, lead_user_id: int) -> Set[int]:
+        self._ensure(db)
+        with self._lock:
+            return self._direct(lead_user_id)
+
+    def subtree(self, db: Session, lead_user_id: int) -> Set[int]:
+        """Everyone below the lead, at any depth (the lead excluded)."""
+        self._ensure(db)
+        seen: Set[int] = set()
+        with self._lock:
+            queue = deque([lead_user_id])
+            while queue:
+                for report in self._direct(queue.popleft()):
+                    if report not in seen and report != lead_user_id:
+                        seen.add(report)
+                        queue.append(report)
+        return seen
+
+    def manager(self, db: Session, user_id: int) -> Optional[int]:
+        """The user's lead, to notify: the first reading of `manager_id` whose
+        user holds a lead role. The other reading may be an unrelated user."""
+        self._ensure(db)
+        leads = role_directory.holders(db, LEAD_ROLES)
+        with self._lock:
+            return next((reading for reading in self._readings(user_id) if reading in leads), None)
+
+    def is_in_org(self, db: Session, lead_user_id: int, user_id: int, direct_only: bool = False) -> bool:
+        """True if `user_id` reports to the lead, directly or (unless
+        `direct_only`) through any chain of managers."""
+        self._ensure(db)
+        with self._lock:
+            if direct_only:
+                return lead_user_id in self._managers(user_id)
+            seen = {user_id}
+            queue = deque([user_id])
+            while queue:
+                for manager in self._managers(queue.popleft()):
+                    if manager == lead_user_id:
+                        return True
+                    if manager not in seen:
+                        seen.add(manager)
+                        queue.append(manager)
+        return False
+
+
+org_chart = OrgChart(settings.org_chart_ttl_seconds)
+
+
+# As in principal_cache: collect at flush, apply only once committed.
+@event.listens_for(Session, "after_flush")
+def _collect_reporting_changes(session, flush_context):
+    changes = {}
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Employee) and (obj in session.new or any(
+            inspect(obj).attrs[name].history.has_changes() for name in _FIELDS
+        )):
+            changes[obj.id] = (obj.user_id, obj.manager_id)
+    for obj in session.deleted:
+        if isinstance(obj, Employee):
+            changes[obj.id] = None
+    if changes:
+        session.info.setdefault("org_chart_changes", {}).update(changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_reporting_changes(session):
+    changes = session.info.pop("org_chart_changes", None)
+    if changes:
+        org_chart.apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_reporting_changes(session):
+    session.info.pop("org_chart_changes", None)
@@ -0,0 +1,75 @@
+"""Keyset (cursor) pagination and NDJSON streaming for large listings.
+
+Listings are ordered newest first on (sort column, id). The cursor is the
+opaque, URL-safe encoding of the last row's (sort value, id) pair. The next
+page seeks past it, so cost stays flat however deep the client pages, unlike
+OFFSET. The next cursor goes back in the `X-Next-Cursor` header so the body
+keeps its existing list shape.
+
+`ndjson_response` streams a query one row per line with `yield_per` on its
+own session, so worker memory stays flat whatever the table size. Lines go
+out one batch per chunk.
+"""
+import base64
+import json
+from datetime import date
+from itertools import islice
+from typing import Callable, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
+
+from ..database import SessionLocal
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+STREAM_BATCH_SIZE = 500
+
+
+def encode_cursor(sort_value: date, row_id: int) -> str:
+    raw = json.dumps([sort_value.isoformat(), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        return date.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+
+
+def seek(query, sort_column, id_column, cursor: Optional[str]):
+    """Order newest first on (sort_column, id_column) and resume after `cursor`."""
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < row_id),
+        ))
+    return query.order_by(sort_column.desc(), id_column.desc())
+
+
+def set_next_cursor(response: Response, rows: list, limit: int,
+                    key: Callable[[object], Tuple[date, int]]) -> None:
+    """A full page may have more behind it; a short page is the last one."""
+    if rows and len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+
+
+def ndjson_response(query, serialize: Callable[[object], dict]) -> StreamingResponse:
+    """Stream `query` as newline-delimited JSON on a session of its own."""
+    def rows():
+        db = SessionLocal()
+        try:
+            # One chunk per batch: StreamingResponse moves to the threadpool
+            # for every chunk a sync iterator yields.
+            results = iter(query.with_session(db).yield_per(STREAM_BATCH_SIZE))
+            while batch := list(islice(results, STREAM_BATCH_SIZE)):
+                yield "".join(json.dumps(jsonable_encoder(serialize(row))) + "\n" for row in batch)
+        finally:
+            db.close()
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
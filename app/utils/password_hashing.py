@@ -0,0 +1,212 @@
+"""Bounded executors for bcrypt work.
+
+bcrypt costs ~250 ms of CPU per call by design. Run inline, a login storm at
+shift start pins every request thread and starves the rest of the API. Here
+interactive hashing goes through a small thread pool capped at
+`password_hash_concurrency` (bcrypt releases the GIL, so threads do run in
+parallel), and async handlers await it without holding a thread.
+
+Bulk work, such as temporary passwords for an employee import, fans out across
+a process pool via `hash_many`.
+
+Queue depth and latency are metered; see `hash_pool.stats()`.
+
+`password_policy` owns the hash format: the bcrypt cost to hash at, the
+verification of legacy `sha256$` digests, and whether a stored hash is due an
+upgrade. Login rehashes such hashes on success, since that is the only time
+the plaintext is at hand. With `BCRYPT_CALIBRATE` on, startup picks the
+highest cost that stays inside `BCRYPT_LATENCY_BUDGET_MS` on the current CPU.
+"""
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, List, Optional
+
+import bcrypt
+
+from ..config import settings
+
+
+LEGACY_SHA256_PREFIX = "sha256$"
+# bcrypt's own bounds on the cost factor
+MIN_BCRYPT_ROUNDS = 4
+MAX_BCRYPT_ROUNDS = 31
+
+
+def _bcrypt_hash(password: str, rounds: int) -> str:
+    # Module-level so the process pool can pickle it.
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+
+def bcrypt_rounds(hashed_password: str) -> Optional[int]:
+    """Cost factor of a `$2b$12$...` hash; None if it isn't bcrypt."""
+    parts = (hashed_password or "").split("$")
+    if len(parts) < 4 or not parts[1].startswith("2") or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordPolicy:
+    def __init__(self, rounds: int, temp_rounds: int, min_rounds: int):
+        self.min_rounds = max(MIN_BCRYPT_ROUNDS, min_rounds)
+        self.rounds = min(MAX_BCRYPT_ROUNDS, max(self.min_rounds, rounds))
+        # Temporary passwords are replaced at first login, so they are hashed
+        # cheaper to keep bulk imports fast.
+        self.temp_rounds = min(MAX_BCRYPT_ROUNDS, max(self.min_rounds, temp_rounds))
+        self.calibrated_ms: Optional[float] = None
+
+    def hash(self, password: str) -> str:
+        return _bcrypt_hash(password, self.rounds)
+
+    def hash_temp(self, password: str, rounds: Optional[int] = None) -> str:
+        """Hash a temporary password, at `temp_rounds` unless `rounds` is given."""
+        return _bcrypt_hash(password, self.temp_rounds if rounds is None else rounds)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        if not hashed_password:
+            return False
+
+        if hashed_password.startswith(LEGACY_SHA256_PREFIX):
+            expected = hashed_password.split("$", 1)[1]
+            return hashlib.sha256(plain_password.encode("utf-8")).hexdigest() == expected
+
+        try:
+            return bcrypt.checkpw(
+                plain_password.encode("utf-8"),
+                hashed_password.encode("utf-8"),
+            )
+        except Exception:
+            return False
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Legacy sha256 digests and bcrypt hashes below the target cost."""
+        rounds = bcrypt_rounds(hashed_password)
+        return rounds is None or rounds < self.rounds
+
+    def calibrate(self, budget_ms: float, max_rounds: int = 16) -> int:
+        """Raise or lower `rounds` to the highest cost whose hash fits `budget_ms`
+        on this machine, never below `min_rounds`. Each extra round doubles the
+        cost, so it times one hash at the floor and extrapolates, then confirms."""
+        started = time.perf_counter()
+        _bcrypt_hash("calibration", self.min_rounds)
+        base_ms = (time.perf_counter() - started) * 1000
+
+        rounds = self.min_rounds
+        while rounds < max_rounds and base_ms * 2 ** (rounds + 1 - self.min_rounds) <= budget_ms:
+            rounds += 1
+        while True:
+            started = time.perf_counter()
+            _bcrypt_hash("calibration", rounds)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms <= budget_ms or rounds == self.min_rounds:
+                break
+            rounds -= 1
+
+        self.rounds = rounds
+        self.calibrated_ms = round(elapsed_ms, 1)
+        return rounds
+
+    def describe(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "temp_rounds": self.temp_rounds,
+            "min_rounds": self.min_rounds,
+            "calibrated_hash_ms": self.calibrated_ms,
+        }
+
+
+class HashingPool:
+    def __init__(self, concurrency: int, processes: int, sample_size: int = 1000):
+        self.concurrency = max(1, concurrency)
+        self.processes = max(1, processes)
+        self._threads = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bcrypt")
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._bulk_hashed = 0
+        self._wait_ms = deque(maxlen=sample_size)
+        self._latency_ms = deque(maxlen=sample_size)
+
+    # ── interactive: one hash/verify per request ──────────────────────────
+
+    def _submit(self, fn: Callable, *args):
+        enqueued = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+
+        def timed():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            try:
+                return fn(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._wait_ms.append((started - enqueued) * 1000)
+                    self._latency_ms.append((finished - enqueued) * 1000)
+
+        return self._threads.submit(timed)
+
+    def run(self, fn: Callable, *args):
+        """Run `fn(*args)` on the pool and block for the result (sync handlers)."""
+        return self._submit(fn, *args).result()
+
+    async def run_async(self, fn: Callable, *args):
+        """Run `fn(*args)` on the pool without holding a request thread."""
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    # ── bulk: many hashes across processes ────────────────────────────────
+
+    def hash_many(self, passwords: List[str], rounds: int) -> List[str]:
+        """bcrypt-hash `passwords` in parallel across processes, preserving order."""
+        if not passwords:
+            return []
+        with self._lock:
+            if self._processes is None:
+                # spawn, not fork: the parent is a threaded server.
+                self._processes = ProcessPoolExecutor(max_workers=self.processes, mp_context=get_context("spawn"))
+        chunksize = max(1, len(passwords) // (self.processes * 4))
+        hashed = list(self._processes.map(_bcrypt_hash, passwords, [rounds] * len(passwords), chunksize=chunksize))
+        with self._lock:
+            self._bulk_hashed += len(hashed)
+        return hashed
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latency_ms)
+            waits = list(self._wait_ms)
+            return {
+                "concurrency": self.concurrency,
+                "processes": self.processes,
+                "queue_depth": self._queued,
+                "in_flight": self._running,
+                "completed": self._completed,
+                "bulk_hashed": self._bulk_hashed,
+                "avg_wait_ms": round(sum(waits) / len(waits), 2) if waits else 0.0,
+                "avg_latency_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+                "p95_latency_ms": round(latencies[int((len(latencies) - 1) * 0.95)], 2) if latencies else 0.0,
+                "max_latency_ms": round(latencies[-1], 2) if latencies else 0.0,
+            }
+
+
+hash_pool = HashingPool(
+    concurrency=settings.password_hash_concurrency or (os.cpu_count() or 2),
+    processes=settings.password_hash_processes or (os.cpu_count() or 2),
+)
+
+password_policy = PasswordPolicy(
+    rounds=settings.bcrypt_rounds,
+    temp_rounds=settings.bcrypt_temp_rounds,
+    min_rounds=settings.bcrypt_min_rounds,
+)
@@ -0,0 +1,266 @@
+"""Set-based payroll engine.
+
+Generates a month of payslips for a list of employees without per-employee
+round trips:
+
+1. prefetch   — one query each for existing payslips, active salary
+                structures, approved unpaid bonuses and approved unpaid leave
+                overlapping the period.
+2. compute    — earnings, loss of pay, PF and ESI in memory (`compute_payslip`).
+3. insert     — bulk INSERT of payslips, then their earning/deduction lines,
+                then a bulk UPDATE marking the bonuses paid.
+
+The arithmetic is the same as the original per-employee loop in
+`routers/payroll.py`, line for line, so both paths produce identical payslips.
+The caller owns the transaction: nothing here commits.
+"""
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from ..models.leave import Leave
+from ..models.payroll import Payslip, PayslipEarning, PayslipDeduction, SalaryStructure, Bonus
+
+# ESI statutory gross-salary eligibility ceiling (monthly). Configurable per deployment.
+ESI_GROSS_CEILING = 21000.0
+# PF statutory wage ceiling on basic (monthly). Contributions computed on min(basic, ceiling).
+PF_WAGE_CEILING = 15000.0
+
+
+@dataclass
+class PayPeriod:
+    label: str  # "YYYY-MM", as used in payslip numbers
+    start: date
+    end: date  # inclusive
+    next_month: date  # exclusive bound
+
+    @property
+    def days(self) -> int:
+        return (self.next_month - self.start).days
+
+
+def parse_pay_period(pay_period: str) -> PayPeriod:
+    """`YYYY-MM` -> PayPeriod. Raises ValueError/TypeError on bad input."""
+    year, month = (int(x) for x in pay_period.split("-"))
+    start = date(year, month, 1)
+    next_month = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return PayPeriod(label=pay_period, start=start, end=next_month - timedelta(days=1), next_month=next_month)
+
+
+@dataclass
+class ComputedPayslip:
+    employee_id: int
+    basic: float
+    total_earnings: float
+    total_deductions: float
+    net_salary: float
+    # (type, amount, description) — zero amounts are already dropped
+    earnings: List[Tuple[str, float, str]] = field(default_factory=list)
+    deductions: List[Tuple[str, float, str]] = field(default_factory=list)
+    bonus_ids: List[int] = field(default_factory=list)
+
+
+def compute_payslip(uid: int, structure: SalaryStructure, bonuses: List[Bonus],
+                    unpaid_leaves: List[Leave], period: PayPeriod) -> ComputedPayslip:
+    """Pure computation of one payslip from prefetched inputs."""
+    # Earnings
+    basic = structure.basic_salary or 0.0
+    hra = round(basic * (structure.hra_percentage or 0) / 100, 2)
+    transport = structure.transport_allowance or 0.0
+    medical = structure.medical_allowance or 0.0
+    special = structure.special_allowance or 0.0
+
+    bonus_total = round(sum(b.amount for b in bonuses), 2)
+
+    gross_before_lop = basic + hra + transport + medical + special
+
+    # Loss of pay: approved unpaid leave days overlapping the period,
+    # prorated against the fixed monthly components.
+    unpaid_days = 0.0
+    for lv in unpaid_leaves:
+        overlap_start = max(lv.start_date, period.start)
+        overlap_end = min(lv.end_date, period.end)
+        overlap = (overlap_end - overlap_start).days + 1
+        if lv.days_requested and (lv.end_date - lv.start_date).days + 1 > 0:
+            # Scale requested days by the fraction of the leave inside this period
+            total_span = (lv.end_date - lv.start_date).days + 1
+            unpaid_days += lv.days_requested * (overlap / total_span)
+        else:
+            unpaid_days += overlap
+    lop_amount = round(gross_before_lop * min(unpaid_days, period.days) / period.days, 2)
+
+    total_earnings = round(gross_before_lop + bonus_total - lop_amount, 2)
+
+    # Statutory deductions
+    pf_base = min(basic, PF_WAGE_CEILING)
+    pf = round(pf_base * (structure.pf_percentage or 0) / 100, 2)
+    # ESI applies on gross, only if gross is within the eligibility ceiling
+    esi = 0.0
+    if total_earnings <= ESI_GROSS_CEILING:
+        esi = round(total_earnings * (structure.esi_percentage or 0) / 100, 2)
+    professional_tax = structure.professional_tax or 0.0
+    total_deductions = round(pf + esi + professional_tax, 2)
+
+    net_salary = round(total_earnings - total_deductions, 2)
+
+    # Itemized lines — the audit trail behind the totals
+    earn_lines = [
+        ("basic", basic, "Basic salary"),
+        ("hra", hra, f"House rent allowance ({structure.hra_percentage or 0}% of basic)"),
+        ("transport", transport, "Transport allowance"),
+        ("medical", medical, "Medical allowance"),
+        ("special", special, "Special allowance"),
+    ]
+    earnings = [line for line in earn_lines if line[1]]
+    earnings += [("bonus", b.amount, f"{b.bonus_type.title()} bonus") for b in bonuses]
+
+    deductions = []
+    if lop_amount:
+        deductions.append(("loss_of_pay", lop_amount, f"Unpaid leave: {round(unpaid_days, 1)} day(s)"))
+    ded_lines = [
+        ("pf", pf, f"Provident fund ({structure.pf_percentage or 0}% of capped basic)"),
+        ("esi", esi, f"ESI ({structure.esi_percentage or 0}% of gross)"),
+        ("professional_tax", professional_tax, "Professional tax"),
+    ]
+    deductions += [line for line in ded_lines if line[1]]
+
+    return ComputedPayslip(
+        employee_id=uid,
+        basic=basic,
+        total_earnings=total_earnings,
+        total_deductions=total_deductions,
+        net_salary=net_salary,
+        earnings=earnings,
+        deductions=deductions,
+        bonus_ids=[b.id for b in bonuses],
+    )
+
+
+@dataclass
+class BatchResult:
+    generated: int = 0
+    skipped_existing: int = 0
+    skipped_no_structure: List[int] = field(default_factory=list)
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+
+
+def _group_by_employee(rows: Iterable) -> Dict[int, list]:
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row.employee_id].append(row)
+    return grouped
+
+
+def generate_payslips(db: Session, period: PayPeriod, user_ids: List[int],
+                      generated_by: int, pay_date: Optional[date] = None) -> BatchResult:
+    """Generate payslips for `user_ids` (in order) for `period`. Does not commit."""
+    result = BatchResult()
+    if not user_ids:
+        return result
+    pay_date = pay_date or date.today()
+    clock = time.perf_counter()
+    started = clock
+
+    def lap(phase: str):
+        nonlocal clock
+        now = time.perf_counter()
+        result.timings_ms[phase] = round((now - clock) * 1000, 2)
+        clock = now
+
+    # ── prefetch: one query per table ──────────────────────────────────────
+    existing = {
+        uid for (uid,) in db.query(Payslip.employee_id).filter(
+            Payslip.employee_id.in_(user_ids),
+            Payslip.pay_period_start == period.start,
+        )
+    }
+    structures: Dict[int, SalaryStructure] = {}
+    for s in db.query(SalaryStructure).filter(
+        SalaryStructure.employee_id.in_(user_ids),
+        SalaryStructure.is_active == True,  # noqa: E712
+    ).order_by(SalaryStructure.id):
+        # Mirrors `.first()` in the per-employee path when duplicates exist.
+        structures.setdefault(s.employee_id, s)
+    bonuses = _group_by_employee(db.query(Bonus).filter(
+        Bonus.employee_id.in_(user_ids),
+        Bonus.status == "approved",
+        Bonus.paid_in_payslip_id.is_(None),
+        Bonus.bonus_date >= period.start,
+        Bonus.bonus_date < period.next_month,
+    ).order_by(Bonus.id))
+    unpaid_leaves = _group_by_employee(db.query(Leave).filter(
+        Leave.employee_id.in_(user_ids),
+        Leave.status == "approved",
+        Leave.leave_type == "unpaid",
+        Leave.start_date <= period.end,
+        Leave.end_date >= period.start,
+    ).order_by(Leave.id))
+    lap("prefetch")
+
+    # ── compute: pure, in memory ───────────────────────────────────────────
+    computed: List[ComputedPayslip] = []
+    for uid in user_ids:
+        if uid in existing:
+            result.skipped_existing += 1
+            continue
+        structure = structures.get(uid)
+        if not structure:
+            result.skipped_no_structure.append(uid)
+            continue
+        computed.append(compute_payslip(uid, structure, bonuses.get(uid, []), unpaid_leaves.get(uid, []), period))
+    lap("compute")
+
+    # ── insert: payslips, then line items keyed by the new ids ─────────────
+    if computed:
+        db.execute(insert(Payslip), [
+            {
+                "employee_id": c.employee_id,
+                "pay_period_start": period.start,
+                "pay_period_end": period.end,
+                "pay_date": pay_date,
+                "basic_salary": c.basic,
+                "gross_salary": c.total_earnings,
+                "net_salary": c.net_salary,
+                "total_earnings": c.total_earnings,
+                "total_deductions": c.total_deductions,
+                "payslip_number": f"PAY-{c.employee_id}-{period.label}",
+                "generated_by": generated_by,
+                "status": "generated",
+            }
+            for c in computed
+        ])
+        payslip_ids = dict(
+            db.query(Payslip.employee_id, Payslip.id).filter(
+                Payslip.employee_id.in_([c.employee_id for c in computed]),
+                Payslip.pay_period_start == period.start,
+            ).all()
+        )
+
+        earning_rows, deduction_rows, bonus_rows = [], [], []
+        for c in computed:
+            pid = payslip_ids[c.employee_id]
+            earning_rows += [
+                {"payslip_id": pid, "earning_type": t, "amount": a, "description": d, "is_taxable": True}
+                for t, a, d in c.earnings
+            ]
+            deduction_rows += [
+                {"payslip_id": pid, "deduction_type": t, "amount": a, "description": d}
+                for t, a, d in c.deductions
+            ]
+            bonus_rows += [{"id": bid, "status": "paid", "paid_in_payslip_id": pid} for bid in c.bonus_ids]
+        if earning_rows:
+            db.execute(insert(PayslipEarning), earning_rows)
+        if deduction_rows:
+            db.execute(insert(PayslipDeduction), deduction_rows)
+        if bonus_rows:
+            db.execute(update(Bonus), bonus_rows)
+    result.generated = len(computed)
+    lap("insert")
+
+    result.timings_ms["total"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
@@ -0,0 +1,255 @@
+"""In-process background runner for payroll runs.
+
+A `PayrollRun` row is the job record. Workers walk the active employees in
+ascending user id, `chunk_size` at a time, and commit each chunk's payslips
+together with the run's counters and cursor (`last_user_id`). That keeps
+SQLite write locks short, so check-ins are not blocked for the length of a
+run, and a crashed run resumes from the last committed chunk.
+
+If a chunk fails as a whole, it is rolled back and replayed one employee at a
+time, so a single bad record shows up in `failed` instead of sinking the run.
+Generation is idempotent per employee and period, so replaying is safe.
+
+Every uvicorn worker runs this module, so a run is leased before it is
+processed. `_claim` is one conditional UPDATE that takes a queued run, or a
+running one whose `heartbeat_at` is older than `payroll_run_lease_seconds`
+(its worker died), and stamps it with this process's `owner`. Only the
+worker whose UPDATE matched proceeds. Progress is only written by `_save`, an
+UPDATE guarded by the same owner check that also renews the lease, in the
+transaction of the payslips it accounts for. A worker that lost its lease
+matches no row there, rolls the chunk (or replayed employee) back and stops.
+A watcher thread re-offers stale runs every lease period.
+"""
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.employee import Employee
+from ..models.payroll import PayrollRun
+from ..models.user import User
+from .payroll_engine import BatchResult, generate_payslips, parse_pay_period
+
+ACTIVE_STATUSES = ("queued", "running")
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.payroll_worker_threads),
+    thread_name_prefix="payroll-run",
+)
+
+
+def submit_run(run_id: int) -> None:
+    _executor.submit(_execute, run_id)
+
+
+def _claimable(now: datetime):
+    stale = now - timedelta(seconds=settings.payroll_run_lease_seconds)
+    return or_(
+        PayrollRun.status == "queued",
+        and_(
+            PayrollRun.status == "running",
+            or_(PayrollRun.heartbeat_at.is_(None), PayrollRun.heartbeat_at < stale),
+        ),
+    )
+
+
+def _claim(db: Session, run_id: int) -> bool:
+    """Lease run `run_id` to this process. False if another worker holds it or it is finished."""
+    now = datetime.utcnow()
+    result = db.execute(
+        update(PayrollRun)
+        .where(PayrollRun.id == run_id, _claimable(now))
+        .values(status="running", owner=WORKER_ID, heartbeat_at=now, error=None),
+        execution_options={"synchronize_session": False},
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def resume_interrupted_runs() -> int:
+    """Offer every queued run, and every running run whose lease expired, to
+    this process's workers. Call at startup; the watcher repeats it."""
+    db = SessionLocal()
+    try:
+        ids = [rid for (rid,) in db.query(PayrollRun.id).filter(_claimable(datetime.utcnow()))]
+    finally:
+        db.close()
+    for rid in ids:
+        submit_run(rid)
+    return len(ids)
+
+
+_stop = threading.Event()
+
+
+def _watch() -> None:
+    while not _stop.wait(settings.payroll_run_lease_seconds):
+        try:
+            resume_interrupted_runs()
+        except Exception as exc:
+            print(f"[payroll-runs] stale run check failed: {exc}")
+
+
+def start_payroll_run_watcher() -> None:
+    """Re-offer runs whose worker died, every lease period. Call at startup."""
+    threading.Thread(target=_watch, name="payroll-run-watcher", daemon=True).start()
+
+
+def _active_user_ids(db: Session):
+    # Active = the linked user account is active (Employee has no status column)
+    return (
+        db.query(Employee.user_id)
+        .join(User, User.id == Employee.user_id)
+        .filter(User.status == "active")
+    )
+
+
+class _LeaseLost(Exception):
+    pass
+
+
+def _save(db: Session, run_id: int, **values) -> None:
+    """Write run fields and renew the lease, in the caller's transaction, only
+    while this process owns the run. Raises _LeaseLost otherwise, so the
+    caller rolls back whatever it was about to commit with it."""
+    result = db.execute(
+        update(PayrollRun)
+        .where(PayrollRun.id == run_id, PayrollRun.owner == WORKER_ID, PayrollRun.status == "running")
+        .values(heartbeat_at=datetime.utcnow(), **values),
+        execution_options={"synchronize_session": False},
+    )
+    if result.rowcount != 1:
+        raise _LeaseLost()
+
+
+def _advance(progress: dict, chunk: List[int], result: Optional[BatchResult] = None, failed: Optional[dict] = None) -> dict:
+    """`progress` after `chunk`; the caller adopts it once it has committed."""
+    advanced = dict(progress, processed=progress["processed"] + len(chunk), last_user_id=chunk[-1])
+    if result is not None:
+        advanced["generated"] += result.generated
+        advanced["skipped_existing"] += result.skipped_existing
+        advanced["skipped_no_structure"] = progress["skipped_no_structure"] + result.skipped_no_structure
+    if failed is not None:
+        advanced["failed"] = progress["failed"] + [failed]
+    return advanced
+
+
+def _commit_progress(db: Session, run_id: int, progress: dict, advanced: dict) -> None:
+    _save(db, run_id, **advanced)
+    db.commit()
+    progress.update(advanced)
+
+
+def _process_chunk(db: Session, run_id: int, started_by: int, period, chunk: List[int], progress: dict) -> None:
+    try:
+        result = generate_payslips(db, period, chunk, generated_by=started_by)
+        _commit_progress(db, run_id, progress, _advance(progress, chunk, result))
+        return
+    except _LeaseLost:
+        raise
+    except Exception:
+        db.rollback()
+
+    # Replay employee by employee to isolate the failing record(s). The
+    # rollback took the heartbeat with it; every commit below renews it.
+    for uid in chunk:
+        try:
+            result = generate_payslips(db, period, [uid], generated_by=started_by)
+            _commit_progress(db, run_id, progress, _advance(progress, [uid], result))
+        except _LeaseLost:
+            raise
+        except Exception as exc:
+            db.rollback()
+            failed = {"employee_id": uid, "error": str(exc)}
+            _commit_progress(db, run_id, progress, _advance(progress, [uid], failed=failed))
+
+
+def _finish(db: Session, run_id: int, **values) -> None:
+    # Only while this process still holds the lease.
+    db.execute(
+        update(PayrollRun)
+        .where(PayrollRun.id == run_id, PayrollRun.owner == WORKER_ID, PayrollRun.status == "running")
+        .values(finished_at=datetime.utcnow(), **values),
+        execution_options={"synchronize_session": False},
+    )
+    db.commit()
+
+
+def _execute(run_id: int) -> None:
+    db = SessionLocal()
+    try:
+        if not _claim(db, run_id):
+            return
+        run = db.get(PayrollRun, run_id)
+        period = parse_pay_period(run.pay_period)
+        chunk_size, started_by = run.chunk_size, run.started_by
+        # This process's view of the run's progress. Written back only
+        # through _save, never through `run`.
+        progress = {
+            "generated": run.generated or 0,
+            "skipped_existing": run.skipped_existing or 0,
+            "skipped_no_structure": list(run.skipped_no_structure or []),
+            "failed": list(run.failed or []),
+            "processed": run.processed or 0,
+            "last_user_id": run.last_user_id,
+        }
+        start = {"started_at": run.started_at or datetime.utcnow()}
+        if not run.last_user_id:
+            start["total_employees"] = _active_user_ids(db).count()
+        _save(db, run_id, **start)
+        db.commit()
+
+        while True:
+            query = _active_user_ids(db)
+            if progress["last_user_id"]:
+                query = query.filter(Employee.user_id > progress["last_user_id"])
+            chunk = [uid for (uid,) in query.order_by(Employee.user_id).limit(chunk_size)]
+            if not chunk:
+                break
+            _process_chunk(db, run_id, started_by, period, chunk, progress)
+
+        _finish(db, run_id, status="completed")
+    except _LeaseLost:
+        db.rollback()
+        print(f"[payroll-runs] run {run_id}: lease lost, stopping")
+    except Exception as exc:
+        db.rollback()
+        _finish(db, run_id, status="failed", error=str(exc))
+    finally:
+        db.close()
+
+
+def run_payload(run: PayrollRun) -> dict:
+    skipped_no_structure = run.skipped_no_structure or []
+    failed = run.failed or []
+    total = run.total_employees or 0
+    return {
+        "id": run.id,
+        "pay_period": run.pay_period,
+        "status": run.status,
+        "chunk_size": run.chunk_size,
+        "total_employees": total,
+        "processed": run.processed or 0,
+        "progress": round((run.processed or 0) * 100 / total, 1) if total else (100.0 if run.status == "completed" else 0.0),
+        "generated": run.generated or 0,
+        "skipped": (run.skipped_existing or 0) + len(skipped_no_structure),
+        "skipped_existing": run.skipped_existing or 0,
+        "skipped_missing_salary_structure": skipped_no_structure,
+        "failed": len(failed),
+        "failures": failed,
+        "last_user_id": run.last_user_id,
+        "error": run.error,
+        "started_by": run.started_by,
+        "created_at": run.created_at,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
+    }
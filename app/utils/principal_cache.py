@@ -0,0 +1,113 @@
+"""Bounded TTL cache of authenticated users.
+
+A dashboard fires 10-15 API calls per page view and each one used to reload
+the same `users` row in `get_current_user`. Entries are keyed by
+(user_id, token iat) and hold plain column values, never ORM instances: a
+hit rebuilds a `User` and attaches it to the request's session with
+`merge(load=False)`, which issues no SQL. Lazy relationships and writes
+through `current_user` therefore behave exactly as on a freshly loaded row.
+
+Any committed change to a `users` row (role, status, password, profile, or
+a delete) drops that user's entries, via the session hooks at the bottom.
+That covers routers/auth.py and the employee endpoints without per-call
+bookkeeping. Bulk `query(User).update()` bypasses the hooks; such writers
+must call `principal_cache.invalidate()` themselves. The cache is
+per-process, so other workers converge within the TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from ..config import settings
+from ..models.user import User
+
+_COLUMNS = [c.key for c in User.__table__.columns]
+
+
+class PrincipalCache:
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, db: Session, user_id: int, iat: Optional[int]) -> Optional[User]:
+        key = (user_id, iat)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            values = entry[1]
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    def put(self, user: User, iat: Optional[int]) -> None:
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        values = {name: getattr(user, name) for name in _COLUMNS}
+        with self._lock:
+            self._entries[(user.id, iat)] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end((user.id, iat))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Drop one user's entries, or everything when no id is given."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == user_id]:
+                    del self._entries[key]
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+principal_cache = PrincipalCache(settings.principal_cache_size, settings.principal_cache_ttl_seconds)
+
+
+# Collect touched user ids at flush time (dirty/deleted still show pre-flush
+# state there) and invalidate only once the transaction has committed, so a
+# concurrent request cannot re-cache the old row in between.
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = {obj.id for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, User)}
+    if changed:
+        session.info.setdefault("principal_cache_changed", set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("principal_cache_changed", ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("principal_cache_changed", None)
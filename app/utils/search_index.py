@@ -0,0 +1,330 @@
+"""SQLite FTS5 index behind the global search box and employee search.
+
+Virtual tables, one document per employee / department (rowid = source id)
+and per distinct `Employee.position`:
+
+- `search_employees` (unicode61, prefix index): "jo sm" matches tokens
+  starting with "jo" and "sm". Its vocabulary, `search_employees_terms`,
+  backs typo correction ("jonh" → "john").
+- `search_employees_fuzzy`, `search_names_fuzzy` (trigram): substring
+  matches, as the old `ilike('%q%')` gave. Names get a table of their own
+  because a column filter on a trigram table walks every hit in the other
+  columns too.
+- `search_departments`, `search_positions` (unicode61, prefix index).
+
+Results are ranked by tier rather than by bm25 over every hit, which costs
+tens of ms once a prefix matches thousands of rows: exact name tokens,
+name prefixes, exact then prefix tokens in the other columns, substrings,
+then corrected spellings. Each tier is a LIMIT query, so latency stays flat as the table
+grows.
+
+Documents are rewritten inside the writer's transaction by the session hooks
+at the bottom whenever an Employee, a searchable User column or a Department
+changes. Core bulk inserts bypass the hooks and must call
+`reindex_employees` (see employee_import.py). `ensure_search_index` creates
+the tables at startup and rebuilds them if they have drifted.
+
+On other databases every `search_*` function returns None and the routers
+keep their `ilike` queries.
+"""
+import re
+from typing import Iterable, List, Optional
+
+from sqlalchemy import bindparam, event, inspect, text
+from sqlalchemy.orm import Session
+
+from ..database import engine
+from ..models.department import Department
+from ..models.employee import Employee
+from ..models.user import User
+
+EMPLOYEE_COLUMNS = ("name", "email", "employee_id", "position", "department")
+# Departments are searched on their own, so substring search skips them.
+FUZZY_COLUMNS = ("name", "email", "employee_id", "position")
+_EMPLOYEE_TABLES = {
+    "search_employees": EMPLOYEE_COLUMNS,
+    "search_employees_fuzzy": FUZZY_COLUMNS,
+    "search_names_fuzzy": ("name",),
+}
+# Source columns that feed an employee document
+_EMPLOYEE_FIELDS = ("user_id", "employee_id", "position", "department_id")
+_USER_FIELDS = ("first_name", "last_name", "email")
+
+_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_employees USING fts5("
+    "name, email, employee_id, position, department, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_employees_fuzzy USING fts5("
+    "name, email, employee_id, position, tokenize = 'trigram')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_names_fuzzy USING fts5(name, tokenize = 'trigram')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_employees_terms USING fts5vocab(search_employees, 'col')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_departments USING fts5("
+    "name, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_positions USING fts5("
+    "position, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+)
+
+_EMPLOYEE_DOCS = """
+    SELECT e.id AS id, trim(coalesce(u.first_name, '') || ' ' || coalesce(u.last_name, '')) AS name,
+           u.email AS email, e.employee_id AS employee_id, e.position AS position, d.name AS department
+    FROM employees e
+    JOIN users u ON u.id = e.user_id
+    LEFT JOIN departments d ON d.id = e.department_id
+"""
+
+_enabled = False
+
+
+def _available(bind) -> bool:
+    return _enabled and bind.dialect.name == "sqlite"
+
+
+def ensure_search_index(bind=engine) -> int:
+    """Create the FTS tables and rebuild them if their row counts have drifted
+    from the source tables. Returns the number of documents rebuilt. Call at startup."""
+    global _enabled
+    if bind.dialect.name != "sqlite":
+        return 0
+    with bind.begin() as conn:
+        for ddl in _DDL:
+            conn.exec_driver_sql(ddl)
+        _enabled = True
+        counts = conn.execute(text(
+            "SELECT (SELECT count(*) FROM employees), (SELECT count(*) FROM search_employees), "
+            "(SELECT count(*) FROM search_employees_fuzzy), (SELECT count(*) FROM search_names_fuzzy), "
+            "(SELECT count(*) FROM departments), (SELECT count(*) FROM search_departments), "
+            "(SELECT count(DISTINCT position) FROM employees), (SELECT count(*) FROM search_positions)"
+        )).one()
+        if counts[0] == counts[1] == counts[2] == counts[3] and counts[4] == counts[5] and counts[6] == counts[7]:
+            return 0
+        return _rebuild(conn)
+
+
+def _rebuild(conn) -> int:
+    for table in (*_EMPLOYEE_TABLES, "search_departments", "search_positions"):
+        conn.exec_driver_sql(f"DELETE FROM {table}")
+    for table, columns in _EMPLOYEE_TABLES.items():
+        columns = ", ".join(columns)
+        conn.exec_driver_sql(f"INSERT INTO {table} (rowid, {columns}) SELECT id, {columns} FROM ({_EMPLOYEE_DOCS})")
+    conn.exec_driver_sql("INSERT INTO search_departments (rowid, name) SELECT id, name FROM departments")
+    conn.exec_driver_sql(
+        "INSERT INTO search_positions (position) SELECT DISTINCT position FROM employees WHERE position IS NOT NULL"
+    )
+    return conn.execute(text("SELECT count(*) FROM search_employees")).scalar()
+
+
+def _reindex(conn, employee_ids: Iterable[int] = (), department_ids: Iterable[int] = (),
+             positions: Iterable[Optional[str]] = ()) -> None:
+    employee_ids, department_ids = list(set(employee_ids)), list(set(department_ids))
+    positions = {p for p in positions if p}
+    ids = bindparam("ids", expanding=True)
+    if employee_ids:
+        positions.update(p for (p,) in conn.execute(
+            text("SELECT DISTINCT position FROM employees WHERE id IN :ids AND position IS NOT NULL").bindparams(ids),
+            {"ids": employee_ids},
+        ))
+        for table, columns in _EMPLOYEE_TABLES.items():
+            columns = ", ".join(columns)
+            conn.execute(text(f"DELETE FROM {table} WHERE rowid IN :ids").bindparams(ids), {"ids": employee_ids})
+            conn.execute(
+                text(f"INSERT INTO {table} (rowid, {columns}) SELECT id, {columns} FROM ({_EMPLOYEE_DOCS}) "
+                     "WHERE id IN :ids").bindparams(ids),
+                {"ids": employee_ids},
+            )
+    if department_ids:
+        conn.execute(text("DELETE FROM search_departments WHERE rowid IN :ids").bindparams(ids), {"ids": department_ids})
+        conn.execute(
+            text("INSERT INTO search_departments (rowid, name) SELECT id, name FROM departments WHERE id IN :ids").bindparams(ids),
+            {"ids": department_ids},
+        )
+    # One row per position still held by someone
+    for position in positions:
+        conn.execute(text("DELETE FROM search_positions WHERE position = :p"), {"p": position})
+        conn.execute(
+            text("INSERT INTO search_positions (position) SELECT :p "
+                 "WHERE EXISTS (SELECT 1 FROM employees WHERE position = :p)"),
+            {"p": position},
+        )
+
+
+def reindex_employees(db: Session, employee_ids: Iterable[int]) -> None:
+    """Refresh documents for rows written without the ORM unit of work. Does not commit."""
+    if _available(db.get_bind()):
+        _reindex(db.connection(), employee_ids=employee_ids)
+
+
+# ── Queries ──────────────────────────────────────────────────────────────────
+
+def _tokens(query: str) -> List[str]:
+    return re.findall(r"\w+", query.lower())
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _scope(columns: Iterable[str]) -> str:
+    return "{" + " ".join(columns) + "} : "
+
+
+def _all(terms: Iterable[str]) -> str:
+    return "(" + " AND ".join(terms) + ")"
+
+
+def _edit_distance(a: str, b: str, cap: int) -> int:
+    """Optimal string alignment distance (a transposition counts as one edit),
+    giving up once it exceeds `cap`."""
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > cap:
+            return cap + 1
+    return current[-1]
+
+
+def _corrections(connection, token: str) -> List[str]:
+    """Indexed name terms within one edit of `token` (two for long tokens).
+    Only terms sharing the first two letters are considered."""
+    if len(token) < 4 or not token.isalpha():
+        return []
+    cap = 1 if len(token) < 7 else 2
+    rows = connection.execute(
+        text("SELECT term, col FROM search_employees_terms WHERE term >= :low AND term < :high LIMIT 5000"),
+        {"low": token[:2], "high": token[0] + chr(ord(token[1]) + 1)},
+    )
+    return [
+        term for term, col in rows
+        if col == "name" and term != token and abs(len(term) - len(token)) <= cap
+        and _edit_distance(token, term, cap) <= cap
+    ]
+
+
+def search_employee_ids(db: Session, query: str, limit: int = 10,
+                        columns: Optional[Iterable[str]] = None) -> Optional[List[int]]:
+    """Employee ids best matching `query`, best tier first. `columns` narrows
+    the match to some of EMPLOYEE_COLUMNS (default: all)."""
+    if not _available(db.get_bind()):
+        return None
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+    columns = list(columns or EMPLOYEE_COLUMNS)
+    others = [c for c in columns if c != "name"]
+    prefixes = [_quote(t) + "*" for t in tokens]
+    connection = db.connection()
+    found: List[int] = []
+
+    def run(table: str, match: str) -> None:
+        if len(found) >= limit:
+            return
+        rows = connection.execute(
+            text(f"SELECT rowid FROM {table} WHERE {table} MATCH :match LIMIT :limit"),
+            {"match": match, "limit": limit + len(found)},
+        )
+        for (rowid,) in rows:
+            if rowid not in found and len(found) < limit:
+                found.append(rowid)
+
+    exact = _all(_quote(t) for t in tokens)
+    if "name" in columns:
+        run("search_employees", _scope(["name"]) + exact)
+        run("search_employees", _scope(["name"]) + _all(prefixes))
+    if others:
+        run("search_employees", _scope(others) + exact)
+        run("search_employees", _scope(others) + _all(prefixes))
+    if len(tokens) > 1:
+        run("search_employees", _scope(columns) + _all(prefixes))
+    needle = " ".join(tokens)
+    if len(needle) >= 3:
+        if columns == ["name"]:
+            run("search_names_fuzzy", _quote(needle))
+        elif set(columns) >= set(FUZZY_COLUMNS):
+            run("search_employees_fuzzy", _quote(needle))
+        elif set(columns) & set(FUZZY_COLUMNS):
+            run("search_employees_fuzzy", _scope(c for c in columns if c in FUZZY_COLUMNS) + _quote(needle))
+    if "name" in columns and len(found) < limit:
+        alternatives = [[_quote(t) + "*"] + [_quote(c) for c in _corrections(connection, t)] for t in tokens]
+        if any(len(a) > 1 for a in alternatives):
+            run("search_employees", _scope(["name"]) + _all("(" + " OR ".join(a) + ")" for a in alternatives))
+    return found
+
+
+def search_positions(db: Session, query: str, limit: int = 5) -> Optional[List[str]]:
+    """Distinct `Employee.position` values matching `query`: prefix, then substring."""
+    if not _available(db.get_bind()):
+        return None
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+    connection = db.connection()
+    found = [p for (p,) in connection.execute(
+        text("SELECT position FROM search_positions WHERE search_positions MATCH :match LIMIT :limit"),
+        {"match": _all(_quote(t) + "*" for t in tokens), "limit": limit},
+    )]
+    if len(found) < limit:
+        # One row per distinct position, so a scan is cheap.
+        # `query` is user input: its % and _ must match themselves.
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        found += [p for (p,) in connection.execute(
+            text("SELECT position FROM search_positions WHERE position LIKE :like ESCAPE '\\' LIMIT :limit"),
+            {"like": f"%{escaped}%", "limit": limit + len(found)},
+        ) if p not in found][:limit - len(found)]
+    return found
+
+
+def search_department_ids(db: Session, query: str, limit: int = 5) -> Optional[List[int]]:
+    if not _available(db.get_bind()):
+        return None
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+    rows = db.connection().execute(
+        text(
+            "SELECT rowid FROM search_departments WHERE search_departments MATCH :match "
+            "ORDER BY rank LIMIT :limit"
+        ),
+        {"match": _all(_quote(t) + "*" for t in tokens), "limit": limit},
+    )
+    return [rowid for (rowid,) in rows]
+
+
+# ── Sync on ORM writes ───────────────────────────────────────────────────────
+
+def _changed(obj, fields) -> bool:
+    attrs = inspect(obj).attrs
+    return any(attrs[name].history.has_changes() for name in fields)
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_search_index(session, flush_context):
+    if not _available(session.get_bind()):
+        return
+    employee_ids, user_ids, department_ids, positions = set(), set(), set(), set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Employee) and (obj in session.new or obj in session.deleted or _changed(obj, _EMPLOYEE_FIELDS)):
+            employee_ids.add(obj.id)
+            # The previous position may now be held by nobody.
+            positions.add(obj.position)
+            positions.update(inspect(obj).attrs.position.history.deleted)
+        elif isinstance(obj, User) and obj in session.dirty and _changed(obj, _USER_FIELDS):
+            user_ids.add(obj.id)
+        elif isinstance(obj, Department) and (obj in session.new or obj in session.deleted or _changed(obj, ["name"])):
+            department_ids.add(obj.id)
+    if not (employee_ids or user_ids or department_ids):
+        return
+
+    connection = session.connection()
+    if user_ids or department_ids:
+        linked = connection.execute(
+            text("SELECT id FROM employees WHERE user_id IN :users OR department_id IN :departments").bindparams(
+                bindparam("users", expanding=True), bindparam("departments", expanding=True)
+            ),
+            {"users": list(user_ids) or [-1], "departments": list(department_ids) or [-1]},
+        )
+        employee_ids.update(rowid for (rowid,) in linked)
+    _reindex(connection, employee_ids=employee_ids, department_ids=department_ids, positions=positions)
@@ -0,0 +1,132 @@
+"""Transaction-safe number allocation backed by the `id_sequences` table.
+
+`next_value` bumps a named counter with a single UPDATE ... RETURNING. The
+row stays write-locked until the caller commits, so concurrent allocators
+queue up behind each other and never get the same number. If the caller
+rolls back, the number goes back with it. The first allocation for a
+name seeds the counter from the data that already exists (e.g. the highest
+`EMP…` in use), so switching over does not reuse any number.
+
+Numbers typed in by hand (an explicit employee ID on create or import)
+should be reported with `advance`, so the sequence skips past them.
+
+`peek_value` shows the number the next allocation would get without taking
+it, for previews. Two callers can see the same number; only `next_value`
+hands it out.
+"""
+import re
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..models.employee import Employee
+from ..models.id_sequence import IdSequence
+
+EMPLOYEE_SEQUENCE = "employee_id"
+EMPLOYEE_ID_WIDTH = 4
+_EMPLOYEE_ID = re.compile(r"^EMP(\d+)$")
+
+
+def next_value(db: Session, name: str, seed: Callable[[Session], int]) -> int:
+    """Allocate the next number of sequence `name`. Does not commit.
+
+    `seed(db)` returns the highest number already in use and is only called
+    the first time `name` is seen.
+    """
+    bind = db.get_bind()
+    if bind.dialect.update_returning:
+        value = db.execute(
+            update(IdSequence)
+            .where(IdSequence.name == name)
+            .values(value=IdSequence.value + 1)
+            .returning(IdSequence.value),
+            execution_options={"synchronize_session": False},
+        ).scalar()
+    else:
+        row = db.query(IdSequence).filter(IdSequence.name == name).with_for_update().first()
+        value = None
+        if row is not None:
+            row.value += 1
+            db.flush()
+            value = row.value
+    if value is not None:
+        return value
+
+    start = seed(db) + 1
+    if bind.dialect.name in ("sqlite", "postgresql"):
+        insert = sqlite_insert if bind.dialect.name == "sqlite" else pg_insert
+        stmt = insert(IdSequence).values(name=name, value=start)
+        # Lost a race to seed the row: take the next number after the winner's.
+        stmt = stmt.on_conflict_do_update(index_elements=["name"], set_={"value": IdSequence.value + 1})
+        return db.execute(stmt.returning(IdSequence.value)).scalar()
+    db.add(IdSequence(name=name, value=start))
+    db.flush()
+    return start
+
+
+def peek_value(db: Session, name: str, seed: Callable[[Session], int]) -> int:
+    """The number `next_value` would allocate now. Reads only; reserves nothing."""
+    value = db.query(IdSequence.value).filter(IdSequence.name == name).scalar()
+    return (seed(db) if value is None else value) + 1
+
+
+def advance(db: Session, name: str, value: int) -> None:
+    """Make sure sequence `name` never hands out `value` or anything below it.
+    A no-op before the first allocation, whose seed sees the value anyway. Does not commit."""
+    db.execute(
+        update(IdSequence)
+        .where(IdSequence.name == name, IdSequence.value < value)
+        .values(value=value),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def _max_suffix(values: Iterable[Optional[str]], pattern) -> int:
+    highest = 0
+    for value in values:
+        match = pattern.match(value or "")
+        if match:
+            highest = max(highest, int(match.group(1)))
+    return highest
+
+
+# ── Employee IDs: EMP0001 ───────────────────────────────────────────────────
+
+def _max_employee_number(db: Session) -> int:
+    return _max_suffix((v for (v,) in db.query(Employee.employee_id).filter(Employee.employee_id.like("EMP%"))), _EMPLOYEE_ID)
+
+
+def _format_employee_id(number: int) -> str:
+    return f"EMP{number:0{EMPLOYEE_ID_WIDTH}d}"
+
+
+def next_employee_id(db: Session) -> str:
+    return _format_employee_id(next_value(db, EMPLOYEE_SEQUENCE, _max_employee_number))
+
+
+def peek_employee_id(db: Session) -> str:
+    """The employee ID the next allocation would get, without reserving it."""
+    return _format_employee_id(peek_value(db, EMPLOYEE_SEQUENCE, _max_employee_number))
+
+
+def note_employee_ids(db: Session, employee_ids: Iterable[Optional[str]]) -> None:
+    """Advance the employee sequence past explicitly supplied IDs."""
+    highest = _max_suffix(employee_ids, _EMPLOYEE_ID)
+    if highest:
+        advance(db, EMPLOYEE_SEQUENCE, highest)
+
+
+# ── Yearly document numbers: PR-2025-0001, EXP-2025-0001 ───────────────────
+
+def next_yearly_number(db: Session, prefix: str, year: int, column) -> str:
+    """`PREFIX-YYYY-0001`, restarting every year. `column` holds the numbers
+    already issued and seeds the sequence the first time a year is used."""
+    pattern = re.compile(rf"^{re.escape(prefix)}-{year}-(\d+)$")
+
+    def seed(db: Session) -> int:
+        return _max_suffix((v for (v,) in db.query(column).filter(column.like(f"{prefix}-{year}-%"))), pattern)
+
+    return f"{prefix}-{year}-{next_value(db, f'{prefix}-{year}', seed):04d}"
@@ -1,12 +1,39 @@
 import secrets
 import string
-import bcrypt
 from typing import Dict, Optional
 
+from .password_hashing import hash_pool, password_policy
+
+def generate_temp_plaintext(length: int = 10, include_symbols: bool = False) -> str:
+    """
+    Generate a secure temporary password without hashing it.
+
+    Bulk callers use this and hash the whole batch at once with
+    `hash_pool.hash_many` (app/utils/password_hashing.py).
+    """
+    if length < 4:
+        raise ValueError("Password length must be at least 4 characters")
+    
+    # Character sets
+    alpha = string.ascii_letters + string.digits
+    symbols = "!@#$%&*?"
+    charset = alpha + symbols if include_symbols else alpha
+    
+    while True:
+        # Generate secure random password
+        temp_password = ''.join(secrets.choice(charset) for _ in range(length))
+        
+        # Ensure password has at least one digit and one letter (when not using symbols)
+        if include_symbols or length < 2:
+            return temp_password
+        if any(c.isdigit() for c in temp_password) and any(c.isalpha() for c in temp_password):
+            return temp_password
+
+
 def generate_temp_password(
     length: int = 10,
     include_symbols: bool = False,
-    hash_rounds: int = 10
+    hash_rounds: Optional[int] = None
 ) -> Dict[str, str]:
     """
     Generate a secure temporary password and its bcrypt hash.
@@ -14,7 +41,7 @@ def generate_temp_password(
     Args:
         length: Password length (default: 10)
         include_symbols: Include symbols in password (default: False)
-        hash_rounds: Bcrypt hash rounds (default: 10)
+        hash_rounds: Bcrypt hash rounds (default: password_policy.temp_rounds)
     
     Returns:
         Dict containing 'temp_password' and 'hashed_password'
@@ -24,33 +51,12 @@ def generate_temp_password(
         # Store result['hashed_password'] in database
         # Email result['temp_password'] to user
     """
-    if length < 4:
-        raise ValueError("Password length must be at least 4 characters")
-    
-    # Character sets
-    alpha = string.ascii_letters + string.digits
-    symbols = "!@#$%&*?"
-    charset = alpha + symbols if include_symbols else alpha
-    
-    # Generate secure random password
-    temp_password = ''.join(secrets.choice(charset) for _ in range(length))
-    
-    # Ensure password has at least one digit and one letter (when not using symbols)
-    if not include_symbols and length >= 2:
-        has_digit = any(c.isdigit() for c in temp_password)
-        has_letter = any(c.isalpha() for c in temp_password)
-        
-        if not has_digit or not has_letter:
-            # Regenerate if requirements not met (very unlikely)
-            return generate_temp_password(length, include_symbols, hash_rounds)
+    temp_password = generate_temp_plaintext(length, include_symbols)
     
-    # Hash the password
-    hashed_password = bcrypt.hashpw(
-        temp_password.encode('utf-8'), 
-        bcrypt.gensalt(rounds=hash_rounds)
-    ).decode('utf-8')
+    # Hash on the bounded bcrypt pool, not the request thread
+    hashed_password = hash_pool.run(password_policy.hash_temp, temp_password, hash_rounds)
     
     return {
         'temp_password': temp_password,
         'hashed_password': hashed_password
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,66 @@
+"""Short-TTL cache of `GET /api/attendance/today` responses, per user.
+
+The attendance widget polls /today every few seconds, and between punches
+the answer does not change. One entry per user, tagged with its date, dropped
+by the punch endpoints once their write has committed. Every invalidation
+bumps the user's version. A response computed before the bump is not
+stored, so a poll racing a punch cannot cache the pre-punch state.
+
+Other attendance writes (admin edits, auto-absence) do not invalidate; they
+show up within the TTL. The cache is per-process; 0 size or TTL disables it.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Optional
+
+from ..config import settings
+
+
+class TodayStatusCache:
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def version(self, user_id: int) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def get(self, user_id: int, day: date) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic() or entry[1] != day:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[2]
+
+    def put(self, user_id: int, day: date, value: Any, version: int) -> None:
+        """Store `value` unless the user was invalidated since `version` was read."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._versions.get(user_id, 0) != version:
+                return
+            self._entries[user_id] = (time.monotonic() + self.ttl, day, value)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._entries.pop(user_id, None)
+
+
+today_cache = TodayStatusCache(settings.today_cache_size, settings.today_cache_ttl_seconds)
@@ -0,0 +1,216 @@
+"""Per-user unread notification counters: `notification_unread_counts` plus a cache.
+
+The notification badge polled `COUNT(*)` over the user's unread rows. The
+counter table keeps that number instead. Every write that changes it applies
+a delta with an atomic upsert, inside the writer's transaction:
+
+- ORM inserts, deletes and `is_read` / `recipient_id` edits of a
+  `Notification` are counted by the session hooks at the bottom.
+- Core writers call `adjust()` themselves: the bulk writer in notifier.py,
+  and mark-read / mark-all-read, which are conditional UPDATEs
+  (`... AND is_read = false`). Their rowcount is the delta, so two racing
+  "mark all read" calls cannot both decrement.
+
+`count()` reads one counter row and keeps it in a short-TTL per-process cache.
+Committed deltas update the cache. Every delta also bumps the user's version,
+and a count read before a bump is not cached. Other workers' writes show up
+within `unread_count_cache_ttl_seconds`.
+
+`rebuild` recomputes the table from `notifications`. `backfill_if_empty`
+runs it once at startup for databases that predate the table.
+"""
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import event, false, func, inspect, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.notification import Notification, NotificationUnreadCount
+
+
+class UnreadCountCache:
+    def __init__(self, ttl_seconds: float):
+        self.ttl = ttl_seconds
+        self._entries: Dict[int, tuple] = {}
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def version(self, user_id: int) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def get(self, user_id: int) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[user_id]
+                return None
+            return entry[1]
+
+    def put(self, user_id: int, count: int, version: int) -> None:
+        """Store `count` unless a delta was applied since `version` was read."""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if self._versions.get(user_id, 0) == version:
+                self._entries[user_id] = (time.monotonic() + self.ttl, count)
+
+    def apply(self, deltas: Dict[int, int]) -> None:
+        with self._lock:
+            for user_id, delta in deltas.items():
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+                entry = self._entries.get(user_id)
+                if entry is not None:
+                    self._entries[user_id] = (entry[0], max(0, entry[1] + delta))
+
+    def clear(self) -> None:
+        with self._lock:
+            for user_id in self._entries:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._entries.clear()
+
+
+unread_cache = UnreadCountCache(settings.unread_count_cache_ttl_seconds)
+
+
+def _upsert(connection, deltas: Dict[int, int]) -> None:
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert_ = sqlite_insert if dialect == "sqlite" else pg_insert
+        stmt = insert_(NotificationUnreadCount)
+        connection.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["user_id"],
+                set_={"unread": NotificationUnreadCount.unread + stmt.excluded.unread, "updated_at": func.now()},
+            ),
+            [{"user_id": user_id, "unread": delta} for user_id, delta in sorted(deltas.items())],
+        )
+        return
+
+    # Other backends: lock the counter row and update it in place.
+    table = NotificationUnreadCount.__table__
+    for user_id, delta in sorted(deltas.items()):
+        current = connection.execute(
+            select(table.c.unread).where(table.c.user_id == user_id).with_for_update()
+        ).scalar()
+        if current is None:
+            connection.execute(table.insert().values(user_id=user_id, unread=delta))
+        else:
+            connection.execute(table.update().where(table.c.user_id == user_id).values(unread=current + delta))
+
+
+def adjust(db: Session, deltas: Dict[int, int]) -> None:
+    """Add `deltas` (user id -> change) to the counters, in `db`'s transaction."""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    _upsert(db.connection(), deltas)
+    pending = db.info.setdefault("unread_count_deltas", Counter())
+    pending.update(deltas)
+
+
+def added(db: Session, recipient_ids: Iterable[int]) -> None:
+    """Count freshly inserted unread notifications, one per recipient id."""
+    adjust(db, Counter(recipient_ids))
+
+
+def count(db: Session, user_id: int) -> int:
+    cached = unread_cache.get(user_id)
+    if cached is not None:
+        return cached
+    version = unread_cache.version(user_id)
+    value = max(0, db.query(NotificationUnreadCount.unread).filter(
+        NotificationUnreadCount.user_id == user_id
+    ).scalar() or 0)
+    unread_cache.put(user_id, value, version)
+    return value
+
+
+def rebuild(db: Session) -> int:
+    """Recompute every counter from `notifications`. Does not commit."""
+    db.query(NotificationUnreadCount).delete(synchronize_session=False)
+    result = db.execute(insert(NotificationUnreadCount).from_select(
+        ["user_id", "unread"],
+        select(Notification.recipient_id, func.count())
+        .where(Notification.is_read == false())
+        .group_by(Notification.recipient_id),
+    ))
+    unread_cache.clear()
+    return result.rowcount
+
+
+def backfill_if_empty() -> int:
+    """One-shot backfill for databases that predate the counter table. Call at startup."""
+    db = SessionLocal()
+    try:
+        if db.query(NotificationUnreadCount.user_id).first() or not db.query(Notification.id).first():
+            return 0
+        users = rebuild(db)
+        db.commit()
+        return users
+    finally:
+        db.close()
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# A row expired by an earlier commit would otherwise be written without its old
+# value being loaded, and the hook could not tell an unread row was marked read.
+for _attribute in (Notification.recipient_id, Notification.is_read):
+    event.listen(_attribute, "set", _load_old_value, active_history=True)
+
+
+def _unread_state(obj, history_side: str):
+    """(recipient_id, is unread) of `obj` before ("deleted") or after ("added") the flush."""
+    state = inspect(obj)
+    values = []
+    for name in ("recipient_id", "is_read"):
+        history = state.attrs[name].history
+        side = getattr(history, history_side) if history.has_changes() else ()
+        values.append(side[0] if side else state.attrs[name].value)
+    recipient_id, is_read = values
+    return recipient_id, is_read is False
+
+
+# As in principal_cache: collect at flush, apply only once committed. Unlike the
+# caches, the counters themselves are written here, in the flushing transaction.
+@event.listens_for(Session, "after_flush")
+def _count_orm_changes(session, flush_context):
+    deltas: Counter = Counter()
+    for obj in session.new:
+        if isinstance(obj, Notification) and obj.is_read is False:
+            deltas[obj.recipient_id] += 1
+    for obj in session.deleted:
+        # The row is gone, so only values already loaded can be read.
+        if isinstance(obj, Notification) and obj.__dict__.get("is_read") is False:
+            deltas[obj.__dict__["recipient_id"]] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, Notification) and obj not in session.deleted:
+            before_recipient, before_unread = _unread_state(obj, "deleted")
+            after_recipient, after_unread = _unread_state(obj, "added")
+            deltas[before_recipient] -= int(before_unread)
+            deltas[after_recipient] += int(after_unread)
+    if deltas:
+        adjust(session, deltas)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_unread_deltas(session):
+    deltas = session.info.pop("unread_count_deltas", None)
+    if deltas:
+        unread_cache.apply(deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_unread_deltas(session):
+    session.info.pop("unread_count_deltas", None)
@@ -0,0 +1,131 @@
+"""Benchmark GET /api/attendance/team for an admin at several company sizes.
+
+For each size, seeds a throwaway SQLite file with that many employees (three
+in four checked in, some without a department or first name), then calls
+the handler directly as an admin. Prints the time and the peak Python memory
+of building the response body: the JSON list encoded the way FastAPI does
+it, and, where the router supports it, the NDJSON stream (`stream=true`)
+read to the end. Times include tracemalloc's overhead.
+
+Before / after: pass --router with another version of the attendance router,
+e.g. the one from before the joined snapshot query:
+
+    git show adf11e8^:app/routers/attendance.py > /tmp/attendance_before.py
+    python scripts/bench_team_attendance.py --router /tmp/attendance_before.py
+    python scripts/bench_team_attendance.py
+
+Run from the repository root.
+"""
+import argparse
+import asyncio
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, time as clock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DAY = date(2024, 3, 5)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--router", help="attendance router file to test instead of app/routers/attendance.py")
+    return parser.parse_args()
+
+
+def measure(call):
+    """(result, seconds, peak MiB) of call()."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = call()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main() -> None:
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="hrm-bench-")
+    # Before anything from app/ is imported: the engines bind at import.
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    sys.path.insert(0, ROOT)
+
+    from fastapi.encoders import jsonable_encoder
+    from sqlalchemy import insert
+
+    import app.models as models
+    import app.models.award  # noqa: F401  — mapper dependencies of the gallery models
+    import app.models.gallery  # noqa: F401
+    from app.database import Base, SessionLocal, engine
+
+    if args.router:
+        spec = importlib.util.spec_from_file_location("app.routers._attendance_under_test", args.router)
+        attendance = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(attendance)
+    else:
+        from app.routers import attendance
+
+    handler = attendance.get_team_attendance
+    streams = "stream" in inspect.signature(handler).parameters
+
+    def call(db, admin, **kwargs):
+        if streams:
+            # Called directly, so the Query() default would count as true.
+            kwargs.setdefault("stream", False)
+        result = handler(target_date=DAY.isoformat(), current_user=admin, db=db, **kwargs)
+        return asyncio.run(result) if inspect.iscoroutine(result) else result
+
+    def encode(db, admin):
+        rows = call(db, admin)
+        json.dumps(jsonable_encoder(rows))
+        return len(rows)
+
+    async def drain(response):
+        return sum([chunk.count("\n") async for chunk in response.body_iterator])
+
+    print(f"{args.router or 'app/routers/attendance.py'}")
+    for size in args.sizes:
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(insert(models.Department), [{"name": f"Department {i}"} for i in range(10)])
+            connection.execute(insert(models.User), [
+                {"id": i + 1, "email": f"bench{i}@example.com", "hashed_password": "x",
+                 "first_name": None if i % 3 == 0 else "Bench", "last_name": str(i),
+                 "role": "admin" if i == 0 else "employee", "status": "active"}
+                for i in range(size)
+            ])
+            connection.execute(insert(models.Employee), [
+                {"user_id": i + 1, "employee_id": f"BENCH{i:05d}", "department_id": (i % 11) or None,
+                 "position": "Engineer"}
+                for i in range(size)
+            ])
+            connection.execute(insert(models.Attendance), [
+                {"employee_id": i + 1, "date": DAY, "status": "present", "check_in": clock(9),
+                 "hours_worked": "8:00"}
+                for i in range(size) if i % 4
+            ])
+
+        db = SessionLocal()
+        try:
+            admin = db.get(models.User, 1)
+            rows, elapsed, peak = measure(lambda: encode(db, admin))
+            line = f"  {size:>6} employees: list {elapsed * 1000:7.1f} ms, peak {peak:6.1f} MiB ({rows} rows)"
+            if streams:
+                db.expire_all()
+                lines, elapsed, peak = measure(lambda: asyncio.run(drain(call(db, admin, stream=True))))
+                line += f"; stream {elapsed * 1000:7.1f} ms, peak {peak:6.1f} MiB ({lines} lines)"
+            print(line)
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Load test for the attendance punch endpoints (check-in, /today, breaks).
+
+Seeds a throwaway SQLite file with USERS employees, serves the attendance
+router from an in-process uvicorn, and has CONCURRENCY clients each run
+check-in -> today -> break start -> break end -> today for every user.
+Prints requests/s, p95 latency and the status codes seen.
+
+Authentication is replaced by an X-User header, so only the punch path is
+measured.
+
+Before / after: pass --router with another version of the attendance router,
+e.g. the one from before the async session path:
+
+    git show 4201e48^:app/routers/attendance.py > /tmp/attendance_before.py
+    python scripts/load_test_check_in.py --router /tmp/attendance_before.py
+    python scripts/load_test_check_in.py
+
+Run from the repository root.
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PUNCHES = (
+    ("POST", "/api/attendance/check-in"),
+    ("GET", "/api/attendance/today"),
+    ("POST", "/api/attendance/break/start"),
+    ("POST", "/api/attendance/break/end"),
+    ("GET", "/api/attendance/today"),
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--router", help="attendance router file to test instead of app/routers/attendance.py")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="hrm-load-")
+    # Before anything from app/ is imported: the engines bind at import.
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+    sys.path.insert(0, ROOT)
+
+    import uvicorn
+    from fastapi import FastAPI, Request
+    from sqlalchemy import insert
+
+    import app.models as models
+    from app.auth import get_current_user
+    from app.database import Base, async_engine, engine
+
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(models.User), [
+            {"email": f"load{i}@example.com", "hashed_password": "x", "first_name": "Load",
+             "last_name": str(i), "role": "employee", "status": "active"}
+            for i in range(args.users)
+        ])
+        connection.execute(insert(models.Employee), [
+            {"user_id": i + 1, "employee_id": f"LOAD{i:05d}", "department_id": i % 5 + 1}
+            for i in range(args.users)
+        ])
+
+    if args.router:
+        spec = importlib.util.spec_from_file_location("app.routers._attendance_under_test", args.router)
+        attendance = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(attendance)
+    else:
+        from app.routers import attendance
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await async_engine.dispose()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(attendance.router)
+
+    def current_user(request: Request):
+        return models.User(id=int(request.headers["x-user"]))
+
+    app.dependency_overrides[get_current_user] = current_user
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="error"))
+    thread = threading.Thread(target=server.run)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    async def request(method: str, path: str, user_id: int) -> str:
+        reader, writer = await asyncio.open_connection("127.0.0.1", args.port)
+        writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: load\r\nX-User: {user_id}\r\n"
+            f"Content-Length: 0\r\nConnection: close\r\n\r\n".encode()
+        )
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return response.split(b" ", 2)[1].decode()
+
+    async def run():
+        gate = asyncio.Semaphore(args.concurrency)
+        codes, latencies = {}, []
+
+        async def user(user_id: int):
+            async with gate:
+                for method, path in PUNCHES:
+                    started = time.perf_counter()
+                    code = await request(method, path, user_id)
+                    latencies.append(time.perf_counter() - started)
+                    codes[code] = codes.get(code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user(i + 1) for i in range(args.users)))
+        return time.perf_counter() - started, sorted(latencies), codes
+
+    try:
+        elapsed, latencies, codes = asyncio.run(run())
+    finally:
+        server.should_exit = True
+        thread.join()
+    print(
+        f"{args.router or 'app/routers/attendance.py'}: {len(latencies)} requests in {elapsed:.1f}s, "
+        f"{len(latencies) / elapsed:.0f} req/s, p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms, "
+        f"status {dict(sorted(codes.items()))}"
+    )
+
+
+if __name__ == "__main__":
+    main()
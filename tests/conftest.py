@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# The engines in app/database.py bind at import: point them at a scratch file
+# before any test module imports the app.
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='hrm-tests-'), 'test.db')}")
@@ -0,0 +1,164 @@
+"""Concurrent punches by one employee across several server processes.
+
+Fifty clients fire the same punch at once, spread over WORKERS uvicorn
+processes sharing one SQLite file (the per-process writer lock does not help
+across processes). Exactly one of each punch may succeed, the rest get 400,
+and the daily rollup counters must match the rows left behind.
+"""
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+import app.models.award  # noqa: F401  — mapper dependencies of the gallery models
+import app.models.gallery  # noqa: F401
+from app.database import Base, SessionLocal, engine
+from app.models import Attendance, AttendanceDailySummary, BreakRecord, Employee, User
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKERS = 4
+CLIENTS = 50
+
+SERVER = """
+import sys
+from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+from app.auth import get_current_user
+from app.database import async_engine
+from app.models import User
+from app.routers import attendance
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await async_engine.dispose()
+
+
+def current_user(request: Request):
+    return User(id=int(request.headers["x-user"]))
+
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(attendance.router)
+app.dependency_overrides[get_current_user] = current_user
+uvicorn.run(app, host="127.0.0.1", port=int(sys.argv[1]), log_level="critical")
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def employee_user_id():
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        user = User(email="punch-race@example.com", hashed_password="x", first_name="Punch",
+                    last_name="Race", role="employee", status="active")
+        db.add(user)
+        db.flush()
+        db.add(Employee(user_id=user.id, employee_id="RACE0001"))
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="module")
+def ports(employee_user_id):
+    ports = [_free_port() for _ in range(WORKERS)]
+    processes = [
+        subprocess.Popen([sys.executable, "-c", SERVER, str(port)], cwd=ROOT, env=os.environ.copy())
+        for port in ports
+    ]
+    try:
+        deadline = time.monotonic() + 30
+        for port in ports:
+            while True:
+                try:
+                    socket.create_connection(("127.0.0.1", port)).close()
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.1)
+        yield ports
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def _hammer(ports, path: str, user_id: int) -> Counter:
+    codes = Counter()
+    barrier = threading.Barrier(CLIENTS)
+
+    def punch(i: int):
+        connection = http.client.HTTPConnection("127.0.0.1", ports[i % len(ports)], timeout=30)
+        barrier.wait()
+        connection.request("POST", path, headers={"X-User": str(user_id)})
+        response = connection.getresponse()
+        response.read()
+        connection.close()
+        codes[response.status] += 1
+
+    threads = [threading.Thread(target=punch, args=(i,)) for i in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return codes
+
+
+def _summary():
+    db = SessionLocal()
+    try:
+        rows = db.query(AttendanceDailySummary).all()
+        assert len(rows) == 1
+        return rows[0]
+    finally:
+        db.close()
+
+
+def test_concurrent_punches_succeed_once(ports, employee_user_id):
+    expected = {200: 1, 400: CLIENTS - 1}
+
+    assert _hammer(ports, "/api/attendance/check-in", employee_user_id) == expected
+    summary = _summary()
+    assert (summary.total, summary.present + summary.late, summary.checked_in, summary.on_break) == (1, 1, 1, 0)
+
+    for _ in range(2):
+        assert _hammer(ports, "/api/attendance/break/start", employee_user_id) == expected
+        assert _summary().on_break == 1
+        assert _hammer(ports, "/api/attendance/break/end", employee_user_id) == expected
+        assert _summary().on_break == 0
+
+    assert _hammer(ports, "/api/attendance/check-out", employee_user_id) == expected
+
+    db = SessionLocal()
+    try:
+        attendance = db.query(Attendance).filter(Attendance.employee_id == employee_user_id).all()
+        assert len(attendance) == 1
+        breaks = db.query(BreakRecord).filter(BreakRecord.attendance_id == attendance[0].id).all()
+        assert len(breaks) == 2 and all(b.end_time is not None for b in breaks)
+    finally:
+        db.close()
+    summary = _summary()
+    assert (summary.total, summary.present + summary.late, summary.checked_in, summary.on_break) == (1, 1, 0, 0)
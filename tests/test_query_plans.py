@@ -0,0 +1,191 @@
+"""EXPLAIN QUERY PLAN regression checks for the SQL the hot routes emit.
+
+The routers are mounted on a bare FastAPI app with authentication swapped
+for an X-User header, and each case below is sent through it in order (the
+punches depend on each other). A `before_cursor_execute` listener on both
+engines records every statement a request runs, including the async punch
+path, the rollup upserts and correlated subqueries. Each one is then planned
+against the same schema. A step that scans a table without an index means an
+index from the models was dropped, or a route's query stopped matching one.
+
+The org chart and the notifier's role directory each read their whole table
+once per TTL on purpose; the fixture loads both up front so no case sees them.
+"""
+import asyncio
+import json
+import re
+from datetime import date
+from urllib.parse import urlencode
+
+import pytest
+from fastapi import FastAPI, Request
+from sqlalchemy import event
+
+import app.models.award  # noqa: F401  — mapper dependencies of the gallery models
+import app.models.gallery  # noqa: F401
+from app.auth import get_current_user
+from app.database import Base, SessionLocal, async_engine, engine
+from app.models import Employee, LeaveBalance, SalaryStructure, User
+from app.routers import admin, attendance, documents, employees, leaves, notifications, payroll
+from app.utils.notifier import role_directory
+from app.utils.org_chart import org_chart
+from app.utils.pagination import encode_cursor
+
+# (case id, role of the caller, method, path, query, JSON body, tables it may scan)
+CASES = [
+    ("check in", "employee", "POST", "/api/attendance/check-in", {}, None, ()),
+    ("today", "employee", "GET", "/api/attendance/today", {}, None, ()),
+    ("break start", "employee", "POST", "/api/attendance/break/start", {}, None, ()),
+    ("break end", "employee", "POST", "/api/attendance/break/end", {}, None, ()),
+    ("check out", "employee", "POST", "/api/attendance/check-out", {}, None, ()),
+    ("team attendance", "team_lead", "GET", "/api/attendance/team", {}, None, ()),
+    ("attendance of one employee", "admin", "GET", "/api/attendance/", {"employee_id": "{employee}"}, None, ()),
+    ("attendance keyset page", "admin", "GET", "/api/attendance/", {"limit": 50}, None, ()),
+    ("attendance next page", "admin", "GET", "/api/attendance/", {"limit": 50, "cursor": "{cursor}"}, None, ()),
+    ("attendance with employees", "admin", "GET", "/api/attendance/all", {"limit": 50}, None, ()),
+    ("attendance with employees next page", "admin", "GET", "/api/attendance/all",
+     {"limit": 50, "cursor": "{cursor}"}, None, ()),
+    ("admin attendance log", "admin", "GET", "/api/admin/attendance", {"limit": 50}, None, ()),
+    ("admin attendance log next page", "admin", "GET", "/api/admin/attendance",
+     {"limit": 50, "cursor": "{cursor}"}, None, ()),
+    # The holiday calendar is a few rows a year; counting working days reads it whole.
+    # The request notifies the team lead, so the notification cases below have a row.
+    ("request leave", "employee", "POST", "/api/leaves/", {},
+     {"leave_type": "annual", "start_date": "2030-01-07", "end_date": "2030-01-08"}, ("holidays",)),
+    ("my leaves", "employee", "GET", "/api/leaves/my-leaves", {}, None, ()),
+    ("leave balance", "employee", "GET", "/api/leaves/balance", {}, None, ()),
+    ("notifications", "team_lead", "GET", "/api/notifications/", {}, None, ()),
+    ("unread count", "team_lead", "GET", "/api/notifications/unread-count", {}, None, ()),
+    ("my payslips", "employee", "GET", "/api/payroll/my-payslips/", {}, None, ()),
+    ("my salary structure", "employee", "GET", "/api/payroll/my-salary-structure/", {}, None, ()),
+    ("my documents", "employee", "GET", "/api/documents/my-documents", {}, None, ()),
+]
+
+_FULL_SCAN = re.compile(r"^SCAN ([A-Za-z_]\w*)")  # not "SCAN 2 CONSTANT ROWS" of a multi-row VALUES
+_DML = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+_CURSOR = encode_cursor(date(2030, 1, 1), 1_000_000)
+
+
+def _current_user(request: Request):
+    db = SessionLocal()
+    try:
+        user = db.get(User, int(request.headers["x-user"]))
+        db.expunge(user)
+        return user
+    finally:
+        db.close()
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    for module in (attendance, admin, leaves, notifications, payroll, documents):
+        app.include_router(module.router)
+    app.include_router(employees.router, prefix="/api/employees")
+    app.dependency_overrides[get_current_user] = _current_user
+    return app
+
+
+async def _send(app, method: str, path: str, query: dict, body, user_id: int) -> int:
+    """One request through the ASGI app, without an HTTP client. Returns the status."""
+    payload = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": urlencode(query).encode(), "server": ("test", 80), "client": ("test", 1),
+        "headers": [(b"x-user", str(user_id).encode()), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(payload)).encode())],
+    }
+    sent = False
+    status = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await asyncio.Event().wait()  # no disconnect while a response streams
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        await async_engine.dispose()  # its aiosqlite connections are tied to this event loop
+    return status[0]
+
+
+@pytest.fixture(scope="module")
+def users():
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        ids = {}
+        for role in ("admin", "team_lead", "employee"):
+            user = User(email=f"plan-{role}@example.com", hashed_password="x", first_name="Plan",
+                        last_name=role, role=role, status="active")
+            db.add(user)
+            db.flush()
+            ids[role] = user.id
+        db.add(Employee(user_id=ids["team_lead"], employee_id="PLAN0001"))
+        db.add(Employee(user_id=ids["employee"], employee_id="PLAN0002", manager_id=ids["team_lead"],
+                        hire_date=date(2020, 1, 1)))
+        db.add(LeaveBalance(employee_id=ids["employee"], leave_type="annual", year=2030,
+                            total_allocated=20, remaining=20))
+        db.add(SalaryStructure(employee_id=ids["employee"], effective_from=date(2020, 1, 1), basic_salary=1000,
+                               is_active=True, created_by=ids["admin"]))
+        db.commit()
+        for cache in (org_chart, role_directory):
+            cache.invalidate()
+        org_chart.direct_reports(db, ids["team_lead"])
+        role_directory.holders(db, ("admin",))
+        return ids
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="module")
+def app():
+    return _app()
+
+
+@pytest.fixture
+def statements():
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(_DML):
+            # executemany passes a list of rows; an insertmanyvalues batch passes one flat row
+            if executemany and isinstance(parameters, list):
+                parameters = parameters[0]
+            captured.append((statement, parameters))
+
+    targets = (engine, async_engine.sync_engine)
+    for target in targets:
+        event.listen(target, "before_cursor_execute", capture)
+    yield captured
+    for target in targets:
+        event.remove(target, "before_cursor_execute", capture)
+
+
+def _plan(statement: str, parameters) -> list:
+    with engine.connect() as connection:
+        return [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters or ()))]
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case[0] for case in CASES])
+def test_route_queries_use_an_index(app, users, statements, case):
+    _, role, method, path, query, body, may_scan = case
+    query = {k: str(v).format(employee=users["employee"], cursor=_CURSOR) for k, v in query.items()}
+    status = asyncio.run(_send(app, method, path, query, body, users[role]))
+    assert status < 400, f"{method} {path} returned {status}"
+    assert statements, f"{method} {path} ran no SQL"
+
+    for statement, parameters in dict.fromkeys((s, tuple(p or ())) for s, p in statements):
+        plan = _plan(statement, parameters)
+        scans = [
+            step for step in plan
+            if _FULL_SCAN.match(step) and "USING" not in step and _FULL_SCAN.match(step).group(1) not in may_scan
+        ]
+        assert not scans, f"full table scan in {method} {path}:\n{statement}\n{plan}"